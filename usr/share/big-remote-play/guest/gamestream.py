@@ -0,0 +1,242 @@
+"""
+Minimal GameStream (nvhttp) client: host identity, pair status and app list
+"""
+
+import http.client
+import os
+import ssl
+import tempfile
+import threading
+import uuid
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+HTTP_PORT = 47989
+HTTPS_PORT = 47984
+
+# Same placeholder id Moonlight sends; Sunshine only uses it for pairing
+CLIENT_UNIQUE_ID = '0123456789ABCDEF'
+
+STATE_BUSY_SUFFIX = '_BUSY'
+
+
+def _netloc(ip: str) -> str:
+    ip = ip.strip('[]')
+    if ':' in ip:
+        ip = '[' + ip.replace('%', '%25') + ']'
+    return ip
+
+
+def parse_xml(data: bytes) -> Optional[dict]:
+    """Flattens a GameStream <root> reply into {tag: text}; None on error status"""
+    root = _parse_root(data)
+    if root is None or root.get('status_code', '200') != '200':
+        return None
+    return {child.tag: (child.text or '').strip() for child in root}
+
+
+def _parse_root(data: bytes):
+    try:
+        return ET.fromstring(data)
+    except ET.ParseError:
+        return None
+
+
+def parse_applist(data: bytes) -> Optional[List[Dict]]:
+    """<root><App><AppTitle/><ID/><IsHdrSupported/></App>...</root> -> [{'title', 'id', 'hdr'}]"""
+    root = _parse_root(data)
+    if root is None or root.get('status_code', '200') != '200':
+        return None
+    apps = []
+    for app in root.iter('App'):
+        title = (app.findtext('AppTitle') or '').strip()
+        if not title: continue
+        apps.append({'title': title, 'id': (app.findtext('ID') or '').strip(),
+                     'hdr': (app.findtext('IsHdrSupported') or '0').strip() == '1'})
+    return apps
+
+
+def get_serverinfo(ip: str, port: int = HTTP_PORT, timeout: float = 1.5) -> Optional[dict]:
+    """
+    GET /serverinfo over HTTP. Returns the flattened reply (hostname,
+    uniqueid, state, HttpsPort, ...) or None if the host did not answer.
+    PairStatus is always 0 here; only the HTTPS endpoint can report it.
+    """
+    try:
+        status, body = _get(ip, port, '/serverinfo', timeout)
+        return parse_xml(body) if status == 200 else None
+    except Exception as e:
+        print(f"DEBUG: serverinfo {ip} failed: {e}")
+        return None
+
+
+class CertificateMismatch(ssl.SSLError):
+    """The host's certificate is not the one Moonlight paired with"""
+
+
+def _get(ip: str, port: int, path: str, timeout: float, context=None, pinned_der: bytes = None):
+    """One GET; returns (http_status, body). Raises OSError/ssl.SSLError on transport failure"""
+    host = ip.strip('[]')
+    query = f"{path}?uniqueid={CLIENT_UNIQUE_ID}&uuid={uuid.uuid4().hex}"
+    if context is None:
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    else:
+        conn = http.client.HTTPSConnection(host, port, timeout=timeout, context=context)
+    try:
+        conn.connect()
+        if pinned_der is not None and conn.sock.getpeercert(binary_form=True) != pinned_der:
+            raise CertificateMismatch("host certificate does not match the paired one")
+        conn.request('GET', query, headers={'Host': _netloc(ip)})
+        r = conn.getresponse()
+        return r.status, r.read()
+    finally:
+        conn.close()
+
+
+class GameStreamClient:
+    """
+    Talks to a Sunshine/GameStream host directly instead of forking Moonlight.
+
+    Plain HTTP (47989) gives identity and state. HTTPS (47984) is
+    authenticated with the client certificate Moonlight generated, so the
+    host answers PairStatus, the running app and the app list exactly as it
+    would for Moonlight itself. The host's certificate is pinned to the one
+    Moonlight stored when pairing.
+    """
+
+    def __init__(self, timeout: float = 1.5):
+        self.timeout = timeout
+        self._context = None
+        self._context_loaded = False
+        self._lock = threading.Lock()
+
+    def _ssl_context(self):
+        """Client-authenticated TLS context from Moonlight's identity, or None if it has none"""
+        with self._lock:
+            if self._context_loaded: return self._context
+            try:
+                from utils.moonlight_config import MoonlightConfigManager
+                identity = MoonlightConfigManager().get_client_identity()
+            except Exception as e:
+                print(f"DEBUG: Moonlight identity unavailable: {e}")
+                identity = None
+            # Retried on the next call: Moonlight creates its identity on first run
+            if not identity: return None
+            self._context_loaded = True
+            ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            # Sunshine uses a self-signed certificate; it is pinned per host instead
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+            # load_cert_chain only takes paths: write to a private dir, load, delete
+            tmpdir = tempfile.mkdtemp(prefix='brp-gs-')
+            cert_path, key_path = os.path.join(tmpdir, 'cert.pem'), os.path.join(tmpdir, 'key.pem')
+            try:
+                for path, data in ((cert_path, identity['certificate']), (key_path, identity['key'])):
+                    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                    with os.fdopen(fd, 'wb') as f: f.write(data)
+                ctx.load_cert_chain(cert_path, key_path)
+                self._context = ctx
+            except (OSError, ssl.SSLError) as e:
+                print(f"DEBUG: Could not load Moonlight client certificate: {e}")
+            finally:
+                for path in (cert_path, key_path):
+                    try: os.unlink(path)
+                    except OSError: pass
+                try: os.rmdir(tmpdir)
+                except OSError: pass
+            return self._context
+
+    def has_identity(self) -> bool:
+        """True once Moonlight has a client certificate, i.e. PairStatus can be asked"""
+        return self._ssl_context() is not None
+
+    @staticmethod
+    def _pinned_cert(uniqueid: str) -> Optional[bytes]:
+        try:
+            from utils.moonlight_config import MoonlightConfigManager
+            for h in MoonlightConfigManager().get_hosts():
+                if h['uuid'].lower() == uniqueid.lower() and h.get('srvcert'):
+                    return ssl.PEM_cert_to_DER_cert(h['srvcert'].decode(errors='ignore'))
+        except Exception:
+            pass
+        return None
+
+    def _https_get(self, ip: str, info: dict, path: str):
+        """
+        Authenticated GET; returns the body, or None if the host does not
+        accept us as paired. Raises OSError when the host could not be
+        asked (timeout, refused, TLS failure): that says nothing about pairing.
+        """
+        ctx = self._ssl_context()
+        if ctx is None: return None
+        try: port = int(info.get('HttpsPort') or HTTPS_PORT)
+        except ValueError: port = HTTPS_PORT
+        try:
+            status, body = _get(ip, port, path, self.timeout, ctx, self._pinned_cert(info.get('uniqueid', '')))
+        except CertificateMismatch as e:
+            print(f"DEBUG: GameStream HTTPS {ip}{path} rejected: {e}")
+            return None
+        except (OSError, ssl.SSLError) as e:
+            print(f"DEBUG: GameStream HTTPS {ip}{path} failed: {e}")
+            raise OSError(f"{ip} unreachable over HTTPS: {e}") from e
+        root = _parse_root(body) if status == 200 else None
+        # Sunshine answers 401 inside the XML for certificates it does not know
+        if root is None or root.get('status_code', '200') != '200': return None
+        return body
+
+    def probe(self, ip: str, port: int = HTTP_PORT, with_apps: bool = True) -> Optional[dict]:
+        """
+        Returns {'ip', 'hostname', 'uniqueid', 'paired', 'busy', 'current_game',
+        'current_app', 'apps'} or None if no GameStream host answers at `ip`.
+        `paired` is None when Moonlight has no client identity to ask with
+        or the HTTPS request failed; only False means the host rejected us.
+        """
+        info = get_serverinfo(ip, port, self.timeout)
+        if info is None: return None
+        result = {
+            'ip': ip,
+            'hostname': info.get('hostname', ''),
+            'uniqueid': info.get('uniqueid', ''),
+            'paired': None,
+            'busy': info.get('state', '').endswith(STATE_BUSY_SUFFIX),
+            'current_game': info.get('currentgame', '0'),
+            'current_app': None,
+            'apps': None,
+        }
+        if self._ssl_context() is None: return result
+
+        try: body = self._https_get(ip, info, '/serverinfo')
+        except OSError: return result
+        secure = parse_xml(body) if body else None
+        result['paired'] = bool(secure) and secure.get('PairStatus') == '1'
+        if not result['paired']: return result
+        result['busy'] = secure.get('state', '').endswith(STATE_BUSY_SUFFIX)
+        result['current_game'] = secure.get('currentgame', '0')
+
+        if with_apps:
+            try: body = self._https_get(ip, info, '/applist')
+            except OSError: body = None
+            result['apps'] = parse_applist(body) if body else None
+            if result['apps'] and result['current_game'] not in ('', '0'):
+                result['current_app'] = next((a['title'] for a in result['apps'] if a['id'] == result['current_game']), None)
+        return result
+
+    def probe_many(self, ips, on_result: Callable = None, max_workers: int = 16) -> Dict[str, Optional[dict]]:
+        """Probes every address concurrently; on_result(ip, info) is called as each finishes"""
+        ips = list(dict.fromkeys(i for i in ips if i))
+        results = {}
+        if not ips: return results
+        self._ssl_context()  # Load once before the workers race for it
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(ips))) as pool:
+            futures = {pool.submit(self.probe, ip): ip for ip in ips}
+            for fut in as_completed(futures):
+                ip = futures[fut]
+                try: results[ip] = fut.result()
+                except Exception as e:
+                    print(f"DEBUG: GameStream probe {ip} failed: {e}")
+                    results[ip] = None
+                if on_result:
+                    try: on_result(ip, results[ip])
+                    except Exception as e: print(f"DEBUG: GameStream on_result failed: {e}")
+        return results
@@ -1,8 +1,20 @@
-import subprocess, shutil
+import subprocess, shutil, threading, time
+from utils.network import InterfaceSnapshot, NeighborRefresher
+from utils.moonlight_config import MoonlightConfigManager
+from guest.gamestream import GameStreamClient, get_serverinfo
+from guest.moonlight_stats import MoonlightStats
 class MoonlightClient:
+    # How long a cached pairing answer is trusted before Moonlight.conf/serverinfo are consulted again
+    PAIRING_CACHE_TTL = 300.0
+
     def __init__(self, logger=None):
         self.process = None; self.connected_host = None; self.logger = logger
         self.moonlight_cmd = next((c for c in ['moonlight-qt', 'moonlight'] if shutil.which(c)), None)
+        # Pairing/app-list cache, keyed by address and by host uniqueid (same entry object)
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+        self.gamestream = GameStreamClient()
+        self.stats = MoonlightStats()
     
     def _prepare_ip(self, ip):
         """Prepares IP for Moonlight CLI."""
@@ -15,24 +27,8 @@ class MoonlightClient:
             clean_ip = clean_ip[1:-1]
         
         if ':' in clean_ip and '%' not in clean_ip and clean_ip.startswith('fe80'):
-            try:
-                # Get interface with default route
-                route = subprocess.check_output(['ip', '-6', 'route', 'show', 'default'], text=True).split()
-                if 'dev' in route:
-                    dev_idx = route.index('dev') + 1
-                    if dev_idx < len(route):
-                        iface = route[dev_idx]
-                        clean_ip = f"{clean_ip}%{iface}"
-                else:
-                    # Dumb fallback: get first UP interface that is not lo
-                    try:
-                        import json
-                        out = subprocess.check_output(['ip', '-j', 'addr'], text=True)
-                        for i in json.loads(out):
-                            if i['ifname'] != 'lo' and 'UP' in i['flags']:
-                                clean_ip = f"{clean_ip}%{i['ifname']}"
-                                break
-                    except: pass
+            # Interface with default route, else first UP interface that is not lo
+            try: clean_ip = InterfaceSnapshot.get().with_scope(clean_ip)
             except: pass
             
         return clean_ip
@@ -57,20 +53,19 @@ class MoonlightClient:
                 self.logger.info(f"Connecting to {ip} (target: {target_ip}) with options: {kw}")
                 self.logger.info(f"Command: {' '.join(cmd)}")
             
-            stdout_target = subprocess.PIPE if self.logger else None
-            stderr_target = subprocess.PIPE if self.logger else None
-            
-            self.process = subprocess.Popen(cmd, stdout=stdout_target, stderr=stderr_target, text=True)
+            # Always piped: the reader threads feed the stream stats parser
+            self.stats.reset()
+            self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors='replace')
             self.connected_host = ip
             
-            if self.logger:
-                import threading
-                def log_output(pipe, level):
-                    for line in iter(pipe.readline, ''):
-                        if line: getattr(self.logger, level, self.logger.info)(f"[Moonlight] {line.strip()}")
-                    pipe.close()
-                if self.process.stdout: threading.Thread(target=log_output, args=(self.process.stdout, 'info'), daemon=True).start()
-                if self.process.stderr: threading.Thread(target=log_output, args=(self.process.stderr, 'error'), daemon=True).start()
+            def log_output(pipe, level):
+                for line in iter(pipe.readline, ''):
+                    if not line: continue
+                    self.stats.feed(line)
+                    if self.logger: getattr(self.logger, level, self.logger.info)(f"[Moonlight] {line.strip()}")
+                pipe.close()
+            threading.Thread(target=log_output, args=(self.process.stdout, 'info'), daemon=True).start()
+            threading.Thread(target=log_output, args=(self.process.stderr, 'error'), daemon=True).start()
             
             try:
                 exit_code = self.process.wait(timeout=1.0)
@@ -98,6 +93,12 @@ class MoonlightClient:
     def probe_host(self, host_ip):
         try: 
             target_ip = self._prepare_ip(host_ip)
+            # Native GameStream check; the binary is only needed without a Moonlight identity
+            info = self.gamestream.probe(target_ip, with_apps=False)
+            if info is None: return False
+            if info['paired'] is not None:
+                self._remember(host_ip, info['paired'], uid=info['uniqueid'] or None)
+                return info['paired']
             # Aggressive timeout for probe
             res = subprocess.run([self.moonlight_cmd, 'list', target_ip], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=1.5)
             return res.returncode == 0
@@ -138,7 +139,10 @@ class MoonlightClient:
             self.process = None
             
             # Return success flag or 0 exit code (if it finished naturally with success)
-            return success or ret == 0
+            if success or ret == 0:
+                self._remember(host_ip, True)
+                return True
+            return False
         except Exception as e:
             if self.logger: self.logger.error(f"Pairing exception: {e}")
             return False
@@ -148,17 +152,23 @@ class MoonlightClient:
         
         try:
             target_ip = self._prepare_ip(host_ip)
-            # Try clearing neighbor cache if IPv6 to avoid dead routes
-            if ':' in target_ip:
-                # 2. Flush neighbor cache for the specific target interface to avoid stale routes
-                try: subprocess.run(['ip', '-6', 'neigh', 'flush', 'all'], capture_output=True, timeout=1)
-                except: pass
-                
-                # 3. Ping all-nodes multicast briefly to populate neighbor cache
-                try: subprocess.run(['ping', '-6', '-c', '1', '-W', '1', 'ff02::1%lo'], capture_output=True, timeout=1) 
-                except: pass
+            # Refresh only this host's neighbor entry (cached per destination)
+            NeighborRefresher.get().ensure(target_ip)
         except: pass
 
+        try:
+            target_ip = self._prepare_ip(host_ip)
+            # Native /serverinfo + /applist: tens of ms instead of starting Moonlight
+            info = self.gamestream.probe(target_ip)
+            if info is None: return [] # No GameStream host answering
+            if info['paired'] is not None:
+                apps = [a['title'] for a in info['apps'] or []] if info['paired'] else None
+                self._remember(host_ip, info['paired'], apps, info['uniqueid'] or None)
+                if self.logger: self.logger.debug(f"List apps {host_ip} (native): paired={info['paired']} apps={apps}")
+                return apps
+        except Exception as e:
+            if self.logger: self.logger.error(f"Native list apps error: {e}")
+
         try:
             target_ip = self._prepare_ip(host_ip)
             # Uses start_new_session=True instead of external setsid for better compatibility
@@ -169,11 +179,14 @@ class MoonlightClient:
                 if r.stderr: self.logger.error(f"List apps {host_ip} stderr: {r.stderr}")
             
             if r.returncode == 0:
-                return [l.strip() for l in r.stdout.splitlines() if l.strip()]
+                apps = [l.strip() for l in r.stdout.splitlines() if l.strip()]
+                self._remember(host_ip, True, apps)
+                return apps
             
             # Check for explicit pairing error in stderr
             err = (r.stderr or "").lower()
             if "not paired" in err or "não foi pareado" in err or "unpaired" in err:
+                self._remember(host_ip, False)
                 return None
                 
             return [] # Other error (timeout, connection refused, etc)
@@ -181,4 +194,80 @@ class MoonlightClient:
             if self.logger: self.logger.error(f"List apps error: {e}")
             return []
 
+    def probe_hosts(self, host_ips, on_result=None):
+        """
+        Probes many hosts concurrently over GameStream (worker thread) and
+        feeds the pairing cache. on_result(host_ip, info) runs per host as
+        soon as it answers; info is None for hosts that did not respond.
+        """
+        targets = {self._prepare_ip(ip): ip for ip in host_ips if ip}
+        def done(target, info):
+            host_ip = targets[target]
+            if info and info['paired'] is not None:
+                apps = [a['title'] for a in info['apps']] if info['apps'] is not None else None
+                self._remember(host_ip, info['paired'], apps, info['uniqueid'] or None)
+            if on_result: on_result(host_ip, info)
+        return self.gamestream.probe_many(list(targets), done)
+
+    @staticmethod
+    def _cache_key(host_ip):
+        return host_ip.strip().strip('[]').split('%')[0].lower()
+
+    def _remember(self, host_ip, paired, apps=None, uid=None):
+        with self._hosts_lock:
+            key = self._cache_key(host_ip)
+            entry = self._hosts.get(key) or (self._hosts.get(uid.lower()) if uid else None) or {}
+            entry.update({'paired': paired, 'at': time.monotonic()})
+            if apps is not None: entry['apps'] = apps
+            if uid: entry['uuid'] = uid
+            self._hosts[key] = entry
+            if entry.get('uuid'): self._hosts[entry['uuid'].lower()] = entry
+
+    def forget_host(self, host_ip):
+        """Drops the cached pairing state (e.g. after a failed stream start)"""
+        with self._hosts_lock:
+            entry = self._hosts.pop(self._cache_key(host_ip), None)
+            if entry and entry.get('uuid'): self._hosts.pop(entry['uuid'].lower(), None)
+
+    def get_cached_apps(self, host_ip):
+        with self._hosts_lock:
+            entry = self._hosts.get(self._cache_key(host_ip))
+            return list(entry.get('apps') or []) if entry else []
+
+    def is_known_paired(self, host_ip):
+        """
+        Answers "is this host paired?" without forking moonlight: from the
+        cache, then from the host itself (authenticated PairStatus, which
+        reflects a revoked client). Moonlight.conf, matched by address or by
+        the uniqueid the host reports on /serverinfo, is only consulted when
+        there is no client identity to ask with. Returns True/False, or None
+        if unknown.
+        """
+        if not host_ip: return None
+        key = self._cache_key(host_ip)
+        with self._hosts_lock:
+            entry = self._hosts.get(key)
+            if entry and time.monotonic() - entry['at'] < self.PAIRING_CACHE_TTL:
+                return entry['paired']
+
+        if self.gamestream.has_identity():
+            info = self.gamestream.probe(self._prepare_ip(host_ip), with_apps=False)
+            if info is None or info['paired'] is None: return None
+            self._remember(host_ip, info['paired'], uid=info['uniqueid'] or None)
+            return info['paired']
+
+        try: known = MoonlightConfigManager().get_hosts()
+        except Exception as e:
+            print(f"DEBUG: Could not read Moonlight hosts: {e}")
+            known = []
+        match = next((h for h in known if key in (a.lower() for a in h['addresses'])), None)
+        if match is None and known:
+            info = get_serverinfo(self._prepare_ip(host_ip))
+            uid = (info or {}).get('uniqueid', '').lower()
+            if uid: match = next((h for h in known if h['uuid'].lower() == uid), None)
+        if match is None: return None
+
+        self._remember(host_ip, match['paired'], match['apps'] or None, match['uuid'] or None)
+        return match['paired']
+
     def get_status(self): return {'connected': self.is_connected(), 'host': self.connected_host, 'moonlight_cmd': self.moonlight_cmd}
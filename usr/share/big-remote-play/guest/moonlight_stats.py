@@ -0,0 +1,99 @@
+"""
+Structured stream metrics parsed from Moonlight's stdout/stderr
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# Moonlight prefixes its lines ("00:00:05 - SDL Info (0): ..."); patterns are searched, not anchored
+_FLOAT = r'(\d+(?:\.\d+)?)'
+_PATTERNS = (
+    ('stream', re.compile(r'Video stream is (\d+)x(\d+)x(\d+)')),
+    ('decoder', re.compile(r'(?:Selected|Using|Chose)\b[^:]*?\bdecoder\b[:\s]+(.+?)\s*$', re.IGNORECASE)),
+    ('rx_fps', re.compile(r'Incoming frame rate from network:\s*' + _FLOAT)),
+    ('decode_fps', re.compile(r'Decoding frame rate:\s*' + _FLOAT)),
+    ('render_fps', re.compile(r'Rendering frame rate:\s*' + _FLOAT)),
+    ('network_drop_pct', re.compile(r'Frames dropped by your network connection:\s*' + _FLOAT + '%')),
+    ('jitter_drop_pct', re.compile(r'Frames dropped due to network jitter:\s*' + _FLOAT + '%')),
+    ('latency', re.compile(r'Average network latency:\s*' + _FLOAT + r'\s*ms(?:\s*\(variance:\s*' + _FLOAT + r'\s*ms\))?')),
+    ('decode_ms', re.compile(r'Average decoding time:\s*' + _FLOAT + r'\s*ms')),
+    ('queue_ms', re.compile(r'Average frame queue delay:\s*' + _FLOAT + r'\s*ms')),
+    ('render_ms', re.compile(r'Average rendering time[^:]*:\s*' + _FLOAT + r'\s*ms')),
+    ('dropped', re.compile(r'Network dropped (\d+) frames?')),
+    ('unrecoverable', re.compile(r'Unrecoverable frame \d+')),
+)
+# Printed once per stream; never treated as stale
+_SESSION_KEYS = ('resolution', 'stream_fps', 'decoder')
+
+
+class MoonlightStats:
+    """
+    Thread-safe accumulator fed line by line from the Moonlight output
+    reader threads. Keeps the latest value of each metric and a short
+    window of dropped-frame events, so the monitor can read real decode FPS
+    and frame loss instead of only ICMP latency.
+    """
+
+    DROP_WINDOW = 5.0
+    # Values not refreshed for this long are considered stale
+    MAX_AGE = 15.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clears everything; called when a new stream starts"""
+        with self._lock:
+            self._values = {}  # key -> (value, monotonic time)
+            self._drops = deque()  # (time, frames)
+            self.started_at = time.monotonic()
+
+    def feed(self, line: str) -> Optional[str]:
+        """Parses one output line; returns the metric it updated (None if it had none)"""
+        if not line: return None
+        for key, pattern in _PATTERNS:
+            m = pattern.search(line)
+            if not m: continue
+            now = time.monotonic()
+            with self._lock:
+                if key == 'stream':
+                    w, h, fps = (int(g) for g in m.groups())
+                    self._values['resolution'] = (f"{w}x{h}", now)
+                    self._values['stream_fps'] = (float(fps), now)
+                elif key == 'decoder':
+                    self._values['decoder'] = (m.group(1), now)
+                elif key == 'latency':
+                    self._values['latency_ms'] = (float(m.group(1)), now)
+                    if m.group(2) is not None: self._values['latency_var_ms'] = (float(m.group(2)), now)
+                elif key in ('dropped', 'unrecoverable'):
+                    self._drops.append((now, int(m.group(1)) if key == 'dropped' else 1))
+                else:
+                    self._values[key] = (float(m.group(1)), now)
+            return key
+        return None
+
+    def snapshot(self) -> dict:
+        """
+        Current metrics: resolution, decoder, stream_fps, rx_fps, decode_fps,
+        render_fps, latency_ms, decode_ms, ... plus 'dropped_frames' in the
+        last DROP_WINDOW seconds and 'frame_loss_pct'.
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._drops and now - self._drops[0][0] > self.DROP_WINDOW:
+                self._drops.popleft()
+            out = {k: v for k, (v, at) in self._values.items()
+                   if k in _SESSION_KEYS or now - at <= self.MAX_AGE}
+            dropped = sum(n for _t, n in self._drops)
+        out['dropped_frames'] = dropped
+        if 'network_drop_pct' in out:
+            out['frame_loss_pct'] = out['network_drop_pct'] + out.get('jitter_drop_pct', 0.0)
+        else:
+            fps = out.get('rx_fps') or out.get('stream_fps') or 0.0
+            window = min(self.DROP_WINDOW, max(1.0, now - self.started_at))
+            out['frame_loss_pct'] = min(100.0, dropped * 100.0 / (fps * window)) if fps else 0.0
+        return out
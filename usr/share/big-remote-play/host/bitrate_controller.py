@@ -0,0 +1,170 @@
+"""
+Adaptive per-stream bitrate for several guests sharing the host uplink
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+
+class AdaptiveBitrateController:
+    """
+    Splits the host uplink between the guests that are streaming and backs
+    off when any of them shows congestion: RTT well above that guest's own
+    baseline, or lost probes. The resulting per-stream cap is AIMD-style
+    (cut quickly, recover slowly) and is written to Sunshine as max_bitrate.
+
+    Sunshine applies max_bitrate when a stream is launched and only reads
+    its config at startup, so a new cap is saved to sunshine.conf at once
+    and applied (a restart) only when nobody is streaming. The
+    cap is planned for the most guests seen streaming together, so a group
+    that reconnects starts within the uplink instead of overloading it;
+    that peak is forgotten once the host has been idle for PEAK_TTL.
+    """
+
+    # Share of the uplink given to video (audio, input and FEC need the rest)
+    HEADROOM = 0.85
+    MIN_KBPS = 2000
+    # RTT this far above a guest's baseline means the uplink queue is filling
+    RTT_RISE_MS = 40.0
+    LOSS_LIMIT = 0.2
+    PROBE_WINDOW = 10
+    BASELINE_WINDOW = 60
+    DECREASE = 0.8
+    DECREASE_INTERVAL = 3.0
+    INCREASE = 0.05
+    CALM_INTERVAL = 10.0
+    MIN_FACTOR = 0.3
+    # Changes smaller than this are not worth a restart
+    APPLY_THRESHOLD = 0.1
+    # No stream for this long before Sunshine may be restarted (covers reconnects)
+    IDLE_GRACE = 15.0
+    # No stream for this long and the group is gone: plan for one guest again
+    PEAK_TTL = 600.0
+
+    def __init__(self, sunshine, uplink_kbps: int = 0, max_kbps: int = 0, submit=None):
+        """
+        uplink_kbps: total upload available to all guests (0 = unknown).
+        max_kbps: per-stream ceiling chosen by the user (0 = none).
+        submit: runs a callable serialized with the host start/stop jobs
+        (default: right away, on the caller's thread).
+        """
+        self.sunshine = sunshine
+        self._submit = submit or (lambda fn: fn())
+        self._busy = False  # A write/restart was submitted and has not run yet
+        self.uplink_kbps = max(0, int(uplink_kbps))
+        self.max_kbps = max(0, int(max_kbps))
+        self._lock = threading.Lock()
+        self._guests = {}  # ip -> {'rtts': deque, 'replies': deque}
+        self._factor = 1.0
+        self._stream_peak_kbps = 0.0
+        self._last_decrease = 0.0
+        self._calm_since = time.monotonic()
+        self._last_active = 0.0
+        self._peak_streams = 1
+        self._written_kbps = None
+        self.streams = 0
+        self.congested = []
+        self.target_kbps = self.plan(1)
+        # The initial cap goes into sunshine.conf with the rest of the launch config
+        self.applied_kbps = self.target_kbps
+
+    def plan(self, streams: int) -> int:
+        """Per-stream cap in Kbps for `streams` concurrent guests (0 = leave it to Moonlight)"""
+        streams = max(1, streams)
+        if self.uplink_kbps:
+            share = self.uplink_kbps * self.HEADROOM / streams
+        elif self._factor < 1.0 and self._stream_peak_kbps:
+            # Unknown uplink: scale down from what the streams actually reached
+            share = self._stream_peak_kbps
+        else:
+            return self.max_kbps
+        if self.max_kbps: share = min(share, self.max_kbps)
+        return max(self.MIN_KBPS, int(share * self._factor))
+
+    def update(self, guest_rtts: Dict[str, float], streams: int, encoder_kbps: float = 0.0):
+        """
+        One monitor tick (worker thread). guest_rtts maps each streaming
+        guest to its probe RTT in ms (0 = no reply); encoder_kbps is the
+        total bitrate Sunshine reports.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for ip in list(self._guests):
+                if ip not in guest_rtts: del self._guests[ip]
+            for ip, rtt in guest_rtts.items():
+                st = self._guests.setdefault(ip, {'rtts': deque(maxlen=self.BASELINE_WINDOW),
+                                                  'replies': deque(maxlen=self.PROBE_WINDOW)})
+                st['replies'].append(rtt > 0)
+                if rtt > 0: st['rtts'].append(rtt)
+
+            self.streams = streams
+            if streams:
+                self._last_active = now
+                self._peak_streams = max(self._peak_streams, streams)
+                if encoder_kbps > 0:
+                    self._stream_peak_kbps = max(self._stream_peak_kbps, encoder_kbps / streams)
+            elif now - self._last_active >= self.PEAK_TTL:
+                self._peak_streams = 1
+            self.congested = [ip for ip, st in self._guests.items() if self._is_congested(st)] if streams else []
+
+            if self.congested:
+                if now - self._last_decrease >= self.DECREASE_INTERVAL:
+                    self._factor = max(self.MIN_FACTOR, self._factor * self.DECREASE)
+                    self._last_decrease = now
+                    print(f"DEBUG: Bitrate controller - congestion on {', '.join(self.congested)}, factor {self._factor:.2f}")
+                self._calm_since = now
+            elif self._factor < 1.0 and now - self._calm_since >= self.CALM_INTERVAL:
+                self._factor = min(1.0, self._factor + self.INCREASE)
+                self._calm_since = now
+
+            self.target_kbps = self.plan(self._peak_streams)
+            # Small moves are not worth a restart: keep (or go back to) the applied cap
+            target = self.target_kbps if self._differs(self.target_kbps, self.applied_kbps) else self.applied_kbps
+            on_disk = self.applied_kbps if self._written_kbps is None else self._written_kbps
+            if self._busy: return
+            write = target != on_disk
+            restart = target != self.applied_kbps and not streams and now - self._last_active >= self.IDLE_GRACE
+            if not (write or restart): return
+            self._busy = True
+
+        self._submit(lambda: self._apply(target, write, restart))
+
+    def _apply(self, target: int, write: bool, restart: bool):
+        try:
+            if write:
+                print(f"DEBUG: Bitrate controller - {self.streams} stream(s), max_bitrate {target} Kbps")
+                if self.sunshine.configure({'max_bitrate': target}):
+                    with self._lock: self._written_kbps = target
+            if restart and self.sunshine.is_running():
+                print(f"DEBUG: Bitrate controller - applying max_bitrate {target} to idle Sunshine")
+                diff = self.sunshine.apply_config()
+                ok = diff.restarted or not diff.needs_restart
+                with self._lock:
+                    if ok: self.applied_kbps = target
+                    else: self._last_active = time.monotonic()  # Back off before trying again
+        finally:
+            with self._lock: self._busy = False
+
+    def _is_congested(self, st) -> bool:
+        rtts, replies = st['rtts'], st['replies']
+        if len(rtts) >= 3:
+            recent = sorted(list(rtts)[-3:])[1]
+            if recent > min(rtts) + self.RTT_RISE_MS: return True
+        # Guests that never answer probes (firewalled) carry no loss signal
+        if rtts and len(replies) >= self.PROBE_WINDOW // 2:
+            lost = replies.count(False) / len(replies)
+            if lost > self.LOSS_LIMIT: return True
+        return False
+
+    def _differs(self, a: int, b: int) -> bool:
+        if a == b: return False
+        if not a or not b: return True
+        return abs(a - b) > self.APPLY_THRESHOLD * max(a, b)
+
+    def get_status(self) -> dict:
+        with self._lock:
+            return {'streams': self.streams, 'planned_streams': self._peak_streams, 'target_kbps': self.target_kbps,
+                    'applied_kbps': self.applied_kbps, 'factor': self._factor,
+                    'congested': list(self.congested)}
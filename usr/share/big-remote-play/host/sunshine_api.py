@@ -0,0 +1,150 @@
+"""
+Persistent HTTPS client for the Sunshine REST API
+"""
+
+import base64
+import http.client
+import socket
+import ssl
+import threading
+import time
+
+
+class _CountingHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPSConnection that reports every (re)connect, i.e. every TLS handshake"""
+
+    def __init__(self, *args, on_connect=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._on_connect = on_connect
+
+    def connect(self):
+        super().connect()
+        if self._on_connect:
+            self._on_connect()
+
+
+class SunshineAPIClient:
+    """
+    Keep-alive client for the local Sunshine web API.
+
+    One TLS connection is kept open and reused for every request, the SSL
+    context is built once and Basic auth headers are cached per credential
+    pair. A request whose reused connection turns out to have been closed
+    by the server (send failed, or hung up without a response) is retried
+    once on a fresh one; timeouts are never retried.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 47990, timeout: float = 5.0):
+        # Use 127.0.0.1 to avoid IPv6 (::1) issues if Sunshine binds to 0.0.0.0
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._ctx = self._create_ssl_context()
+        self._conn = None
+        self._lock = threading.Lock()
+        self._auth_headers = {}
+        self.handshakes = 0
+        self._latency = {}
+
+    @staticmethod
+    def _create_ssl_context() -> ssl.SSLContext:
+        # Sunshine uses a self-signed certificate
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        try:
+            # Fix for legacy server support or specific SSL options
+            ctx.options |= 0x4  # ssl.OP_LEGACY_SERVER_CONNECT
+        except: pass
+        return ctx
+
+    def _count_handshake(self):
+        self.handshakes += 1
+
+    def _get_connection(self) -> http.client.HTTPSConnection:
+        if self._conn is None:
+            self._conn = _CountingHTTPSConnection(
+                self.host, self.port, timeout=self.timeout,
+                context=self._ctx, on_connect=self._count_handshake
+            )
+        return self._conn
+
+    def _auth_header(self, auth) -> str:
+        header = self._auth_headers.get(auth)
+        if header is None:
+            u, p = auth
+            header = f"Basic {base64.b64encode(f'{u}:{p}'.encode()).decode()}"
+            self._auth_headers[auth] = header
+        return header
+
+    def _record_latency(self, endpoint: str, elapsed: float):
+        stats = self._latency.setdefault(endpoint, {'count': 0, 'total_ms': 0.0, 'last_ms': 0.0})
+        ms = elapsed * 1000.0
+        stats['count'] += 1
+        stats['total_ms'] += ms
+        stats['last_ms'] = ms
+
+    def request(self, method: str, path: str, body: bytes = None, auth=None,
+                timeout: float = None, endpoint: str = None) -> tuple[int, str, bytes]:
+        """
+        Performs a request on the shared connection.
+
+        Returns (status, reason, body). Network errors are raised to the caller;
+        HTTP error statuses are returned, not raised.
+        """
+        headers = {"Content-Type": "application/json"}
+        if auth:
+            headers["Authorization"] = self._auth_header(tuple(auth))
+
+        with self._lock:
+            for attempt in range(2):
+                conn = self._get_connection()
+                reused = conn.sock is not None
+                conn.timeout = timeout or self.timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(conn.timeout)
+                start = time.monotonic()
+                sent = False
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    sent = True
+                    resp = conn.getresponse()
+                    data = resp.read()
+                except (http.client.HTTPException, ConnectionError, ssl.SSLError, socket.timeout, OSError) as e:
+                    self._close_locked()
+                    # Retry once only when a reused keep-alive socket had been closed by the server:
+                    # the request could not be sent, or the server hung up without answering.
+                    # Never after a timeout: the host is alive and may already have acted on it
+                    stale = (isinstance(e, (BrokenPipeError, ConnectionResetError)) and not sent) or \
+                        isinstance(e, http.client.RemoteDisconnected)
+                    if reused and attempt == 0 and stale:
+                        continue
+                    raise
+                self._record_latency(endpoint or path, time.monotonic() - start)
+                if resp.will_close:
+                    self._close_locked()
+                return resp.status, resp.reason, data
+
+    def _close_locked(self):
+        if self._conn is not None:
+            try: self._conn.close()
+            except: pass
+            self._conn = None
+
+    def close(self):
+        """Closes the persistent connection"""
+        with self._lock:
+            self._close_locked()
+
+    def get_metrics(self) -> dict:
+        """Returns handshake count and per-endpoint latency (ms)"""
+        with self._lock:
+            endpoints = {
+                name: {
+                    'count': s['count'],
+                    'avg_ms': s['total_ms'] / s['count'] if s['count'] else 0.0,
+                    'last_ms': s['last_ms'],
+                }
+                for name, s in self._latency.items()
+            }
+            return {'handshakes': self.handshakes, 'endpoints': endpoints}
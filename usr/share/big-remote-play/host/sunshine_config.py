@@ -0,0 +1,84 @@
+"""
+Sunshine config diff: what a settings change needs from the running server
+"""
+
+from pathlib import Path
+
+NOOP = 'noop'
+LIVE = 'live'
+RESTART = 'restart'
+
+# Pseudo-key for the contents of apps.json
+APPS_KEY = 'apps.json'
+
+# Only read by Big Remote Play: the stream bitrate comes from Moonlight (capped by
+# max_bitrate) and the credentials are for our own API calls
+LOCAL_KEYS = frozenset({'bitrate', 'sunshine_user', 'sunshine_password'})
+# Sunshine re-reads its app list when an app is saved through the web API
+LIVE_KEYS = frozenset({APPS_KEY})
+
+
+def read_config(path: Path) -> dict:
+    """Parses sunshine.conf ('key = value' lines, no sections)"""
+    config = {}
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                if '=' not in line or line.lstrip().startswith('#'): continue
+                key, value = line.strip().split('=', 1)
+                config[key.strip()] = value.strip()
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error reading Sunshine config: {e}")
+    return config
+
+
+def classify(key: str) -> str:
+    if key in LOCAL_KEYS: return NOOP
+    if key in LIVE_KEYS: return LIVE
+    # Everything else is parsed once at startup
+    return RESTART
+
+
+class ConfigDiff:
+    """Changed keys between the config Sunshine loaded and the one on disk, by how they apply"""
+
+    def __init__(self, changes: dict = None):
+        self.changes = changes or {}  # key -> (old, new, kind)
+        self.restarted = False
+
+    def keys(self, kind: str) -> list:
+        return sorted(k for k, (_o, _n, c) in self.changes.items() if c == kind)
+
+    @property
+    def live(self) -> list:
+        return self.keys(LIVE)
+
+    @property
+    def restart(self) -> list:
+        return self.keys(RESTART)
+
+    @property
+    def noop(self) -> list:
+        return self.keys(NOOP)
+
+    @property
+    def needs_restart(self) -> bool:
+        return any(c == RESTART for _o, _n, c in self.changes.values())
+
+    def __bool__(self):
+        return any(c != NOOP for _o, _n, c in self.changes.values())
+
+    def __repr__(self):
+        return f"ConfigDiff(live={self.live}, restart={self.restart}, noop={self.noop})"
+
+
+def diff_config(old: dict, new: dict) -> ConfigDiff:
+    """Compares two configs value by value (as Sunshine reads them: trimmed strings)"""
+    changes = {}
+    for key in old.keys() | new.keys():
+        o, n = old.get(key), new.get(key)
+        if (None if o is None else str(o).strip()) == (None if n is None else str(n).strip()): continue
+        changes[key] = (o, n, classify(key))
+    return ConfigDiff(changes)
@@ -0,0 +1,169 @@
+"""
+Incremental sunshine.log tailer with typed events
+"""
+
+import ipaddress
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# Event kinds
+CLIENT_CONNECTED = 'client_connected'
+CLIENT_DISCONNECTED = 'client_disconnected'
+ENCODER = 'encoder'
+FRAME_DROP = 'frame_drop'
+ERROR = 'error'
+READY = 'ready'
+
+# [2024-05-01 12:00:00.123]: Info: CLIENT CONNECTED
+_LINE_RE = re.compile(r'^\[(?P<ts>[^\]]+)\]:\s*(?P<level>Verbose|Debug|Info|Warning|Error|Fatal):\s*(?P<msg>.*)$')
+_ENCODER_RE = re.compile(r'Found (?P<codec>H\.264|HEVC|AV1) encoder: (?P<name>\S+) \[(?P<backend>\w+)\]')
+_DROP_RE = re.compile(r'dropp?ed (?:(?P<n1>\d+) )?frames?|(?P<n2>\d+)? ?frames? dropped', re.IGNORECASE)
+_IP_RE = re.compile(r'(\d{1,3}(?:\.\d{1,3}){3}|[0-9a-fA-F]{0,4}(?::[0-9a-fA-F]{0,4}){2,7})')
+# Dynamic loader / socket errors are printed without Sunshine's prefix
+_RAW_ERRORS = ('error while loading shared libraries', 'symbol lookup error', 'Address already in use')
+
+
+@dataclass
+class SunshineLogEvent:
+    kind: str
+    message: str
+    level: str = ''
+    timestamp: str = ''
+    ip: Optional[str] = None
+    detail: dict = field(default_factory=dict)
+
+
+def parse_log_line(line: str) -> Optional[SunshineLogEvent]:
+    """Classifies one sunshine.log line; returns None for uninteresting lines"""
+    line = line.rstrip('\n')
+    m = _LINE_RE.match(line)
+    if not m:
+        if any(e in line for e in _RAW_ERRORS):
+            return SunshineLogEvent(ERROR, line.strip(), level='Fatal')
+        return None
+
+    level, msg, ts = m.group('level'), m.group('msg'), m.group('ts')
+    ip = None
+    for candidate in _IP_RE.findall(msg):
+        try: ip = str(ipaddress.ip_address(candidate)); break
+        except ValueError: continue
+
+    # Printed once the web server (and so the API) is listening
+    if 'Configuration UI available at' in msg:
+        return SunshineLogEvent(READY, msg, level, ts)
+    if 'CLIENT CONNECTED' in msg or 'New streaming session started' in msg:
+        return SunshineLogEvent(CLIENT_CONNECTED, msg, level, ts, ip)
+    if 'CLIENT DISCONNECTED' in msg:
+        return SunshineLogEvent(CLIENT_DISCONNECTED, msg, level, ts, ip)
+    enc = _ENCODER_RE.search(msg)
+    if enc:
+        return SunshineLogEvent(ENCODER, msg, level, ts, detail=enc.groupdict())
+    drop = _DROP_RE.search(msg)
+    if drop:
+        n = drop.group('n1') or drop.group('n2')
+        return SunshineLogEvent(FRAME_DROP, msg, level, ts, ip, {'frames': int(n) if n else 1})
+    if level in ('Error', 'Fatal') or any(e in msg for e in _RAW_ERRORS):
+        return SunshineLogEvent(ERROR, msg, level, ts, ip)
+    return None
+
+
+class SunshineLogTailer:
+    """
+    Follows sunshine.log from a byte offset (seek-and-poll: one stat() per
+    interval, only new bytes are read), parses new lines and dispatches the
+    events to subscribers. Truncation and rotation reopen the file from 0.
+
+    Callbacks run on the tailer thread; UI code must hop to GLib.idle_add.
+    """
+
+    def __init__(self, path: Path, poll_interval: float = 0.25):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self._subs = {}
+        self._next_token = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def subscribe(self, callback: Callable[[SunshineLogEvent], None], kinds=None) -> int:
+        """Registers callback(event) for the given kinds (None = all). Returns a token"""
+        with self._lock:
+            self._next_token += 1
+            self._subs[self._next_token] = (callback, set(kinds) if kinds else None)
+            return self._next_token
+
+    def unsubscribe(self, token: int):
+        with self._lock:
+            self._subs.pop(token, None)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, offset: int = None):
+        """Starts following from `offset` (default: current end of file)"""
+        self.stop()
+        if offset is None:
+            try: offset = self.path.stat().st_size
+            except OSError: offset = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(offset,), name="SunshineLogTailer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _dispatch(self, event: SunshineLogEvent):
+        with self._lock:
+            subs = list(self._subs.values())
+        for callback, kinds in subs:
+            if kinds is None or event.kind in kinds:
+                try: callback(event)
+                except Exception as e: print(f"DEBUG: SunshineLogTailer subscriber failed: {e}")
+
+    def _run(self, offset: int):
+        f = None; inode = None; partial = b''
+        while not self._stop.is_set():
+            try:
+                st = os.stat(self.path)
+                if f is None or st.st_ino != inode or st.st_size < offset:
+                    # First open, rotation or truncation
+                    if f is not None:
+                        f.close(); offset = 0; partial = b''
+                    f = open(self.path, 'rb'); inode = st.st_ino
+                    f.seek(min(offset, st.st_size)); offset = f.tell()
+                if st.st_size > offset:
+                    data = f.read(st.st_size - offset)
+                    offset += len(data)
+                    *lines, partial = (partial + data).split(b'\n')
+                    for raw in lines:
+                        event = parse_log_line(raw.decode(errors='replace'))
+                        if event: self._dispatch(event)
+            except FileNotFoundError:
+                if f: f.close()
+                f = None; inode = None; offset = 0; partial = b''
+            except OSError as e:
+                print(f"DEBUG: SunshineLogTailer read failed: {e}")
+            self._stop.wait(self.poll_interval)
+        if f: f.close()
+
+    @staticmethod
+    def read_events(path: Path, offset: int = 0, max_bytes: int = 1024 * 1024) -> List[SunshineLogEvent]:
+        """Parses the events written after `offset` (at most the last `max_bytes`) without a tailer"""
+        events = []
+        try:
+            with open(path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(offset, size - max_bytes))
+                for raw in f.read().split(b'\n'):
+                    event = parse_log_line(raw.decode(errors='replace'))
+                    if event: events.append(event)
+        except OSError:
+            pass
+        return events
@@ -1,12 +1,31 @@
-import subprocess, signal, os, shutil
+import subprocess, signal, os, shutil, select, socket, time
 from pathlib import Path
 from utils.i18n import _
+from .sunshine_api import SunshineAPIClient
+from .sunshine_log import SunshineLogTailer, ERROR, READY
+from .sunshine_config import APPS_KEY, ConfigDiff, diff_config, read_config
+from utils.bandwidth import BandwidthServer
+from utils.system_check import ProcessSnapshot
+from utils.persistence import atomic_write, flush_all
 class SunshineHost:
+    # Longest start() waits for Sunshine to serve; still alive after that counts as started
+    # (it may still be probing encoders)
+    READY_TIMEOUT = 2.0
+
     def __init__(self, cdir: Path = None):
         self.config_dir = cdir or (Path.home() / '.config' / 'big-remoteplay' / 'sunshine')
         self.config_dir.mkdir(parents=True, exist_ok=True)
         self.process = None
         self.pid = None
+        # Shared keep-alive client for the local web API (port 47990)
+        self.api = SunshineAPIClient()
+        # Throughput/jitter/loss probe target for guests' "Detect" button
+        self.bandwidth_server = BandwidthServer()
+        # Typed events from sunshine.log (client connect/disconnect, encoder, errors)
+        self.log = SunshineLogTailer(self.config_dir / 'sunshine.log')
+        self.last_start_errors = []
+        # Config (and apps.json) the running process was started with; None if not ours
+        self.loaded_config = None
         
     def start(self, **kwargs):
         if self.is_running():
@@ -47,7 +66,11 @@ class SunshineHost:
             
             # Start process redirecting logs to file
             log_path = self.config_dir / 'sunshine.log'
+            launch_config = self._current_config()
             self.log_file = open(log_path, 'a')
+            # Only what this run writes is scanned/followed, never the whole file
+            log_offset = os.path.getsize(log_path)
+            self.last_start_errors = []
             
             self.process = subprocess.Popen(
                 cmd,
@@ -60,28 +83,23 @@ class SunshineHost:
             )
             
             self.pid = self.process.pid
+            ProcessSnapshot.invalidate()
             
             # Check if process died immediately (e.g. library error)
-            try:
-                # Wait a bit to see if startup fails
-                print("DEBUG: SunshineHost.start - process started, waiting for exit")
-                exit_code = self.process.wait(timeout=2.0)
+            print("DEBUG: SunshineHost.start - process started, waiting until ready")
+            state = self._wait_ready(log_path, log_offset, self.READY_TIMEOUT)
+            if state == 'exited':
+                exit_code = self.process.wait()
                 
                 # If reached here, process ended (failed)
                 self.log_file.flush()
-                # Try to read the error from the log
+                # Try to read the error from what this run logged
                 error_detail = ""
-                try:
-                    with open(log_path, 'r') as f:
-                        lines = f.readlines()
-                        if lines:
-                            # Look for shared library errors in the last 10 lines
-                            for line in lines[-10:]:
-                                if "error while loading shared libraries" in line or "symbol lookup error" in line:
-                                    error_detail = line.strip()
-                                    break
-                except:
-                    pass
+                self.last_start_errors = [e.message for e in SunshineLogTailer.read_events(log_path, log_offset) if e.kind == ERROR]
+                for line in self.last_start_errors:
+                    if "error while loading shared libraries" in line or "symbol lookup error" in line:
+                        error_detail = line
+                        break
 
                 self.log_file.write(_("Sunshine failed to start (Exit code {}).\n").format(exit_code))
                 if error_detail:
@@ -92,23 +110,63 @@ class SunshineHost:
                 self.process = None
                 self.pid = None
                 return False
-                
-            except subprocess.TimeoutExpired:
-                # Process continues running after timeout, success!
-                pass            
+            if state == 'timeout':
+                print("DEBUG: SunshineHost.start - still starting, not serving yet")
             
             # Save PID
             pid_file = self.config_dir / 'sunshine.pid'
             with open(pid_file, 'w') as f:
                 f.write(str(self.pid))
                 
+            self.loaded_config = launch_config
             print(_("Sunshine started (PID: {})").format(self.pid))
+            self.log.start(log_offset)
+            self.bandwidth_server.start()
             return True
             
         except Exception as e:
             print(_("Error starting Sunshine: {}").format(e))
             return False
             
+    def _wait_ready(self, log_path: Path, log_offset: int, timeout: float) -> str:
+        """
+        Blocks until the new process serves its web API ('ready'), exits
+        ('exited') or `timeout` passes ('timeout'). Exit wakes the wait at
+        once through a pidfd; readiness is a TCP connect to the API port or
+        the 'Configuration UI available' log line, checked every 50 ms.
+        """
+        deadline = time.monotonic() + timeout
+        pidfd = None
+        try: pidfd = os.pidfd_open(self.process.pid)
+        except (AttributeError, OSError): pass  # Python < 3.9 / kernel < 5.3: poll()
+        try:
+            while True:
+                if self.process.poll() is not None: return 'exited'
+                if self._api_port_open() or any(e.kind == READY for e in SunshineLogTailer.read_events(log_path, log_offset)):
+                    return 'ready'
+                left = deadline - time.monotonic()
+                if left <= 0: return 'timeout'
+                if pidfd is not None: select.select([pidfd], [], [], min(0.05, left))
+                else: time.sleep(min(0.05, left))
+        finally:
+            if pidfd is not None: os.close(pidfd)
+
+    def _api_port_open(self) -> bool:
+        try:
+            with socket.create_connection((self.api.host, self.api.port), timeout=0.05):
+                return True
+        except OSError:
+            return False
+
+    def wait_stopped(self, timeout: float = 2.0) -> bool:
+        """Waits (polling /proc) until no Sunshine process is left, instead of a fixed sleep"""
+        deadline = time.monotonic() + timeout
+        while True:
+            ProcessSnapshot.invalidate()
+            if not self.is_running(): return True
+            if time.monotonic() >= deadline: return False
+            time.sleep(0.05)
+
     def stop(self) -> bool:
         """Stops Sunshine server"""
         if not self.is_running():
@@ -148,12 +206,19 @@ class SunshineHost:
                 try: self.log_file.close()
                 except: pass
                 del self.log_file
+            
+            # Drop the keep-alive API connection to the old instance
+            self.api.close()
+            self.bandwidth_server.stop()
+            self.log.stop()
                     
             pid_file = self.config_dir / 'sunshine.pid'
             if pid_file.exists(): pid_file.unlink()
+            ProcessSnapshot.invalidate()
                 
             self.process = None
             self.pid = None
+            self.loaded_config = None
             return True
         except Exception as e:
             print(f"Error in stop: {e}")
@@ -187,15 +252,8 @@ class SunshineHost:
                 pid_file.unlink()
                 return False
                 
-        # Check via pgrep
-        try:
-            result = subprocess.run(
-                ['pgrep', '-x', 'sunshine'],
-                capture_output=True
-            )
-            return result.returncode == 0
-        except:
-            return False
+        # Check the shared /proc snapshot (same match as pgrep -x)
+        return bool(ProcessSnapshot.find('sunshine'))
             
     def get_status(self) -> dict:
         """Gets server status"""
@@ -225,8 +283,7 @@ class SunshineHost:
                 "apps": apps_list
             }
             
-            with open(apps_file, 'w') as f:
-                json.dump(data, f, indent=4)
+            atomic_write(apps_file, json.dumps(data, indent=4))
                 
             return True
         except Exception as e:
@@ -242,19 +299,11 @@ class SunshineHost:
         """
         try:
             config_file = self.config_dir / 'sunshine.conf'
+            # Preference edits still waiting for their batched write land first
+            flush_all()
             
             # Load existing config
-            current_config = {}
-            if config_file.exists():
-                try:
-                    with open(config_file, 'r') as f:
-                        for line in f:
-                            if '=' in line:
-                                parts = line.strip().split('=', 1)
-                                if len(parts) == 2:
-                                    current_config[parts[0].strip()] = parts[1].strip()
-                except Exception as e:
-                    print(f"Error reading existing config: {e}")
+            current_config = read_config(config_file)
             
             # Update with new settings
             current_config.update(settings)
@@ -263,10 +312,8 @@ class SunshineHost:
             if 'apps_file' not in current_config:
                 current_config['apps_file'] = 'apps.json'
             
-            # Save merged config
-            with open(config_file, 'w') as f:
-                for key, value in current_config.items():
-                    f.write(f"{key} = {value}\n")
+            # Save merged config (atomically: Sunshine may read it at any time)
+            atomic_write(config_file, ''.join(f"{key} = {value}\n" for key, value in current_config.items()))
                     
             return True
             
@@ -274,59 +321,86 @@ class SunshineHost:
             print(f"Error configuring Sunshine: {e}")
             return False
 
+    def _current_config(self) -> dict:
+        """sunshine.conf plus apps.json as they are on disk now"""
+        config = read_config(self.config_dir / 'sunshine.conf')
+        try: config[APPS_KEY] = (self.config_dir / 'apps.json').read_text()
+        except OSError: pass
+        return config
+
+    def apply_config(self, settings: dict = None, auth=None, restart: bool = True) -> ConfigDiff:
+        """
+        Writes `settings` (if any) to sunshine.conf and brings a running
+        Sunshine in line with the files with the least disruption: nothing
+        for unchanged or local-only keys, an API call for live ones, and a
+        restart (dropping guests) only when a startup-only key changed.
+        With restart=False such changes are left pending.
+
+        Returns the ConfigDiff against the running config; `restarted` tells
+        whether the server was restarted.
+        """
+        if settings:
+            self.configure(settings)
+        else:
+            flush_all()
+        if not self.is_running():
+            return ConfigDiff()  # The next start reads the files anyway
+        current = self._current_config()
+        # A Sunshine we did not start may be running anything: only a restart is safe
+        diff = diff_config(self.loaded_config if self.loaded_config is not None else {}, current)
+        print(f"DEBUG: SunshineHost.apply_config - {diff}")
+        if diff.needs_restart:
+            if restart:
+                diff.restarted = self.restart()
+            return diff
+        if APPS_KEY in diff.live:
+            if self.reload_apps(auth):
+                # Sunshine re-saves apps.json in its own format: keep that text as the baseline
+                current = self._current_config()
+            else:
+                # Retried on the next apply
+                current[APPS_KEY] = (self.loaded_config or {}).get(APPS_KEY)
+        self.loaded_config = current
+        return diff
+
+    def reload_apps(self, auth=None) -> bool:
+        """Makes the running Sunshine re-read apps.json without a restart"""
+        import json
+        try:
+            apps = json.loads((self.config_dir / 'apps.json').read_text()).get('apps', [])
+        except Exception as e:
+            print(f"DEBUG: reload_apps - cannot read apps.json: {e}")
+            return False
+        if not apps: return False
+        # Sunshine refreshes its whole app list whenever one app is saved through
+        # the API: saving the first entry unchanged picks up the rest of the file
+        body = json.dumps(dict(apps[0], index=0)).encode('utf-8')
+        try:
+            status, reason, _body = self.api.request('POST', '/api/apps', body=body, auth=auth, timeout=5)
+        except Exception as e:
+            print(f"DEBUG: reload_apps failed: {e}")
+            return False
+        if status != 200:
+            print(f"DEBUG: reload_apps - API Error: {status} - {reason}")
+        return status == 200
+
     def send_pin(self, pin: str, auth: tuple[str, str] = None) -> tuple[bool, str]:
         """Sends PIN to Sunshine via API"""
-        import urllib.request, ssl, json, base64
-        
-        # Use 127.0.0.1 to avoid IPv6 (::1) issues if Sunshine binds to 0.0.0.0
-        url = "https://127.0.0.1:47990/api/pin"
-        headers = {
-            "Content-Type": "application/json",
-        }
-        
-        if auth:
-            username, password = auth
-            auth_str = f"{username}:{password}"
-            b64_auth = base64.b64encode(auth_str.encode()).decode()
-            headers["Authorization"] = f"Basic {b64_auth}"
-        
-        ctx = ssl._create_unverified_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        try:
-             # Fix for legacy server support or specific SSL options
-             ctx.options |= 0x4  # ssl.OP_LEGACY_SERVER_CONNECT
-        except: pass
-        
+        import json
         try:
             data = json.dumps({"pin": pin}).encode('utf-8')
-            req = urllib.request.Request(url, data=data, headers=headers, method='POST')
-            
-            with urllib.request.urlopen(req, context=ctx, timeout=5) as response:
-                if response.status == 200:
-                    return True, _("PIN sent successfully")
-                return False, f"HTTP Status {response.status}"
-                
-        except urllib.error.HTTPError as e:
-            if e.code == 401:
+            status, reason, _body = self.api.request('POST', '/api/pin', body=data, auth=auth, timeout=5)
+            if status == 200:
+                return True, _("PIN sent successfully")
+            if status == 401:
                 return False, _("Authentication Failed. Configure a user in Sunshine.")
-            return False, _("API Error: {} - {}").format(e.code, e.reason)
+            return False, _("API Error: {} - {}").format(status, reason)
         except Exception as e:
             return False, _("Connection Error: {}").format(e)
 
     def create_user(self, username, password) -> tuple[bool, str]:
         """Creates new admin user in Sunshine via API"""
-        import urllib.request, ssl, json
-        
-        url = "https://127.0.0.1:47990/api/users"
-        headers = {
-            "Content-Type": "application/json",
-        }
-        
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        
+        import json
         try:
             # Try sending password confirmation too, as error 400 suggests missing fields.
             # Based on web form that requires confirmation.
@@ -337,18 +411,14 @@ class SunshineHost:
                 "confirmPasswordInput": password 
             }
             data = json.dumps(data_dict).encode('utf-8')
-            req = urllib.request.Request(url, data=data, headers=headers, method='POST')
-            
-            with urllib.request.urlopen(req, context=ctx, timeout=5) as response:
-                if response.status == 200:
-                    return True, _("User created successfully")
-                return False, f"HTTP Status {response.status}"
-                
-        except urllib.error.HTTPError as e:
-            msg = e.read().decode('utf-8') if e.fp else e.reason
-            return False, _("API Error: {} - {}").format(e.code, msg)
+            status, reason, body = self.api.request('POST', '/api/users', body=data, timeout=5)
+            if status == 200:
+                return True, _("User created successfully")
+            msg = body.decode('utf-8', errors='replace') if body else reason
+            return False, _("API Error: {} - {}").format(status, msg)
         except Exception as e:
             return False, _("Connection Error: {}").format(e)
+
     def terminate_session(self, session_id: str, auth: tuple[str, str] = None) -> bool:
         """Terminates a specific session via Sunshine API"""
         if not session_id:
@@ -356,98 +426,66 @@ class SunshineHost:
              return False
 
         print(f"DEBUG: SunshineManager.terminate_session called for ID: {session_id}")
-        import urllib.request, ssl, base64
-        
-        # Use 127.0.0.1 to avoid IPv6 issues
-        url = f"https://127.0.0.1:47990/api/sessions/{session_id}"
-        print(f"DEBUG: Sending DELETE to {url}")
-        
-        headers = {}
-        if auth:
-            u, p = auth
-            headers["Authorization"] = f"Basic {base64.b64encode(f'{u}:{p}'.encode()).decode()}"
-        
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        
+        path = f"/api/sessions/{session_id}"
+        print(f"DEBUG: Sending DELETE to {path}")
         try:
-            req = urllib.request.Request(url, headers=headers, method='DELETE')
-            with urllib.request.urlopen(req, context=ctx, timeout=5) as response:
-                print(f"DEBUG: Terminate response code: {response.status}")
-                return response.status in [200, 204]
+            status, _reason, _body = self.api.request('DELETE', path, auth=auth, timeout=5, endpoint='/api/sessions/<id>')
+            print(f"DEBUG: Terminate response code: {status}")
+            return status in [200, 204]
         except Exception as e:
             print(f"Error terminating session {session_id}: {e}")
             return False
 
     def get_performance_stats(self, auth=None) -> dict:
         """Fetches performance stats from Sunshine API"""
-        import urllib.request, ssl, json, base64
-        url = "https://127.0.0.1:47990/api/stats"
-        headers = {"Content-Type": "application/json"}
-        if auth:
-            u, p = auth
-            headers["Authorization"] = f"Basic {base64.b64encode(f'{u}:{p}'.encode()).decode()}"
-        
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        
+        import json
         try:
-            req = urllib.request.Request(url, headers=headers, method='GET')
-            with urllib.request.urlopen(req, context=ctx, timeout=2) as r:
-                body = r.read().decode('utf-8')
-                return json.loads(body)
-        except urllib.error.HTTPError as e:
-            if e.code == 404: 
-                # Endpoint doesn't exist on this version, silent fail
-                return {}
-            if e.code == 401: 
-                print("DEBUG: Sunshine API 401 Unauthorized - Check credentials")
-            else: 
-                print(f"DEBUG: Sunshine API HTTP Error (stats): {e.code} - {e.reason}")
+            status, reason, body = self.api.request('GET', '/api/stats', auth=auth, timeout=2)
+        except Exception:
             return {}
-        except Exception as e:
+        if status == 200:
+            try: return json.loads(body.decode('utf-8'))
+            except Exception: return {}
+        if status == 404:
+            # Endpoint doesn't exist on this version, silent fail
             return {}
+        if status == 401:
+            print("DEBUG: Sunshine API 401 Unauthorized - Check credentials")
+        else:
+            print(f"DEBUG: Sunshine API HTTP Error (stats): {status} - {reason}")
+        return {}
 
     def get_active_sessions(self, auth=None) -> list:
         """Fetches active sessions from Sunshine API"""
-        import urllib.request, ssl, json, base64
-        url = "https://127.0.0.1:47990/api/sessions"
-        headers = {"Content-Type": "application/json"}
-        if auth:
-            u, p = auth
-            headers["Authorization"] = f"Basic {base64.b64encode(f'{u}:{p}'.encode()).decode()}"
-        
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        
+        import json
         try:
-            req = urllib.request.Request(url, headers=headers, method='GET')
-            with urllib.request.urlopen(req, context=ctx, timeout=2) as r:
-                body = r.read().decode('utf-8')
-                # print(f"DEBUG: Sunshine API Response (sessions): {body}")
-                data = json.loads(body)
-                # Handle different Sunshine versions response format
-                if isinstance(data, dict): return data.get('sessions', [])
-                return data if isinstance(data, list) else []
-        except urllib.error.HTTPError as e:
-            if e.code == 404:
-                # Try fallback for older Sunshine versions
-                try:
-                    url_fallback = "https://127.0.0.1:47990/api/clients/list"
-                    req = urllib.request.Request(url_fallback, headers=headers, method='GET')
-                    with urllib.request.urlopen(req, context=ctx, timeout=2) as r:
-                        data = json.loads(r.read().decode('utf-8'))
-                        if isinstance(data, dict):
-                            # In older versions, connected clients are in 'clients' and have a 'connected' flag
-                            clients = data.get('clients', [])
-                            return [c for c in clients if c.get('connected')]
-                        return data if isinstance(data, list) else []
-                except: return []
-            if e.code == 401: print("DEBUG: Sunshine API 401 Unauthorized (sessions)")
-            else: print(f"DEBUG: Sunshine API HTTP Error (sessions): {e.code} - {e.reason}")
-            return []
-        except Exception as e:
+            status, reason, body = self.api.request('GET', '/api/sessions', auth=auth, timeout=2)
+        except Exception:
             return []
+        if status == 200:
+            try:
+                data = json.loads(body.decode('utf-8'))
+            except Exception:
+                return []
+            # Handle different Sunshine versions response format
+            if isinstance(data, dict): return data.get('sessions', [])
+            return data if isinstance(data, list) else []
+        if status == 404:
+            # Try fallback for older Sunshine versions
+            try:
+                status, _reason, body = self.api.request('GET', '/api/clients/list', auth=auth, timeout=2)
+                if status != 200: return []
+                data = json.loads(body.decode('utf-8'))
+                if isinstance(data, dict):
+                    # In older versions, connected clients are in 'clients' and have a 'connected' flag
+                    clients = data.get('clients', [])
+                    return [c for c in clients if c.get('connected')]
+                return data if isinstance(data, list) else []
+            except: return []
+        if status == 401: print("DEBUG: Sunshine API 401 Unauthorized (sessions)")
+        else: print(f"DEBUG: Sunshine API HTTP Error (sessions): {status} - {reason}")
+        return []
+
+    def get_api_metrics(self) -> dict:
+        """Returns API client metrics (TLS handshakes and per-endpoint latency)"""
+        return self.api.get_metrics()
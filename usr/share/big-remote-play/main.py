@@ -5,6 +5,7 @@ from gi.repository import Gtk, Adw, Gio, GLib, Gdk
 from pathlib import Path
 from ui.main_window import MainWindow
 from utils.config import Config
+from utils.persistence import flush_all
 from utils.logger import Logger
 
 from utils.i18n import _
@@ -95,8 +96,12 @@ class BigRemotePlayApp(Adw.Application):
                 print("DEBUG: Reloading HostView settings from Preferences")
                 # Reload config from file first if needed
                 if hasattr(self.window.host_view, 'config') and hasattr(self.window.host_view.config, 'load'):
-                    self.window.host_view.config.load()
+                    # Batched edits of the preferences' config instance reach the file first
+                    flush_all()
+                    self.window.host_view.config.config = self.window.host_view.config.load()
                 self.window.host_view.load_settings()
+                # Sunshine page edits reach the running server (restart only if a startup-only key changed)
+                self.window.host_view.apply_sunshine_preferences()
         
         pref_win.connect('close-request', on_close)
         pref_win.present()
@@ -104,6 +109,8 @@ class BigRemotePlayApp(Adw.Application):
     def do_shutdown(self):
         try: Adw.Application.do_shutdown(self)
         except: pass
+        # os._exit skips atexit: write batched config changes now
+        flush_all()
         os._exit(0)
 
 def main():
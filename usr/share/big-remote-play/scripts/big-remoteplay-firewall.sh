@@ -1,6 +1,6 @@
 #!/bin/bash
 
-SUNSHINE_PORTS="47984:47990/tcp 48010/tcp 47998:48000/udp 48011/udp"
+SUNSHINE_PORTS="47984:47990/tcp 48010/tcp 47998:48000/udp 48011/udp 48100/tcp 48100/udp"
 
 configure_ufw() {
     echo "🔥 Configurando UFW..."
@@ -35,11 +35,15 @@ configure_iptables() {
     iptables -A INPUT -p tcp --dport 48010 -j ACCEPT -m comment --comment "Big Remote Play"
     iptables -A INPUT -p udp --dport 47998:48000 -j ACCEPT -m comment --comment "Big Remote Play"
     iptables -A INPUT -p udp --dport 48011 -j ACCEPT -m comment --comment "Big Remote Play - PIN"
+    iptables -A INPUT -p tcp --dport 48100 -j ACCEPT -m comment --comment "Big Remote Play - Bandwidth"
+    iptables -A INPUT -p udp --dport 48100 -j ACCEPT -m comment --comment "Big Remote Play - Bandwidth"
     
     ip6tables -A INPUT -p tcp --dport 47984:47990 -j ACCEPT -m comment --comment "Big Remote Play"
     ip6tables -A INPUT -p tcp --dport 48010 -j ACCEPT -m comment --comment "Big Remote Play"
     ip6tables -A INPUT -p udp --dport 47998:48000 -j ACCEPT -m comment --comment "Big Remote Play"
     ip6tables -A INPUT -p udp --dport 48011 -j ACCEPT -m comment --comment "Big Remote Play - PIN"
+    ip6tables -A INPUT -p tcp --dport 48100 -j ACCEPT -m comment --comment "Big Remote Play - Bandwidth"
+    ip6tables -A INPUT -p udp --dport 48100 -j ACCEPT -m comment --comment "Big Remote Play - Bandwidth"
     
     # Permitir tráfego em interfaces virtuais (VPNs, ZeroTier)
     iptables -A INPUT -i tun+ -j ACCEPT -m comment --comment "Allow VPN/Tunnel"
@@ -72,11 +76,15 @@ remove_iptables() {
     iptables -D INPUT -p tcp --dport 48010 -j ACCEPT -m comment --comment "Big Remote Play" 2>/dev/null || true
     iptables -D INPUT -p udp --dport 47998:48000 -j ACCEPT -m comment --comment "Big Remote Play" 2>/dev/null || true
     iptables -D INPUT -p udp --dport 48011 -j ACCEPT -m comment --comment "Big Remote Play - PIN" 2>/dev/null || true
+    iptables -D INPUT -p tcp --dport 48100 -j ACCEPT -m comment --comment "Big Remote Play - Bandwidth" 2>/dev/null || true
+    iptables -D INPUT -p udp --dport 48100 -j ACCEPT -m comment --comment "Big Remote Play - Bandwidth" 2>/dev/null || true
     
     ip6tables -D INPUT -p tcp --dport 47984:47990 -j ACCEPT -m comment --comment "Big Remote Play" 2>/dev/null || true
     ip6tables -D INPUT -p tcp --dport 48010 -j ACCEPT -m comment --comment "Big Remote Play" 2>/dev/null || true
     ip6tables -D INPUT -p udp --dport 47998:48000 -j ACCEPT -m comment --comment "Big Remote Play" 2>/dev/null || true
     ip6tables -D INPUT -p udp --dport 48011 -j ACCEPT -m comment --comment "Big Remote Play - PIN" 2>/dev/null || true
+    ip6tables -D INPUT -p tcp --dport 48100 -j ACCEPT -m comment --comment "Big Remote Play - Bandwidth" 2>/dev/null || true
+    ip6tables -D INPUT -p udp --dport 48100 -j ACCEPT -m comment --comment "Big Remote Play - Bandwidth" 2>/dev/null || true
     
     echo "✅ Regras iptables removidas"
 }
@@ -117,6 +125,7 @@ Portas configuradas:
   TCP 47984-47990   (Controle Sunshine)
   TCP 48010          (Streaming de vídeo)
   UDP 47998-48000   (Streaming de dados)
+  TCP/UDP 48100     (Teste de banda)
 
 Nota: Este script requer privilégios de root
 EOF
@@ -147,6 +147,7 @@ if command -v ufw &> /dev/null; then
         ufw allow 47984:47990/tcp comment "Sunshine Control"
         ufw allow 48010/tcp comment "Sunshine Streaming"
         ufw allow 47998:48000/udp comment "Sunshine Streaming"
+        ufw allow 48100 comment "Big Remote Play - Bandwidth"
         echo "✅ Regras de firewall configuradas"
     fi
 fi
@@ -7,6 +7,7 @@ echo "Starting firewall configuration for BigRemotePlay..."
 # Sunshine Ports:
 # TCP Range: 47984-48020 (Include potential dynamic ports)
 # UDP Range: 47998-48020 (Include potential dynamic ports)
+# Bandwidth test: 48100 TCP/UDP
 TCP_START="47984"
 TCP_END="48020"
 UDP_START="47998"
@@ -18,6 +19,8 @@ if command -v firewall-cmd &> /dev/null; then
     firewall-cmd --permanent --add-port=${UDP_START}-${UDP_END}/udp
     firewall-cmd --permanent --add-port=47990/tcp
     firewall-cmd --permanent --add-port=48011/udp
+    firewall-cmd --permanent --add-port=48100/tcp
+    firewall-cmd --permanent --add-port=48100/udp
     firewall-cmd --permanent --add-port=1900/udp
     firewall-cmd --permanent --add-port=5353/udp
     firewall-cmd --reload
@@ -28,6 +31,8 @@ elif command -v ufw &> /dev/null; then
     ufw allow ${UDP_START}:${UDP_END}/udp
     ufw allow 47990/tcp
     ufw allow 48011/udp
+    ufw allow 48100/tcp
+    ufw allow 48100/udp
     ufw allow 1900/udp
     ufw allow 5353/udp
     ufw reload
@@ -39,6 +44,8 @@ else
     iptables -I INPUT -p tcp --dport 47990 -j ACCEPT
     ip6tables -I INPUT -p tcp --dport ${TCP_START}:${TCP_END} -j ACCEPT
     ip6tables -I INPUT -p tcp --dport 47990 -j ACCEPT
+    iptables -I INPUT -p tcp --dport 48100 -j ACCEPT
+    ip6tables -I INPUT -p tcp --dport 48100 -j ACCEPT
     # UDP
     iptables -I INPUT -p udp --dport ${UDP_START}:${UDP_END} -j ACCEPT
     iptables -I INPUT -p udp --dport 48011 -j ACCEPT
@@ -46,6 +53,8 @@ else
     ip6tables -I INPUT -p udp --dport ${UDP_START}:${UDP_END} -j ACCEPT
     ip6tables -I INPUT -p udp --dport 48011 -j ACCEPT
     ip6tables -I INPUT -p udp --dport 1900 -j ACCEPT
+    iptables -I INPUT -p udp --dport 48100 -j ACCEPT
+    ip6tables -I INPUT -p udp --dport 48100 -j ACCEPT
     # mDNS
     iptables -I INPUT -p udp --dport 5353 -j ACCEPT
     ip6tables -I INPUT -p udp --dport 5353 -j ACCEPT
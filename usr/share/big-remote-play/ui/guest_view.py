@@ -12,6 +12,7 @@ from guest.moonlight_client import MoonlightClient
 from utils.i18n import _
 from utils.icons import create_icon_widget
 from utils.moonlight_config import MoonlightConfigManager
+from utils.mdns import AvahiServiceBrowser
 
 class GuestView(Gtk.Box):
     def __init__(self):
@@ -33,17 +34,47 @@ class GuestView(Gtk.Box):
         self.moonlight_config = MoonlightConfigManager()
         self.moonlight = MoonlightClient(logger=self.logger)
         self.setup_ui()
+        # Live mDNS cache: the discover page renders from it without blocking
+        self._hosts_source = None
+        self.mdns_browser = AvahiServiceBrowser(on_change=self._on_mdns_hosts_changed)
+        self.mdns_browser.start()
         self.discover_hosts()
         GLib.timeout_add(1000, self.monitor_connection)
         
+    def _get_target_host_ip(self):
+        """IP of the host selected on the active connection page (None if unknown)"""
+        page = self.method_stack.get_visible_child_name()
+        if page == 'manual':
+            return self.manual_ip_entry.get_text().strip() or None
+        if self.selected_host_card_data:
+            return self.selected_host_card_data.get('ip')
+        return None
+
     def detect_bitrate(self, button=None):
+        ip = self._get_target_host_ip()
+        if not ip:
+            self.show_toast(_("Select a host to measure the connection"))
+            return
         self.show_toast(_("Detecting bandwidth..."))
+        # Widgets are only touched on the main thread
+        adj = self.bitrate_scale.get_adjustment()
+        lower, upper = adj.get_lower(), adj.get_upper()
         def run_detect():
-            import time, random
-            time.sleep(1.5)
-            val = random.randint(15, 80)
-            GLib.idle_add(lambda: self.bitrate_scale.set_value(val))
-            GLib.idle_add(lambda: self.show_toast(_("Suggested bitrate: {} Mbps").format(val)))
+            from utils.bandwidth import measure_bandwidth
+            try:
+                res = measure_bandwidth(ip)
+            except OSError as e:
+                print(f"DEBUG: Bandwidth test to {ip} failed: {e}")
+                GLib.idle_add(lambda: self.show_toast(_("Bandwidth test failed. Is the host sharing?")))
+                return
+            print(f"DEBUG: Bandwidth test {ip}: {res}")
+            val = round(max(lower, min(upper, res['suggested_mbps'])) * 2) / 2
+            def apply():
+                self.bitrate_scale.set_value(val)
+                self.show_toast(_("Suggested bitrate: {} Mbps (loss {:.1f}%, jitter {:.1f} ms)").format(
+                    val, res['loss'] * 100, res['jitter_ms']))
+                return False
+            GLib.idle_add(apply)
         threading.Thread(target=run_detect, daemon=True).start()
         
     def setup_ui(self):
@@ -53,7 +84,7 @@ class GuestView(Gtk.Box):
         
 
         from .performance_monitor import PerformanceMonitor
-        self.perf_monitor = PerformanceMonitor(); self.perf_monitor.set_visible(False)
+        self.perf_monitor = PerformanceMonitor(stream_stats=self.moonlight.stats); self.perf_monitor.set_visible(False)
         
         self.header = Adw.PreferencesGroup()
         self.header.set_title(_('Connect to Server'))
@@ -275,7 +306,7 @@ class GuestView(Gtk.Box):
         text_box.append(lbl)
         text_box.append(desc)
         
-        refresh = Gtk.Button(icon_name='view-refresh-symbolic'); refresh.connect('clicked', lambda b: self.discover_hosts())
+        refresh = Gtk.Button(icon_name='view-refresh-symbolic'); refresh.connect('clicked', lambda b: self.discover_hosts(force=True))
         header.append(text_box); header.append(refresh)
         self.hosts_list = Gtk.ListBox(); self.hosts_list.add_css_class('boxed-list'); self.hosts_list.set_selection_mode(Gtk.SelectionMode.NONE)
         for m in ['start', 'end']: getattr(self.hosts_list, f'set_margin_{m}')(12)
@@ -309,8 +340,47 @@ class GuestView(Gtk.Box):
         action.append(buttons_box); box.append(header); box.append(host_scroll); box.append(action)
         return box
 
-    def discover_hosts(self):
+    def discover_hosts(self, force=False):
+        # Invalidates callbacks from any scan still running
+        self._discovery_gen = getattr(self, '_discovery_gen', 0) + 1
+        gen = self._discovery_gen
+        if not force and self.mdns_browser.is_running():
+            self._hosts_source = 'mdns'
+            hosts = self.mdns_browser.get_hosts()
+            if hosts: self.update_hosts_list(hosts)
+            else:
+                # Browser just started or nothing announced: give mDNS a moment before scanning
+                self._show_hosts_loading()
+                GLib.timeout_add(1500, self._on_mdns_wait_timeout)
+            return
         from utils.network import NetworkDiscovery
+        self._hosts_source = 'scan'
+        self._show_hosts_loading()
+        streamed = set()
+        def on_host_found(host):
+            # Rows stream in above the spinner while the LAN scan is still running
+            if gen != self._discovery_gen or host['ip'] in streamed: return False
+            streamed.add(host['ip'])
+            row = self.create_host_row_custom(host)
+            self.hosts_list.insert(row, max(0, self.loading_row.get_index()))
+            self._probe_host_badges([(row, host)])
+            return False
+        def on_hosts_discovered(hosts):
+            if gen != self._discovery_gen: return False
+            if self.loading_row.get_parent(): self.hosts_list.remove(self.loading_row)
+            hosts = [h for h in hosts if h['ip'] not in streamed]
+            if not hosts and not streamed:
+                self._append_no_hosts_row()
+                # Nothing from the scan: let later mDNS announcements take over the list
+                if self.mdns_browser.is_running(): self._hosts_source = 'mdns'
+            else:
+                rows = [(self.create_host_row_custom(h), h) for h in hosts]
+                for row, _h in rows: self.hosts_list.append(row)
+                self._probe_host_badges(rows)
+            return False
+        NetworkDiscovery().discover_hosts(callback=on_hosts_discovered, on_host=on_host_found)
+
+    def _show_hosts_loading(self):
         self.first_radio_in_list = self.selected_host_card_data = None
         self._update_all_buttons_state()
         while row := self.hosts_list.get_row_at_index(0): self.hosts_list.remove(row)
@@ -322,27 +392,33 @@ class GuestView(Gtk.Box):
         lbl = Gtk.Label(label=_('Searching for hosts...')); lbl.add_css_class('title-2')
         box.append(spinner); box.append(lbl)
         self.loading_row.set_child(box); self.hosts_list.append(self.loading_row)
-        def on_hosts_discovered(hosts):
-            if self.loading_row.get_parent(): self.hosts_list.remove(self.loading_row)
-            self.first_radio_in_list = None
-            if not hosts:
-                row = Gtk.ListBoxRow(); row.set_selectable(False)
-                box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6); box.set_halign(Gtk.Align.CENTER); box.set_valign(Gtk.Align.CENTER)
-                box.set_size_request(-1, 150) # Match host_scroll min height
-                for m in ['top', 'bottom']: getattr(box, f'set_margin_{m}')(24)
-                icon = create_icon_widget('network-offline-symbolic', size=48, css_class='dim-label')
-                lbl = Gtk.Label(label=_('No hosts found')); lbl.add_css_class('title-2')
-                box.append(icon); box.append(lbl); row.set_child(box); self.hosts_list.append(row)
-            else:
-                for h in hosts: self.hosts_list.append(self.create_host_row_custom(h))
-            return False
-        NetworkDiscovery().discover_hosts(callback=on_hosts_discovered)
+
+    def _append_no_hosts_row(self):
+        row = Gtk.ListBoxRow(); row.set_selectable(False)
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6); box.set_halign(Gtk.Align.CENTER); box.set_valign(Gtk.Align.CENTER)
+        box.set_size_request(-1, 150) # Match host_scroll min height
+        for m in ['top', 'bottom']: getattr(box, f'set_margin_{m}')(24)
+        icon = create_icon_widget('network-offline-symbolic', size=48, css_class='dim-label')
+        lbl = Gtk.Label(label=_('No hosts found')); lbl.add_css_class('title-2')
+        box.append(icon); box.append(lbl); row.set_child(box); self.hosts_list.append(row)
+
+    def _on_mdns_wait_timeout(self):
+        if self._hosts_source == 'mdns' and not self.mdns_browser.get_hosts():
+            self.discover_hosts(force=True)
+        return False
+
+    def _on_mdns_hosts_changed(self, hosts):
+        """Avahi add/remove event (main loop)"""
+        if self._hosts_source != 'mdns': return
+        if hosts or self.mdns_browser.all_for_now:
+            self.update_hosts_list(hosts)
 
     def update_hosts_list(self, hosts):
+        # Keep the selection across live updates
+        prev_ip = self.selected_host_card_data['ip'] if self.selected_host_card_data else None
         # Clear
         self.first_radio_in_list = None
         self.selected_host_card_data = None
-        self.selected_host_card_data = None
         self._update_all_buttons_state()
         
         while True:
@@ -351,8 +427,16 @@ class GuestView(Gtk.Box):
                 break
             self.hosts_list.remove(row)
             
+        if not hosts:
+            self._append_no_hosts_row()
+            return
+        rows = []
         for host in hosts:
-            self.hosts_list.append(self.create_host_row_custom(host))
+            row = self.create_host_row_custom(host)
+            self.hosts_list.append(row)
+            if host['ip'] == prev_ip: row.host_radio.set_active(True)
+            rows.append((row, host))
+        self._probe_host_badges(rows)
 
     def create_host_row_custom(self, host):
         row = Gtk.ListBoxRow(); row.set_activatable(False)
@@ -370,7 +454,8 @@ class GuestView(Gtk.Box):
         info = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2); info.set_valign(Gtk.Align.CENTER)
         n = Gtk.Label(label=host['name']); n.set_halign(Gtk.Align.START); n.add_css_class('heading')
         i = Gtk.Label(label=host['ip']); i.set_halign(Gtk.Align.START); i.add_css_class('dim-label')
-        info.append(n); info.append(i); box.append(radio); box.append(icon); box.append(info)
+        badges = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        info.append(n); info.append(i); info.append(badges); box.append(radio); box.append(icon); box.append(info)
         
         spacer = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL); spacer.set_hexpand(True)
         box.append(spacer)
@@ -386,8 +471,33 @@ class GuestView(Gtk.Box):
         
         row.set_child(box)
         gesture = Gtk.GestureClick(); gesture.connect("pressed", lambda g, n, x, y: radio.set_active(True)); row.add_controller(gesture)
+        row.host_radio = radio
+        row.badges_box = badges
         return row
 
+    def _probe_host_badges(self, rows):
+        """Fills the paired/busy/running badges of host rows from a concurrent GameStream probe"""
+        rows_by_ip = {}
+        for row, host in rows:
+            rows_by_ip.setdefault(host['ip'], []).append(row)
+        if not rows_by_ip: return
+        def on_result(ip, info):
+            GLib.idle_add(lambda: [self._set_host_badges(r, info) for r in rows_by_ip.get(ip, [])] and False)
+        threading.Thread(target=self.moonlight.probe_hosts, args=(list(rows_by_ip), on_result), daemon=True).start()
+
+    def _set_host_badges(self, row, info):
+        if row.get_parent() is None: return
+        while child := row.badges_box.get_first_child(): row.badges_box.remove(child)
+        if not info: return
+        badges = []
+        if info['paired']: badges.append((_('Paired'), 'success'))
+        elif info['paired'] is False: badges.append((_('Not paired'), 'dim-label'))
+        if info['current_app']: badges.append((_('Running: {}').format(info['current_app']), 'accent'))
+        elif info['busy']: badges.append((_('Busy'), 'warning'))
+        for text, css in badges:
+            lbl = Gtk.Label(label=text); lbl.add_css_class('caption'); lbl.add_css_class(css)
+            row.badges_box.append(lbl)
+
     def create_manual_page(self):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=24)
         for m in ['top', 'bottom', 'start', 'end']: getattr(box, f'set_margin_{m}')(24)
@@ -497,6 +607,25 @@ class GuestView(Gtk.Box):
                  self.connect_manual(self.manual_ip_entry.get_text(), self.manual_port_entry.get_text(), self.manual_ipv6_switch.get_active())
             elif source == 'pin':
                  self.connect_pin(self.pin_entry.get_text())
+    def _check_paired(self, host, paired_retry=False):
+        """
+        Pairing pre-flight (worker thread). Hosts already known to be paired
+        (cache or the host's authenticated PairStatus) skip the
+        `moonlight list` probe; otherwise list_apps is polled, up to 10 times
+        right after pairing while the host syncs.
+        """
+        if self.moonlight.is_known_paired(host['ip']):
+            print(f"DEBUG: Host {host['ip']} known as paired, skipping list probe")
+            return True
+        checks = 10 if paired_retry else 1
+        for i in range(checks):
+            if self.moonlight.list_apps(host['ip']) is not None:
+                return True
+            print(f"DEBUG: Host {host['ip']} reports as not paired. Retry {i+1}/{checks}")
+            if i < checks - 1:
+                time.sleep(1.0) # Larger delay for host sync
+        return False
+
     def connect_to_host(self, host, paired_retry=False, override_check=False):
         if getattr(self, 'is_connecting', False) and not paired_retry and not override_check:
             print("DEBUG: Already connecting, ignoring request.")
@@ -520,16 +649,7 @@ class GuestView(Gtk.Box):
         
         def run():
             # 1. Check if already paired (with retries if we just successfuly paired)
-            is_paired = False
-            checks = 10 if paired_retry else 1
-            for i in range(checks):
-                apps = self.moonlight.list_apps(host['ip'])
-                if apps is not None:
-                    is_paired = True
-                    break
-                print(f"DEBUG: Host {host['ip']} reports as not paired. Retry {i+1}/{checks}")
-                if i < checks - 1:
-                    time.sleep(1.0) # Larger delay for host sync
+            is_paired = self._check_paired(host, paired_retry)
 
             if not is_paired and not paired_retry:
                 print(f"DEBUG: Host {host['ip']} definitely not paired. Starting pairing flow.")
@@ -574,7 +694,7 @@ class GuestView(Gtk.Box):
             if self.moonlight.connect(host['ip'], **opts): 
                 GLib.idle_add(lambda: (self.show_loading(False), self.perf_monitor.set_connection_status(host['name'], _("Active Stream"), True), self.perf_monitor.start_monitoring()))
             else: 
-                GLib.idle_add(lambda: (self.show_loading(False), self.show_error_dialog(_('Error'), _('Failed to connect. Verify if Moonlight is paired.'))))
+                self._on_connect_failed(host, paired_retry, _('Failed to connect. Verify if Moonlight is paired.'))
         
         # Insert automatic resolution logic BEFORE thread for total safety
         if scale_active:
@@ -588,15 +708,7 @@ class GuestView(Gtk.Box):
                  opts = {'width': w, 'height': h, 'fps': fps, 'bitrate': int(bitrate_val * 1000), 'display_mode': display_mode, 'audio': audio_active, 'hw_decode': hw_decode_active}
                  
                  # Pairing check (with retries if retry)
-                 is_paired = False
-                 checks = 10 if paired_retry else 1
-                 for i in range(checks):
-                     apps = self.moonlight.list_apps(host['ip'])
-                     if apps is not None:
-                         is_paired = True
-                         break
-                     if i < checks - 1:
-                         time.sleep(1.0)
+                 is_paired = self._check_paired(host, paired_retry)
 
                  if not is_paired and not paired_retry:
                     GLib.idle_add(self.show_loading, False)
@@ -612,12 +724,23 @@ class GuestView(Gtk.Box):
                  if self.moonlight.connect(host['ip'], **opts): 
                     GLib.idle_add(lambda: (self.show_loading(False), self.perf_monitor.set_connection_status(host['name'], _("Active Stream"), True), self.perf_monitor.start_monitoring()))
                  else: 
-                    GLib.idle_add(lambda: (self.show_loading(False), self.show_error_dialog(_('Error'), _('Failed to connect'))))
+                    self._on_connect_failed(host, paired_retry, _('Failed to connect'))
              
              threading.Thread(target=run_patched, daemon=True).start()
         else:
              threading.Thread(target=run, daemon=True).start()
 
+    def _on_connect_failed(self, host, paired_retry, message):
+        """Stream start failed (worker thread): a host that revoked us gets re-paired instead of retried"""
+        self.moonlight.forget_host(host['ip'])
+        # Asks the host itself: Moonlight.conf still lists a revoked host as paired
+        if not paired_retry and self.moonlight.is_known_paired(host['ip']) is False:
+            print(f"DEBUG: Host {host['ip']} no longer accepts this client. Starting pairing flow.")
+            GLib.idle_add(self.show_loading, False)
+            GLib.idle_add(lambda: self.start_pairing_flow(host))
+            return
+        GLib.idle_add(lambda: (self.show_loading(False), self.show_error_dialog(_('Error'), message)))
+
     def start_pairing_flow(self, host):
         """Starts pairing flow (Automatic for localhost, Manual for remote)"""
         
@@ -808,7 +931,9 @@ class GuestView(Gtk.Box):
         dialog.connect("response", on_response)
         dialog.present()
 
-    def cleanup(self): (self.perf_monitor.stop_monitoring() if hasattr(self, 'perf_monitor') else None)
+    def cleanup(self):
+        if hasattr(self, 'perf_monitor'): self.perf_monitor.stop_monitoring()
+        if hasattr(self, 'mdns_browser'): self.mdns_browser.stop()
     def connect_settings_signals(self):
         self.bitrate_scale.connect("value-changed", lambda w: self.save_guest_settings())
         for r in [self.display_mode_row, self.audio_row, self.hw_decode_row]: r.connect("notify::selected-item" if isinstance(r, Adw.ComboRow) else "notify::active", lambda *x: self.save_guest_settings())
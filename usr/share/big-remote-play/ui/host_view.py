@@ -3,11 +3,15 @@ gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 
 from gi.repository import Gtk, Adw, GLib
-import subprocess, random, string, json, socket, os
+import subprocess, random, string, socket, os
 from pathlib import Path
 from utils.game_detector import GameDetector
 
 from utils.config import Config
+from utils.system_check import ProcessSnapshot
+from utils.network import InterfaceSnapshot
+from utils.jobs import Job, JobRunner
+from host.sunshine_log import CLIENT_CONNECTED, CLIENT_DISCONNECTED
 import subprocess, os, tempfile, threading
 from gi.repository import GLib
 from utils.i18n import _
@@ -21,12 +25,17 @@ class HostView(Gtk.Box):
         self.is_hosting = False
         self.process = None # Initialize to avoid AttributeError
         self.pin_code = None
+        self.stop_pin_listener = None
+        # Start/stop run as staged background jobs, one at a time
+        self.host_jobs = JobRunner()
         
         from host.sunshine_manager import SunshineHost
         self.sunshine = SunshineHost(Path.home() / '.config' / 'big-remoteplay' / 'sunshine')
         
         if self.sunshine.is_running():
             self.is_hosting = True
+            # Instance from a previous session: follow its log from now on
+            self.sunshine.log.start()
             
         self.available_monitors = self.detect_monitors()
         self.available_gpus = self.detect_gpus()
@@ -111,6 +120,9 @@ class HostView(Gtk.Box):
         self.perf_monitor = PerformanceMonitor(sunshine=self.sunshine)
         self.perf_monitor.set_visible(True)
         self.perf_monitor.set_connection_status("Localhost", _("Sunshine Offline"), False)
+        # Guest connect/disconnect straight from sunshine.log, no polling
+        self.sunshine.log.subscribe(lambda e: GLib.idle_add(self._on_sunshine_log_event, e),
+                                    kinds=(CLIENT_CONNECTED, CLIENT_DISCONNECTED))
         
         self.header = Adw.PreferencesGroup()
         self.header.set_header_suffix(create_icon_widget('network-server-symbolic', size=24))
@@ -197,6 +209,13 @@ class HostView(Gtk.Box):
         self.bandwidth_row.set_adjustment(adj)
         self.streaming_expander.add_row(self.bandwidth_row)
 
+        # Uplink Row (shared by every guest; drives the adaptive per-stream cap)
+        self.uplink_row = Adw.SpinRow()
+        self.uplink_row.set_title(_("Host Upload (Mbps)"))
+        self.uplink_row.set_subtitle(_("Shared by all guests, split per stream (0 = Unknown)"))
+        self.uplink_row.set_adjustment(Gtk.Adjustment(value=0, lower=0, upper=10000, step_increment=5, page_increment=50))
+        self.streaming_expander.add_row(self.uplink_row)
+
         game_group.add(self.streaming_expander)
         
         self.hardware_expander = Adw.ExpanderRow()
@@ -885,13 +904,21 @@ class HostView(Gtk.Box):
 
     def toggle_hosting(self, button):
         print("DEBUG: HostView.toggle_hosting called")
+        job = self.host_jobs.current()
+        if self.host_jobs.busy() and job.name != 'bitrate':
+            # Only a start can be cancelled; its rollback undoes what it already did
+            if job.name == 'host-start':
+                job.cancel()
+                self.start_button.set_sensitive(False)
+                self.show_toast(_("Cancelling..."))
+            return
         self.show_toast(_("Clicked Start Server..."))
         self.start_button.set_sensitive(False)
         self.start_btn_spinner.set_visible(True)
         self.start_btn_spinner.start()
         
-        # Defer action slightly to allow UI to paint
-        GLib.timeout_add(100, self._perform_toggle_hosting)
+        # Only builds and submits a job: the main loop is not blocked
+        self._perform_toggle_hosting()
 
     def _perform_toggle_hosting(self):
         print(f"DEBUG: HostView._perform_toggle_hosting - is_hosting: {self.is_hosting}")
@@ -985,12 +1012,25 @@ class HostView(Gtk.Box):
     def start_audio_mixer_refresh(self):
         self.stop_audio_mixer_refresh()
         self.private_audio_apps = set() # Track names of private apps (unchecked in UI)
-        self.mixer_source_id = GLib.timeout_add(2000, self._refresh_audio_mixer_ui)
-        self.enforcer_source_id = GLib.timeout_add(1000, self._run_audio_enforcer)
+        # Prefer pactl subscribe events; fall back to polling if unavailable
+        if self.audio_manager.start_event_monitor(lambda kinds: GLib.idle_add(self._on_audio_event, kinds)):
+            self._run_audio_enforcer()
+        else:
+            self.mixer_source_id = GLib.timeout_add(2000, self._refresh_audio_mixer_ui)
+            self.enforcer_source_id = GLib.timeout_add(1000, self._run_audio_enforcer)
         self._refresh_audio_mixer_ui()
         return True
 
+    def _on_audio_event(self, kinds):
+        # New/changed sink inputs get routed immediately instead of on the next tick
+        self._run_audio_enforcer()
+        if 'sink-input' in kinds or 'sink' in kinds:
+            self._refresh_audio_mixer_ui()
+        return False
+
     def stop_audio_mixer_refresh(self):
+        if hasattr(self, 'audio_manager'):
+            self.audio_manager.stop_event_monitor()
         if hasattr(self, 'mixer_source_id'):
             GLib.source_remove(self.mixer_source_id)
             del self.mixer_source_id
@@ -1120,226 +1160,330 @@ class HostView(Gtk.Box):
              
     def start_hosting(self, b=None):
         print("DEBUG: HostView.start_hosting called")
-        self.loading_bar.set_visible(True); self.loading_bar.pulse()
-            
         try:
-            if self.sunshine.is_running():
-                self.sunshine.stop()
-                import time; time.sleep(1)
-            
-            self.pin_code = ''.join(random.choices(string.digits, k=6))
-            from utils.network import NetworkDiscovery
-            self.stop_pin_listener = NetworkDiscovery().start_pin_listener(self.pin_code, socket.gethostname())
-            
-            mode_idx = self.game_mode_row.get_selected()
-            apps_config = []
-            
-            if mode_idx in [1, 2]:
-                idx = self.game_list_row.get_selected()
-                if idx != Gtk.INVALID_LIST_POSITION:
-                    plat = {1: 'Steam', 2: 'Lutris'}[mode_idx]
-                    games = self.detected_games.get(plat, [])
-                    if 0 <= idx < len(games):
-                        apps_config.append({"name": games[idx]['name'], "cmd": games[idx]['cmd'], "detached": True})
-            elif mode_idx == 3:
-                name = self.custom_name_entry.get_text(); cmd = self.custom_cmd_entry.get_text()
-                if name and cmd: apps_config.append({"name": name, "cmd": cmd, "detached": True})
-            
-            if apps_config: self.sunshine.update_apps(apps_config)
-            else:
-                if mode_idx == 0: self.sunshine.update_apps([{"name": "Desktop", "detached": True, "cmd": "sleep infinity"}])
-                     
-            # Determine FPS
-            fps_idx = self.fps_row.get_selected()
-            fps_map = {0: 30, 1: 60, 2: 120, 3: 144, 4: 60} # Custom defaults to 60
-            fps = fps_map.get(fps_idx, 60)
-            
-            # Determine Bitrate (Kbps)
-            # Sunshine uses min_bitrate in config, but we can pass 'bitrate' (CBR target) here if needed.
-            # However, Sunshine v0.20+ generally prefers min_bitrate in config for VBR floor.
-            # If bandwidth_row > 0, set bitrate. Else default.
-            bw_mbps = self.bandwidth_row.get_value()
-            bitrate = int(bw_mbps * 1000) if bw_mbps > 0 else 20000 # Default 20Mbps if unlim
-            
-            selected_gpu_info = self.available_gpus[self.gpu_row.get_selected()]
-            sunshine_config = {
-                'sunshine_name': socket.gethostname(),
-                'encoder': selected_gpu_info['encoder'], 'bitrate': bitrate, 'fps': fps,
-                'videocodec': 'h264', 'gamepad': 'x360', 'min_threads': 4, 
-                'min_log_level': 2, # Info level to see connections
-                'channels': 2, # Force Stereo
-                'pkey': 'pkey.pem', 'cert': 'cert.pem', 
-                'upnp': 'enabled' if self.upnp_row.get_active() else 'disabled',
-                'address_family': 'both' if self.ipv6_row.get_active() else 'ipv4',
-                'origin_web_ui_allowed': 'wan' if self.webui_anyone_row.get_active() else 'lan',
-                'webserver': '0.0.0.0',
-                'enable_api_endpoints': 'true',
-                'port': '47989'
-            }
-            
+            plan = self._collect_hosting_plan()
+        except Exception as e:
+            self.show_error_dialog(_('Error'), str(e))
+            self._end_host_job()
+            return
+        self._begin_host_job()
+        # While starting, the button cancels
+        self.start_btn_label.set_label(_('Cancel'))
+        self.start_button.set_sensitive(True)
+        
+        # Blocking work (process stop/start, pactl, config writes) runs on the job's thread
+        job = Job('host-start', [
+            (_("Stopping previous server"), lambda job: self._stage_stop_previous(job, plan)),
+            (_("Preparing apps"), lambda job: self._stage_prepare_apps(job, plan)),
+            (_("Setting up audio"), lambda job: self._stage_setup_audio(job, plan)),
+            (_("Starting Sunshine"), lambda job: self._stage_start_sunshine(job, plan)),
+        ], on_progress=self._on_host_job_progress, on_done=self._on_host_started,
+            on_error=self._on_host_start_failed, on_cancelled=self._on_host_start_cancelled)
+        job.results.update(host_sink=plan['host_sink'], controller=plan['controller'])
+        self.host_jobs.submit(job)
+        
+    def _collect_hosting_plan(self) -> dict:
+        """Reads every widget the start needs (main thread); the job only works on this dict"""
+        mode_idx = self.game_mode_row.get_selected()
+        apps_config = []
+        
+        if mode_idx in [1, 2]:
+            idx = self.game_list_row.get_selected()
+            if idx != Gtk.INVALID_LIST_POSITION:
+                plat = {1: 'Steam', 2: 'Lutris'}[mode_idx]
+                games = self.detected_games.get(plat, [])
+                if 0 <= idx < len(games):
+                    apps_config.append({"name": games[idx]['name'], "cmd": games[idx]['cmd'], "detached": True})
+        elif mode_idx == 3:
+            name = self.custom_name_entry.get_text(); cmd = self.custom_cmd_entry.get_text()
+            if name and cmd: apps_config.append({"name": name, "cmd": cmd, "detached": True})
+        
+        if not apps_config and mode_idx == 0:
+            apps_config = [{"name": "Desktop", "detached": True, "cmd": "sleep infinity"}]
+                 
+        # Determine FPS
+        fps_idx = self.fps_row.get_selected()
+        fps_map = {0: 30, 1: 60, 2: 120, 3: 144, 4: 60} # Custom defaults to 60
+        fps = fps_map.get(fps_idx, 60)
+        
+        # Determine Bitrate (Kbps)
+        # Sunshine uses min_bitrate in config, but we can pass 'bitrate' (CBR target) here if needed.
+        # However, Sunshine v0.20+ generally prefers min_bitrate in config for VBR floor.
+        # If bandwidth_row > 0, set bitrate. Else default.
+        bw_mbps = self.bandwidth_row.get_value()
+        bitrate = int(bw_mbps * 1000) if bw_mbps > 0 else 20000 # Default 20Mbps if unlim
+        
+        # The uplink is shared by every guest: the controller splits it per stream,
+        # under the user's own max_bitrate, and lowers the cap when guests show congestion
+        from host.bitrate_controller import AdaptiveBitrateController
+        controller = AdaptiveBitrateController(self.sunshine, uplink_kbps=int(self.uplink_row.get_value() * 1000),
+                                               max_kbps=self._user_max_bitrate(), submit=self._submit_bitrate_change)
+        
+        selected_gpu_info = self.available_gpus[self.gpu_row.get_selected()]
+        sunshine_config = {
+            'sunshine_name': socket.gethostname(),
+            'encoder': selected_gpu_info['encoder'], 'bitrate': bitrate, 'fps': fps,
+            'max_bitrate': controller.target_kbps,
+            'videocodec': 'h264', 'gamepad': 'x360', 'min_threads': 4, 
+            'min_log_level': 2, # Info level to see connections
+            'channels': 2, # Force Stereo
+            'pkey': 'pkey.pem', 'cert': 'cert.pem', 
+            'upnp': 'enabled' if self.upnp_row.get_active() else 'disabled',
+            'address_family': 'both' if self.ipv6_row.get_active() else 'ipv4',
+            'origin_web_ui_allowed': 'wan' if self.webui_anyone_row.get_active() else 'lan',
+            'webserver': '0.0.0.0',
+            'enable_api_endpoints': 'true',
+            'port': '47989'
+        }
+        
+        # Audio Configuration - ALWAYS setup PulseAudio infrastructure
+        # This allows toggling streaming on/off without restarting server or destroying sinks
+        sunshine_config['audio'] = 'pulse'
+        
+        # Identify Host Sink
+        host_sink_idx = self.audio_output_row.get_selected()
+        if self.audio_devices and 0 <= host_sink_idx < len(self.audio_devices):
+            host_sink = self.audio_devices[host_sink_idx]['name']
+        else:
+            host_sink = self.audio_manager.get_default_sink()
 
-            # Audio Configuration
-            # Audio Configuration - ALWAYS setup PulseAudio infrastructure
-            # This allows toggling streaming on/off without restarting server or destroying sinks
-            sunshine_config['audio'] = 'pulse'
-            
-            # Identify Host Sink
-            host_sink_idx = self.audio_output_row.get_selected()
-            if self.audio_devices and 0 <= host_sink_idx < len(self.audio_devices):
-                host_sink = self.audio_devices[host_sink_idx]['name']
-            else:
-                host_sink = self.audio_manager.get_default_sink()
-            
-            # Store it for the enforcer
-            self.active_host_sink = host_sink
-
-            # Enable Host+Guest Streaming (Create Sink)
-            if self.audio_manager:
-                # Returns True if success
-                if self.audio_manager.enable_streaming_audio(host_sink):
-                    # Ensure we use the sink name for Sunshine to capture from its monitor
-                    sunshine_config['audio_sink'] = "SunshineGameSink"
-                    
-                    print(f"DEBUG: Configured Sunshine audio_sink to: {sunshine_config['audio_sink']}")
-                    
-                    # Start Mixer UI updates
-                    self.start_audio_mixer_refresh()
+        platforms = ['auto', 'wayland', 'x11', 'kms']
+        platform = platforms[self.platform_row.get_selected()]
+        if platform == 'auto':
+            session = os.environ.get('XDG_SESSION_TYPE', '').lower()
+            platform = 'wayland' if session == 'wayland' else 'x11'
+        sunshine_config['platform'] = platform
 
-                    # Default: Restore Host Sink after 500ms so user controls local volume,
-                    # while Enforcer routes games to SunshineGameSink.
-                    GLib.timeout_add(500, lambda: (self.audio_manager.set_default_sink(host_sink), self.show_toast(f"Padrão restaurado: {host_sink}"))[1])
-                else:
-                     print("Failed to enable streaming sinks, falling back to default")
-                     self.show_toast(_("Failed to create Virtual Audio"))
-                     # Fallback to none if creation failed
-                     sunshine_config['audio'] = 'none' 
-                     self.audio_manager.disable_streaming_audio(None)
-
-            platforms = ['auto', 'wayland', 'x11', 'kms']
-            platform = platforms[self.platform_row.get_selected()]
-            if platform == 'auto':
-                session = os.environ.get('XDG_SESSION_TYPE', '').lower()
-                platform = 'wayland' if session == 'wayland' else 'x11'
-            sunshine_config['platform'] = platform
-
-
-            if platform != 'wayland':
-                monitor_idx = self.monitor_row.get_selected()
-                if 0 < monitor_idx < len(self.available_monitors):
-                    mon_name = self.available_monitors[monitor_idx][1]
-                    if mon_name != 'auto':
-                        sunshine_config['output_name'] = mon_name
-            
-            # If Wayland, do NOT set output_name.
-            # Sunshine uses Portals (Pipewire) which asks user to choose or uses default.
-            # Setting output_name on Wayland often causes "Monitor not found" errors.
-            if selected_gpu_info['encoder'] == 'vaapi' and selected_gpu_info['adapter'] != 'auto':
-                sunshine_config['adapter_name'] = selected_gpu_info['adapter']
-            
-            if platform == 'wayland':
-                sunshine_config['wayland.display'] = os.environ.get('WAYLAND_DISPLAY', 'wayland-0')
-            if platform == 'x11' and self.monitor_row.get_selected() == 0:
-                sunshine_config['output_name'] = ':0'
-            
-            self.sunshine.configure(sunshine_config)
-            if self.sunshine.start():
-                self.sync_ui_state()
-                
-                self.is_hosting = True
-                
-                # Update final UI state
-                self.sync_ui_state()
-                self.show_toast(_('Server started'))
-            else:
-                self.is_hosting = False
-                self.sync_ui_state()
-                
-                # Check for specific errors in log
-                error_msg = _("Check logs for details.")
-                fix_cmd = None
-                
-                try:
-                    log_path = self.sunshine.config_dir / 'sunshine.log'
-                    if log_path.exists():
-                        with open(log_path, 'r') as f:
-                            lines = f.readlines()
-                            for line in lines[-10:]:
-                                if "error while loading shared libraries" in line and "libicuuc.so.76" in line:
-                                    lib = "libicuuc.so.76"
-                                    error_msg = _("Missing library: {}\n\nWould you like to try to fix it automatically?").format(lib)
-                                    
-                                    # Locate the fix script
-                                    script_path = Path(__file__).parent.parent / 'scripts' / 'fix_sunshine_libs.sh'
-                                    if script_path.exists():
-                                        fix_cmd = ['pkexec', str(script_path)]
-                                    break
-                                elif "error while loading shared libraries" in line:
-                                    lib = line.split("error while loading shared libraries:")[1].split(":")[0].strip()
-                                    error_msg = _("Missing library: {}\n\nPlease check your Sunshine installation.").format(lib)
-                                    break
-                                elif "Address already in use" in line:
-                                    error_msg = _("Port already in use. Check if another instance is running.")
-                                    break
-                except: pass
-                
-                dialog = Adw.MessageDialog.new(self.get_root(), _("Failed to start"), _("The server failed to start.\n{}").format(error_msg))
-                if fix_cmd:
-                    dialog.add_response("fix", _("Fix Automatically"))
-                dialog.add_response("close", _("Close"))
-                
-                def on_dialog_response(dialog, response):
-                    if response == "fix" and fix_cmd:
-                        try:
-                            subprocess.Popen(fix_cmd)
-                        except Exception as e:
-                            self.show_error_dialog(_("Error"), f"Failed to run fix script: {e}")
+        if platform != 'wayland':
+            monitor_idx = self.monitor_row.get_selected()
+            if 0 < monitor_idx < len(self.available_monitors):
+                mon_name = self.available_monitors[monitor_idx][1]
+                if mon_name != 'auto':
+                    sunshine_config['output_name'] = mon_name
+        
+        # If Wayland, do NOT set output_name.
+        # Sunshine uses Portals (Pipewire) which asks user to choose or uses default.
+        # Setting output_name on Wayland often causes "Monitor not found" errors.
+        if selected_gpu_info['encoder'] == 'vaapi' and selected_gpu_info['adapter'] != 'auto':
+            sunshine_config['adapter_name'] = selected_gpu_info['adapter']
+        
+        if platform == 'wayland':
+            sunshine_config['wayland.display'] = os.environ.get('WAYLAND_DISPLAY', 'wayland-0')
+        if platform == 'x11' and self.monitor_row.get_selected() == 0:
+            sunshine_config['output_name'] = ':0'
+        
+        return {'apps': apps_config, 'config': sunshine_config, 'host_sink': host_sink,
+                'controller': controller, 'creds': self._get_sunshine_creds()}
+
+    def _user_max_bitrate(self) -> int:
+        """max_bitrate chosen in the Sunshine preferences (sunshine.conf holds the controller's cap)"""
+        try: return int(self.config.get('host', {}).get('max_bitrate_kbps', 0))
+        except (TypeError, ValueError): return 0
+
+    def _submit_bitrate_change(self, fn):
+        # Queued behind a start/stop in progress instead of racing it; a later start/stop cancels it
+        self.host_jobs.submit(Job('bitrate', [(_("Applying bitrate cap"), lambda job: fn())]), cancel_current=False)
+
+    # Start stages (job thread: no widget access)
+    
+    def _stage_stop_previous(self, job, plan):
+        # A server we started keeps running if the new settings allow it (diff-apply in the last stage)
+        plan['reuse'] = self.sunshine.is_running() and self.sunshine.loaded_config is not None
+        if self.sunshine.is_running() and not plan['reuse']:
+            self.sunshine.stop()
+            self.sunshine.wait_stopped()
+
+    def _stage_prepare_apps(self, job, plan):
+        from utils.network import NetworkDiscovery
+        pin_code = ''.join(random.choices(string.digits, k=6))
+        stop_listener = NetworkDiscovery().start_pin_listener(pin_code, socket.gethostname())
+        if stop_listener: job.add_undo(stop_listener)
+        job.results.update(pin_code=pin_code, stop_pin_listener=stop_listener)
+        if plan['apps']: self.sunshine.update_apps(plan['apps'])
+
+    def _stage_setup_audio(self, job, plan):
+        if not self.audio_manager: return
+        host_sink, config = plan['host_sink'], plan['config']
+        # Returns True if success
+        if self.audio_manager.enable_streaming_audio(host_sink):
+            # Ensure we use the sink name for Sunshine to capture from its monitor
+            config['audio_sink'] = "SunshineGameSink"
+            print(f"DEBUG: Configured Sunshine audio_sink to: {config['audio_sink']}")
+            job.add_undo(lambda: self.audio_manager.disable_streaming_audio(host_sink))
+            job.results['audio'] = True
+        else:
+            print("Failed to enable streaming sinks, falling back to default")
+            # Fallback to none if creation failed
+            config['audio'] = 'none'
+            self.audio_manager.disable_streaming_audio(None)
+            job.results['audio'] = False
+
+    def _stage_start_sunshine(self, job, plan):
+        job.check()
+        fresh = True
+        if plan['reuse']:
+            diff = self.sunshine.apply_config(plan['config'], auth=plan['creds'])
+            started = self.sunshine.is_running()
+            fresh = diff.restarted
+            if not diff.restarted: print(f"DEBUG: Sunshine kept running ({diff})")
+        else:
+            self.sunshine.configure(plan['config'])
+            started = self.sunshine.start()
+        if not started:
+            job.results['start_failed'] = True
+            raise RuntimeError(_("The server failed to start."))
+        # Cancelled at the last moment: the rollback stops a server this job (re)started,
+        # never one that was already running before it
+        if fresh: job.add_undo(self.sunshine.stop)
+        job.check()
+
+    # Job results (main thread)
+    
+    def _begin_host_job(self):
+        self.loading_bar.set_fraction(0.0)
+        self.loading_bar.set_show_text(True)
+        self.loading_bar.set_text('')
+        self.loading_bar.set_visible(True)
+        self.start_btn_spinner.set_visible(True)
+        self.start_btn_spinner.start()
+
+    def _end_host_job(self):
+        self.loading_bar.set_visible(False)
+        self.start_button.set_sensitive(True) # Reabilitar botão
+        self.start_btn_spinner.stop()
+        self.start_btn_spinner.set_visible(False)
+
+    def _on_host_job_progress(self, job, label, index, total):
+        self.loading_bar.set_fraction(index / total)
+        self.loading_bar.set_text(label)
+
+    def _on_host_started(self, job):
+        r = job.results
+        host_sink = r['host_sink']
+        self.pin_code = r.get('pin_code')
+        self.stop_pin_listener = r.get('stop_pin_listener')
+        # Store it for the enforcer
+        self.active_host_sink = host_sink
+        self.bitrate_controller = r['controller']
+        
+        if r.get('audio'):
+            # Start Mixer UI updates
+            self.start_audio_mixer_refresh()
+            # Default: Restore Host Sink after 500ms so user controls local volume,
+            # while Enforcer routes games to SunshineGameSink.
+            GLib.timeout_add(500, lambda: (self.audio_manager.set_default_sink(host_sink), self.show_toast(f"Padrão restaurado: {host_sink}"))[1])
+        elif r.get('audio') is False:
+            self.show_toast(_("Failed to create Virtual Audio"))
+        
+        self.is_hosting = True
+        self.perf_monitor.bitrate_controller = self.bitrate_controller
+        self._end_host_job()
+        
+        # Update final UI state
+        self.sync_ui_state()
+        self.show_toast(_('Server started'))
+
+    def _on_host_start_cancelled(self, job):
+        # The rollback stopped anything this job started; a reused server is still up
+        self.is_hosting = self.sunshine.is_running()
+        self._end_host_job()
+        self.sync_ui_state()
+        self.show_toast(_("Server start cancelled"))
+
+    def _on_host_start_failed(self, job, error):
+        self.is_hosting = False
+        self._end_host_job()
+        self.sync_ui_state() # Revert state
+        if not job.results.get('start_failed'):
+            self.show_error_dialog(_('Error'), str(error))
+            return
+        
+        # Check for specific errors in log
+        error_msg = _("Check logs for details.")
+        fix_cmd = None
+        
+        try:
+            # Errors captured by SunshineHost.start from this run's log lines
+            for line in self.sunshine.last_start_errors:
+                if "error while loading shared libraries" in line and "libicuuc.so.76" in line:
+                    lib = "libicuuc.so.76"
+                    error_msg = _("Missing library: {}\n\nWould you like to try to fix it automatically?").format(lib)
                             
-                dialog.connect("response", on_dialog_response)
-                dialog.present()
-            
-        except Exception as e:
-            self.show_error_dialog(_('Error'), str(e))
-            self.is_hosting = False
-            self.sync_ui_state() # Revert state
-        finally: 
-            self.loading_bar.set_visible(False)
-            self.start_button.set_sensitive(True) # Reabilitar botão
-            self.start_btn_spinner.stop()
-            self.start_btn_spinner.set_visible(False)
+                    # Locate the fix script
+                    script_path = Path(__file__).parent.parent / 'scripts' / 'fix_sunshine_libs.sh'
+                    if script_path.exists():
+                        fix_cmd = ['pkexec', str(script_path)]
+                    break
+                elif "error while loading shared libraries" in line:
+                    lib = line.split("error while loading shared libraries:")[1].split(":")[0].strip()
+                    error_msg = _("Missing library: {}\n\nPlease check your Sunshine installation.").format(lib)
+                    break
+                elif "Address already in use" in line:
+                    error_msg = _("Port already in use. Check if another instance is running.")
+                    break
+        except: pass
+        
+        dialog = Adw.MessageDialog.new(self.get_root(), _("Failed to start"), _("The server failed to start.\n{}").format(error_msg))
+        if fix_cmd:
+            dialog.add_response("fix", _("Fix Automatically"))
+        dialog.add_response("close", _("Close"))
+        
+        def on_dialog_response(dialog, response):
+            if response == "fix" and fix_cmd:
+                try:
+                    subprocess.Popen(fix_cmd)
+                except Exception as e:
+                    self.show_error_dialog(_("Error"), f"Failed to run fix script: {e}")
+                    
+        dialog.connect("response", on_dialog_response)
+        dialog.present()
         
     def stop_hosting(self, b=None):
         print("DEBUG: HostView.stop_hosting called")
         self.show_toast(_("Stopping server..."))
-        self.loading_bar.set_visible(True); self.loading_bar.pulse()
+        self._begin_host_job()
         self.audio_mixer_expander.set_visible(self.streaming_audio_row.get_active())
         self.stop_audio_mixer_refresh()
         
-        if hasattr(self, 'stop_pin_listener') and self.stop_pin_listener:
-            try: self.stop_pin_listener()
-            except: pass
-            self.stop_pin_listener = None
-            
-        # Restore audio configuration
-        if hasattr(self, 'audio_manager') and hasattr(self, 'active_host_sink') and self.active_host_sink:
+        # No idle restarts from the controller while shutting down
+        self.perf_monitor.bitrate_controller = None
+        stop_listener = getattr(self, 'stop_pin_listener', None)
+        self.stop_pin_listener = None
+        host_sink = getattr(self, 'active_host_sink', None)
+        
+        def close_pin_listener(job):
+            if stop_listener:
+                try: stop_listener()
+                except: pass
+        
+        def restore_audio(job):
+            # Restore audio configuration
+            if hasattr(self, 'audio_manager') and host_sink:
+                try:
+                    self.audio_manager.disable_streaming_audio(host_sink)
+                except Exception as e:
+                    print(f"Error restoring audio: {e}")
+        
+        def stop_sunshine(job):
             try:
-                self.audio_manager.disable_streaming_audio(self.active_host_sink)
+                self.sunshine.stop()
             except Exception as e:
-                print(f"Error restoring audio: {e}")
-            
-        try:
-            self.sunshine.stop()
-        except Exception as e:
-            print(f"Error stopping Sunshine: {e}")
-        
-        # Hard kill fallback
-        subprocess.run(['pkill', '-9', 'sunshine'], stderr=subprocess.DEVNULL)
-            
+                print(f"Error stopping Sunshine: {e}")
+            # Hard kill fallback
+            subprocess.run(['pkill', '-9', 'sunshine'], stderr=subprocess.DEVNULL)
+        
+        # Not cancellable: each stage tolerates the previous one failing
+        self.host_jobs.submit(Job('host-stop', [
+            (_("Closing PIN listener"), close_pin_listener),
+            (_("Restoring audio"), restore_audio),
+            (_("Stopping Sunshine"), stop_sunshine),
+        ], on_progress=self._on_host_job_progress, on_done=self._on_host_stopped,
+            on_error=lambda job, e: self._on_host_stopped(job)))
+
+    def _on_host_stopped(self, job):
         self.is_hosting = False
+        self._end_host_job()
         self.sync_ui_state()
-        self.loading_bar.set_visible(False)
-        self.start_button.set_sensitive(True) 
-        self.start_btn_spinner.stop()
-        self.start_btn_spinner.set_visible(False)
         self.show_toast(_('Server stopped'))
         
     def update_status_info(self):
@@ -1362,10 +1506,7 @@ class HostView(Gtk.Box):
         return True
         
     def check_process_running(self, process_name):
-        try:
-            subprocess.check_output(["pgrep", "-x", process_name])
-            return True
-        except: return False
+        return bool(ProcessSnapshot.find(process_name))
             
     def get_ip_addresses(self):
         ipv4 = ipv6 = "None"
@@ -1374,24 +1515,20 @@ class HostView(Gtk.Box):
                 s.connect(("1.1.1.1", 80)); ipv4 = s.getsockname()[0]
         except: pass
         try:
-            res = subprocess.run(['ip', '-j', 'addr'], capture_output=True, text=True)
-            if res.returncode == 0:
-                for iface in json.loads(res.stdout):
-                    name = iface['ifname']
-                    # Pular interfaces de loopback, desligadas ou virtuais conhecidas
-                    if name == 'lo' or 'UP' not in iface['flags']: continue
-                    if any(x in name for x in ['docker', 'veth', 'virbr', 'vboxnet', 'tailscale', 'zerotier', 'br-']): continue
-                    for addr in iface.get('addr_info', []):
-                        if addr['family'] == 'inet':
-                            if ipv4 == "None": ipv4 = addr['local']
-                        elif addr['family'] == 'inet6':
-                            # Prioritize global but accept link-local
-                            if addr.get('scope') == 'global':
-                                ipv6 = addr['local']
-                                break # Found global, stop searching for this interface
-                            elif ipv6 == "None":
-                                # Fallback to link-local with scope ID
-                                ipv6 = f"{addr['local']}%{name}"
+            # In-memory interface model, rebuilt only on link/address changes
+            for name, iface in InterfaceSnapshot.get().lan_interfaces():
+                # Pular interfaces de VPN (loopback, desligadas e containers já filtradas)
+                if any(x in name for x in ['tailscale', 'zerotier']): continue
+                for addr, _prefix in iface['ipv4']:
+                    if ipv4 == "None": ipv4 = addr
+                for addr, _prefix, scope in iface['ipv6']:
+                    # Prioritize global but accept link-local
+                    if scope == 'global':
+                        ipv6 = addr
+                        break # Found global, stop searching for this interface
+                    elif ipv6 == "None" and scope == 'link':
+                        # Fallback to link-local with scope ID
+                        ipv6 = f"{addr}%{name}"
         except: pass
 
         
@@ -1404,6 +1541,33 @@ class HostView(Gtk.Box):
         dialog.add_response('ok', 'OK')
         dialog.present()
     
+    def _on_sunshine_log_event(self, event):
+        if not self.is_hosting: return False
+        if event.kind == CLIENT_CONNECTED:
+            self.show_toast(_("Guest connected: {}").format(event.ip) if event.ip else _("Guest connected"))
+        else:
+            self.show_toast(_("Guest disconnected"))
+        return False
+
+    def apply_sunshine_preferences(self):
+        """Applies sunshine.conf edits (preferences window) to the running server, restarting only if needed"""
+        if not self.is_hosting: return
+        controller = getattr(self, 'bitrate_controller', None)
+        if controller is not None: controller.max_kbps = self._user_max_bitrate()
+        # Startup-only changes wait rather than drop guests that are playing
+        guests = getattr(self.perf_monitor, 'active_sessions', 0)
+        diff = self.sunshine.apply_config(auth=self._get_sunshine_creds(), restart=not guests)
+        if diff.restarted:
+            self.show_toast(_("Server restarted to apply {} setting(s)").format(len(diff.restart)))
+        elif diff.needs_restart and not guests:
+            self.is_hosting = self.sunshine.is_running()
+            self.sync_ui_state()
+            self.show_toast(_("Failed to restart the server"))
+        elif diff.needs_restart:
+            self.show_toast(_("{} setting(s) will apply when the server restarts").format(len(diff.restart)))
+        elif diff.live:
+            self.show_toast(_("Settings applied without restarting"))
+
     def show_toast(self, message):
         window = self.get_root()
         if hasattr(window, 'show_toast'): window.show_toast(message)
@@ -1427,14 +1591,46 @@ class HostView(Gtk.Box):
         plat = {1: 'Steam', 2: 'Lutris'}.get(mode_idx)
         if not plat: return
         if not self.detected_games[plat]:
-             if plat == 'Steam': self.detected_games['Steam'] = self.game_detector.detect_steam()
-             elif plat == 'Lutris': self.detected_games['Lutris'] = self.game_detector.detect_lutris()
+             # Last known list from the on-disk cache now, re-validated in the background
+             self.detected_games[plat] = self.game_detector.get_cached(plat, order='recent')
+             # Nothing cached yet (first run): stream games into the list as they are found
+             on_game = None if self.detected_games[plat] else (lambda g, p=plat: GLib.idle_add(self._on_game_found, p, g))
+             self.game_detector.refresh_async(lambda games, p=plat: GLib.idle_add(self._on_games_refreshed, p, games), plat, on_game=on_game, order='recent')
+        self._render_game_list(plat)
+
+    def _render_game_list(self, plat):
         games = self.detected_games[plat]
+        # Keep the selected game across refreshes (selection is an index into detected_games)
+        prev = None
+        idx = self.game_list_row.get_selected()
+        model = self.game_list_row.get_model()
+        if model is not None and idx != Gtk.INVALID_LIST_POSITION and idx < model.get_n_items():
+            prev = model.get_string(idx)
         new_model = Gtk.StringList()
         if not games: new_model.append(f"No games found on {plat}")
         else:
             for game in games: new_model.append(game['name'])
         self.game_list_row.set_model(new_model)
+        names = [g['name'] for g in games]
+        if prev in names: self.game_list_row.set_selected(names.index(prev))
+
+    def _on_game_found(self, plat, game):
+        games = self.detected_games[plat]
+        if any(g['id'] == game['id'] for g in games): return False
+        games.append(game)
+        if {1: 'Steam', 2: 'Lutris'}.get(self.game_mode_row.get_selected()) == plat:
+            model = self.game_list_row.get_model()
+            # First hit replaces the "No games found" placeholder
+            if len(games) == 1: self._render_game_list(plat)
+            elif model is not None: model.append(game['name'])
+        return False
+
+    def _on_games_refreshed(self, plat, games):
+        if games != self.detected_games.get(plat):
+            self.detected_games[plat] = games
+            if {1: 'Steam', 2: 'Lutris'}.get(self.game_mode_row.get_selected()) == plat:
+                self._render_game_list(plat)
+        return False
 
     def save_host_settings(self, *args):
         if getattr(self, 'loading_settings', False): return
@@ -1448,6 +1644,7 @@ class HostView(Gtk.Box):
             'resolution_idx': self.resolution_row.get_selected(),
             'fps_idx': self.fps_row.get_selected(),
             'bandwidth_mbps': self.bandwidth_row.get_value(),
+            'uplink_mbps': self.uplink_row.get_value(),
             'monitor_idx': self.monitor_row.get_selected(),
             'gpu_idx': self.gpu_row.get_selected(),
             'platform_idx': self.platform_row.get_selected(),
@@ -1556,6 +1753,12 @@ class HostView(Gtk.Box):
                 bw_kbps = int(scm.get('min_bitrate', '0'))
                 h['bandwidth_mbps'] = bw_kbps / 1000.0
                 
+                # max_bitrate in sunshine.conf is rewritten by the bitrate controller:
+                # the user's own value is kept in the host config (see SunshinePreferencesPage)
+                if 'max_bitrate_kbps' not in h:
+                    try: h['max_bitrate_kbps'] = int(scm.get('max_bitrate', '0'))
+                    except ValueError: h['max_bitrate_kbps'] = 0
+                
                 self.config.set('host', h)
             except Exception as e:
                 print(f"Error syncing from Sunshine config: {e}") 
@@ -1579,6 +1782,7 @@ class HostView(Gtk.Box):
             bw_val = h.get('bandwidth_mbps', 0)
             self.bandwidth_row.set_value(bw_val) 
             self.perf_monitor.set_target_bandwidth(bw_val)
+            self.uplink_row.set_value(h.get('uplink_mbps', 0))
             
             self.monitor_row.set_selected(h.get('monitor_idx', 0))
             self.gpu_row.set_selected(h.get('gpu_idx', 0))
@@ -1607,7 +1811,7 @@ class HostView(Gtk.Box):
             r.connect('notify::active', self.save_host_settings)
         for r in [self.game_mode_row, self.monitor_row, self.gpu_row, self.platform_row, self.audio_output_row, self.optimization_row, self.resolution_row, self.fps_row]:
             r.connect('notify::selected', self.save_host_settings)
-        for r in [self.bandwidth_row]:
+        for r in [self.bandwidth_row, self.uplink_row]:
             r.connect('notify::value', self.save_host_settings)
         for r in [self.custom_name_entry, self.custom_cmd_entry]:
             r.connect('notify::text', self.save_host_settings)
@@ -1630,5 +1834,11 @@ class HostView(Gtk.Box):
         # The server should persist in the background even if the UI closes.
         # if self.is_hosting: self.stop_hosting()
         
-        if hasattr(self, 'stop_pin_listener'): self.stop_pin_listener()
+        # A start still in progress is cancelled; shutdown exits right after this, so give
+        # its rollback (or a running stop) a bounded wait on the job thread
+        job = self.host_jobs.current() if hasattr(self, 'host_jobs') else None
+        if job is not None and job.is_running():
+            if job.name != 'host-stop': job.cancel()
+            if not job.wait(5.0): print(f"DEBUG: Job {job.name} still running at exit")
+        if getattr(self, 'stop_pin_listener', None): self.stop_pin_listener()
         if hasattr(self, 'audio_manager'): self.audio_manager.cleanup()
@@ -5,8 +5,7 @@ Replaces the old text-based monitor with a modern visual chart.
 """
 
 from __future__ import annotations
-from collections import deque
-from dataclasses import dataclass
+import math
 import time
 import random
 import threading
@@ -14,7 +13,6 @@ import subprocess
 import re
 from pathlib import Path
 import queue
-import os
 import signal
 import gi
 import socket
@@ -29,36 +27,44 @@ try:
 except ImportError:
     cairo = None
 
-CHART_MAX_HISTORY = 60
+# One hour at the 1 Hz sample rate; the chart shows CHART_VISIBLE_POINTS by default
+CHART_MAX_HISTORY = 3600
+CHART_VISIBLE_POINTS = 60
+LOSS_COLOR = (0.9, 0.15, 0.15, 1.0)
 
 from utils.icons import create_icon_widget, set_icon
-
-@dataclass
-class PerformanceDataPoint:
-    """Single data point for performance chart."""
-    latency: float
-    fps: float
-    bandwidth: float
-    device_latencies: dict
-    latency_text: str
-    fps_text: str
-    bandwidth_text: str
-    users_count: int = 0
+from utils.network import ICMPProber
+from utils.timeseries import RingSeries
+from utils.metrics_recorder import MetricsRecorder
+from utils.session_detector import SessionDetector, is_loopback, is_stream_peer
+from host.sunshine_log import CLIENT_CONNECTED, CLIENT_DISCONNECTED
 
 class PerformanceChartWidget(Gtk.DrawingArea):
     """
     Modern chart widget for network/video performance.
+
+    Samples are kept in a columnar RingSeries of CHART_MAX_HISTORY points.
+    The chart shows the newest `visible_points` of them (scroll to zoom out)
+    and draws at most one vertex per pixel column, so draw time does not
+    grow with the history length.
     """
 
     def __init__(self) -> None:
         super().__init__()
-        self._history: deque[PerformanceDataPoint] = deque(maxlen=CHART_MAX_HISTORY)
+        self._series = RingSeries(CHART_MAX_HISTORY, ('latency', 'fps', 'bandwidth', 'users', 'frame_loss'))
+        # Sample seq -> bandwidth text override ("Unlimited"); only a few points carry one
+        self._bw_labels = {}
+        self.visible_points = CHART_VISIBLE_POINTS
+        self._active_devices = []
+        self._loss_visible = False
         self.max_latency = 100.0
         self.max_fps = 120.0
         self.max_bandwidth = 50.0
+        self.max_frame_loss = 10.0
         self._cur_latency_text = "--"
         self._cur_fps_text = "--"
         self._cur_bw_text = "--"
+        self._cur_loss_text = "--"
         self.device_colors = {}
         self.color_palette = [
             (1.0, 0.4, 0.0, 1.0),
@@ -70,6 +76,10 @@ class PerformanceChartWidget(Gtk.DrawingArea):
         ]
         self._hover_x: float | None = None
         self._hover_index: int | None = None
+        # Cached layers: static (background/grid) and series (static + data)
+        self._static_layer = self._series_layer = None
+        self._static_key = self._series_key = None
+        self._series_dirty = True
         self.set_size_request(300, 160)
         self.set_vexpand(False)
         self.set_hexpand(True)
@@ -78,6 +88,9 @@ class PerformanceChartWidget(Gtk.DrawingArea):
         motion_controller.connect("motion", self._on_motion)
         motion_controller.connect("leave", self._on_leave)
         self.add_controller(motion_controller)
+        scroll_controller = Gtk.EventControllerScroll.new(Gtk.EventControllerScrollFlags.VERTICAL)
+        scroll_controller.connect("scroll", self._on_scroll)
+        self.add_controller(scroll_controller)
         
     def _get_device_color(self, name):
         # Remove sufixos de estado para manter a cor consistente
@@ -87,155 +100,224 @@ class PerformanceChartWidget(Gtk.DrawingArea):
             self.device_colors[base_name] = self.color_palette[idx]
         return self.device_colors[base_name]
         
-    def add_data_point(self, latency: float, fps: float, bandwidth: float, users: int = 0, device_latencies: dict = None, bw_text_override: str = None):
+    def add_data_point(self, latency: float, fps: float, bandwidth: float, users: int = 0, device_latencies: dict = None, bw_text_override: str = None, frame_loss: float = 0.0):
         if latency > self.max_latency: self.max_latency = latency * 1.2
         if fps > self.max_fps: self.max_fps = fps * 1.2
         if bandwidth > self.max_bandwidth: self.max_bandwidth = bandwidth * 1.2
+        if frame_loss > self.max_frame_loss: self.max_frame_loss = min(100.0, frame_loss * 1.2)
         if device_latencies:
             for lat in device_latencies.values():
                 if lat > self.max_latency: self.max_latency = lat * 1.2
         
-        bw_txt = bw_text_override if bw_text_override else f"{bandwidth:.1f} Mbps"
+        self._series.append({'latency': latency, 'fps': fps, 'bandwidth': bandwidth,
+                             'users': users, 'frame_loss': frame_loss}, device_latencies)
+        oldest = self._series.seq_of(0)
+        for seq in [k for k in self._bw_labels if k < oldest]: del self._bw_labels[seq]
+        if bw_text_override:
+            self._bw_labels[self._series.seq_of(len(self._series) - 1)] = bw_text_override
         
-        point = PerformanceDataPoint(
-            latency=latency,
-            fps=fps,
-            bandwidth=bandwidth,
-            device_latencies=device_latencies or {},
-            latency_text=f"{latency:.0f} ms",
-            fps_text=f"{fps:.0f} FPS",
-            bandwidth_text=bw_txt,
-            users_count=users
-        )
-        self._history.append(point)
-        self._cur_latency_text = point.latency_text
-        self._cur_fps_text = point.fps_text
-        self._cur_bw_text = point.bandwidth_text
+        self._cur_latency_text = f"{latency:.0f} ms"
+        self._cur_fps_text = f"{fps:.0f} FPS"
+        self._cur_bw_text = bw_text_override if bw_text_override else f"{bandwidth:.1f} Mbps"
+        self._cur_loss_text = f"{frame_loss:.1f}%"
+        self._refresh_visible_state()
+        self._series_dirty = True
         self.queue_draw()
 
+    def _visible_count(self) -> int:
+        return min(len(self._series), self.visible_points)
+
+    def _refresh_visible_state(self):
+        """Per-sample (not per-frame) scan of the visible window: devices and loss series"""
+        n = self._visible_count()
+        self._active_devices = self._series.active_devices(n)
+        self._loss_visible = any(v > 0 for part in self._series.window('frame_loss', n) for v in part)
+
+    def _on_scroll(self, controller, dx, dy):
+        # Scroll down zooms out over the stored history, up zooms back in
+        if dy > 0: points = min(CHART_MAX_HISTORY, int(self.visible_points * 1.5))
+        elif dy < 0: points = max(CHART_VISIBLE_POINTS, int(self.visible_points / 1.5))
+        else: return False
+        if points != self.visible_points:
+            self.visible_points = points
+            self._refresh_visible_state()
+            self._series_dirty = True
+            self._update_hover_index()
+            self.queue_draw()
+        return True
+
     def _on_motion(self, controller, x, y):
+        # Only a change of hovered sample needs a redraw (cached layers + tooltip)
+        prev = self._hover_index
         self._hover_x = x
         self._update_hover_index()
-        self.queue_draw()
+        if self._hover_index != prev: self.queue_draw()
 
     def _on_leave(self, controller):
+        had_tooltip = self._hover_index is not None
         self._hover_x = None
         self._hover_index = None
-        self.queue_draw()
+        if had_tooltip: self.queue_draw()
 
     def _update_hover_index(self) -> None:
-        if self._hover_x is None or not self._history:
+        num_points = self._visible_count()
+        if self._hover_x is None or not num_points:
             self._hover_index = None
             return
         width = self.get_width()
-        margin_left = 40
-        margin_right = 10
-        chart_width = width - margin_left - margin_right
+        margin_left, _top, chart_width, _h = self._geometry(width, self.get_height())
         if chart_width <= 0:
             self._hover_index = None
             return
-        if self._hover_x < margin_left or self._hover_x > width - margin_right:
+        if self._hover_x < margin_left or self._hover_x > margin_left + chart_width:
             self._hover_index = None
             return
-        num_points = len(self._history)
-        x_step = chart_width / max(CHART_MAX_HISTORY - 1, 1)
+        x_step = chart_width / max(self.visible_points - 1, 1)
         start_x = margin_left + chart_width - (num_points - 1) * x_step
         relative_x = self._hover_x - start_x
         index = round(relative_x / x_step) if x_step > 0 else 0
         index = max(0, min(num_points - 1, index))
         self._hover_index = index
 
+    @staticmethod
+    def _geometry(width, height):
+        """(margin_left, margin_top, chart_width, chart_height) of the plot area"""
+        margin_left = 40
+        margin_right = 10
+        margin_top = 20
+        margin_bottom = 30
+        return margin_left, margin_top, width - margin_left - margin_right, height - margin_top - margin_bottom
+
     def _on_draw(self, area, cr, width, height):
         try:
-            cr.set_source_rgba(0.12, 0.12, 0.12, 1.0)
-            cr.rectangle(0, 0, width, height)
-            cr.fill()
-            margin_left = 40
-            margin_right = 10
-            margin_top = 20
-            margin_bottom = 30
-            chart_width = width - margin_left - margin_right
-            chart_height = height - margin_top - margin_bottom
-            if chart_width <= 0 or chart_height <= 0: return
-            cr.set_source_rgba(0.3, 0.3, 0.3, 0.3)
-            cr.set_line_width(1)
-            for i in range(4):
-                y = margin_top + (chart_height * i / 3)
-                cr.move_to(margin_left, y)
-                cr.line_to(margin_left + chart_width, y)
-                cr.stroke()
-            if not self._history:
-                cr.set_source_rgba(0.5, 0.5, 0.5, 1)
-                cr.set_font_size(14)
-                text = _("Waiting for data...")
-                extents = cr.text_extents(text)
-                cr.move_to(margin_left + (chart_width - extents.width)/2, margin_top + chart_height/2)
-                cr.show_text(text)
-                return
-            lat_vals = [p.latency for p in self._history]
-            fps_vals = [p.fps for p in self._history]
-            bw_vals = [p.bandwidth for p in self._history]
-            lat_norm = [v / max(1, self.max_latency) for v in lat_vals]
-            fps_norm = [v / max(1, self.max_fps) for v in fps_vals]
-            bw_norm = [v / max(1, self.max_bandwidth) for v in bw_vals]
-            self._draw_line(cr, chart_width, chart_height, margin_left, margin_top, bw_norm, (0.0, 0.6, 1.0, 1.0), fill=True)
-            self._draw_line(cr, chart_width, chart_height, margin_left, margin_top, fps_norm, (0.0, 0.8, 0.2, 1.0), fill=False)
-            active_devices = set()
-            for p in self._history:
-                active_devices.update(p.device_latencies.keys())
-            if not active_devices:
-                self._draw_line(cr, chart_width, chart_height, margin_left, margin_top, lat_norm, (1.0, 0.4, 0.0, 1.0))
+            if cairo is None:
+                # Without pycairo surfaces every layer is painted directly
+                self._paint_static(cr, width, height)
+                self._paint_series(cr, width, height)
             else:
-                for dev_name in active_devices:
-                    dev_vals = []
-                    for p in self._history:
-                        val = p.device_latencies.get(dev_name, 0) 
-                        dev_vals.append(val / max(1, self.max_latency))
-                    color = self._get_device_color(dev_name)
-                    self._draw_line(cr, chart_width, chart_height, margin_left, margin_top, dev_vals, color, fill=False)
-            self._draw_legend(cr, width, height, margin_left, active_devices)
-            if self._hover_index is not None and 0 <= self._hover_index < len(self._history):
-                self._draw_tooltip(cr, width, height, margin_left, margin_top, chart_width, chart_height)
-            if self._history:
-                last_point = self._history[-1]
-                if last_point.users_count > 0:
-                    text = _("{} Active Devices").format(last_point.users_count)
-                    cr.set_font_size(14)
-                    ext = cr.text_extents(text)
-                    box_x = width - ext.width - 25
-                    box_y = margin_top + 5
-                    cr.set_source_rgba(0.2, 0.2, 0.2, 0.8)
-                    cr.rectangle(box_x - 5, box_y - 12, ext.width + 10, ext.height + 15)
-                    cr.fill()
-                    cr.set_source_rgba(1, 1, 1, 1)
-                    cr.move_to(box_x, box_y + ext.height)
-                    cr.show_text(text)
+                cr.set_source_surface(self._get_series_layer(width, height), 0, 0)
+                cr.paint()
+            if self._hover_index is not None and 0 <= self._hover_index < self._visible_count():
+                margin_left, margin_top, chart_width, chart_height = self._geometry(width, height)
+                if chart_width > 0 and chart_height > 0:
+                    self._draw_tooltip(cr, width, height, margin_left, margin_top, chart_width, chart_height)
         except Exception:
             pass
 
-    def _draw_line(self, cr, w, h, mx, my, vals, color, fill=False):
-        if not vals: return
+    def _new_layer(self, width, height):
+        scale = max(1, self.get_scale_factor())
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, int(width * scale), int(height * scale))
+        surface.set_device_scale(scale, scale)
+        return surface, (width, height, scale)
+
+    def _get_static_layer(self, width, height):
+        """Background and grid; rebuilt only when the size or scale changes"""
+        key = (width, height, max(1, self.get_scale_factor()))
+        if self._static_layer is None or self._static_key != key:
+            self._static_layer, self._static_key = self._new_layer(width, height)
+            self._paint_static(cairo.Context(self._static_layer), width, height)
+            self._series_dirty = True
+        return self._static_layer
+
+    def _get_series_layer(self, width, height):
+        """Static layer plus series, legend and badges; rebuilt on new data, zoom or resize"""
+        static = self._get_static_layer(width, height)
+        if self._series_layer is None or self._series_dirty or self._series_key != self._static_key:
+            self._series_layer, self._series_key = self._new_layer(width, height)
+            ctx = cairo.Context(self._series_layer)
+            ctx.set_source_surface(static, 0, 0)
+            ctx.paint()
+            self._paint_series(ctx, width, height)
+            self._series_dirty = False
+        return self._series_layer
+
+    def _paint_static(self, cr, width, height):
+        cr.set_source_rgba(0.12, 0.12, 0.12, 1.0)
+        cr.rectangle(0, 0, width, height)
+        cr.fill()
+        margin_left, margin_top, chart_width, chart_height = self._geometry(width, height)
+        if chart_width <= 0 or chart_height <= 0: return
+        cr.set_source_rgba(0.3, 0.3, 0.3, 0.3)
+        cr.set_line_width(1)
+        for i in range(4):
+            y = margin_top + (chart_height * i / 3)
+            cr.move_to(margin_left, y)
+            cr.line_to(margin_left + chart_width, y)
+            cr.stroke()
+
+    def _paint_series(self, cr, width, height):
+        margin_left, margin_top, chart_width, chart_height = self._geometry(width, height)
+        if chart_width <= 0 or chart_height <= 0: return
+        if not len(self._series):
+            cr.set_source_rgba(0.5, 0.5, 0.5, 1)
+            cr.set_font_size(14)
+            text = _("Waiting for data...")
+            extents = cr.text_extents(text)
+            cr.move_to(margin_left + (chart_width - extents.width)/2, margin_top + chart_height/2)
+            cr.show_text(text)
+            return
+        geom = (chart_width, chart_height, margin_left, margin_top)
+        self._draw_series(cr, geom, 'bandwidth', self.max_bandwidth, (0.0, 0.6, 1.0, 1.0), fill=True)
+        self._draw_series(cr, geom, 'fps', self.max_fps, (0.0, 0.8, 0.2, 1.0))
+        if self._loss_visible:
+            self._draw_series(cr, geom, 'frame_loss', self.max_frame_loss, LOSS_COLOR)
+        active_devices = self._active_devices
+        if not active_devices:
+            self._draw_series(cr, geom, 'latency', self.max_latency, (1.0, 0.4, 0.0, 1.0))
+        else:
+            for dev_name in active_devices:
+                self._draw_series(cr, geom, dev_name, self.max_latency, self._get_device_color(dev_name), device=True)
+        self._draw_legend(cr, width, height, margin_left, active_devices)
+        users = int(self._series.last('users'))
+        if users > 0:
+            text = _("{} Active Devices").format(users)
+            cr.set_font_size(14)
+            ext = cr.text_extents(text)
+            box_x = width - ext.width - 25
+            box_y = margin_top + 5
+            cr.set_source_rgba(0.2, 0.2, 0.2, 0.8)
+            cr.rectangle(box_x - 5, box_y - 12, ext.width + 10, ext.height + 15)
+            cr.fill()
+            cr.set_source_rgba(1, 1, 1, 1)
+            cr.move_to(box_x, box_y + ext.height)
+            cr.show_text(text)
+
+    def _draw_series(self, cr, geom, name, scale, color, fill=False, device=False):
+        """Strokes one column straight from the ring slices; NaN samples leave a gap"""
+        w, h, mx, my = geom
+        n = self._visible_count()
+        if not n: return
+        # Decimate to at most one vertex per pixel column
+        step = max(1, math.ceil(n / max(1, w)))
+        x_step = w / max(self.visible_points - 1, 1)
+        x = mx + w - (n - 1) * x_step + ((n - 1) % step) * x_step
+        dx = x_step * step
+        k = h / max(1, scale)
+        base = my + h
+        first_x = last_x = None
+        pen = False
+        for part in self._series.window(name, n, step, device):
+            for v in part:
+                if v != v:
+                    pen = False
+                else:
+                    if pen: cr.line_to(x, base - v * k)
+                    else: cr.move_to(x, base - v * k); pen = True
+                    if first_x is None: first_x = x
+                    last_x = x
+                x += dx
+        if first_x is None: return
         cr.set_source_rgba(*color)
         cr.set_line_width(2)
-        x_step = w / max(CHART_MAX_HISTORY - 1, 1)
-        sx = mx + w - (len(vals) - 1) * x_step
-        for i, v in enumerate(vals): 
-            if i == 0:
-                cr.move_to(sx + i * x_step, my + h * (1 - v))
-            else:
-                cr.line_to(sx + i * x_step, my + h * (1 - v))
-        cr.stroke()
-        if fill:
-            cr.set_source_rgba(color[0], color[1], color[2], 0.15)
-            for i, v in enumerate(vals): 
-                if i == 0:
-                    cr.move_to(sx + i * x_step, my + h * (1 - v))
-                else:
-                    cr.line_to(sx + i * x_step, my + h * (1 - v))
-            cr.line_to(sx + (len(vals) - 1) * x_step, my + h)
-            cr.line_to(sx, my + h)
-            cr.close_path()
-            cr.fill()
+        if not fill:
+            cr.stroke()
+            return
+        cr.stroke_preserve()
+        cr.set_source_rgba(color[0], color[1], color[2], 0.15)
+        cr.line_to(last_x, base)
+        cr.line_to(first_x, base)
+        cr.close_path()
+        cr.fill()
 
     def _draw_legend(self, cr, w, h, margin_left, active_devices=None):
         legend_y = h - 10
@@ -255,21 +337,26 @@ class PerformanceChartWidget(Gtk.DrawingArea):
         if not active_devices:
             offset += draw_item(_("Latency"), self._cur_latency_text, (1.0, 0.4, 0.0, 1.0), offset)
         else:
-            last_point = self._history[-1] if self._history else None
+            last = self._series.device_values(-1)
             for dev in active_devices:
-                val = last_point.device_latencies.get(dev, 0) if last_point else 0
+                val = last.get(dev, 0)
                 color = self._get_device_color(dev)
                 offset += draw_item(dev, f"{val:.0f}ms", color, offset)
         offset += draw_item("FPS", self._cur_fps_text, (0.0, 0.8, 0.2, 1.0), offset)
         if offset > w - 100: 
             legend_y -= 15
             offset = 0
-        draw_item("BW", self._cur_bw_text, (0.0, 0.6, 1.0, 1.0), offset)
+        offset += draw_item("BW", self._cur_bw_text, (0.0, 0.6, 1.0, 1.0), offset)
+        if self._loss_visible:
+            if offset > w - 100:
+                legend_y -= 15
+                offset = 0
+            draw_item(_("Loss"), self._cur_loss_text, LOSS_COLOR, offset)
 
     def _draw_tooltip(self, cr, w, h, mx, my, cw, ch):
-        point = list(self._history)[self._hover_index]
-        num_points = len(self._history)
-        x_step = cw / max(CHART_MAX_HISTORY - 1, 1)
+        num_points = self._visible_count()
+        index = len(self._series) - num_points + self._hover_index
+        x_step = cw / max(self.visible_points - 1, 1)
         start_x = mx + cw - (num_points - 1) * x_step
         hover_x = start_x + self._hover_index * x_step
         cr.set_source_rgba(1, 1, 1, 0.4)
@@ -278,13 +365,18 @@ class PerformanceChartWidget(Gtk.DrawingArea):
         cr.line_to(hover_x, my + ch)
         cr.stroke()
         lines = []
-        if point.device_latencies:
-            for dev, lat in point.device_latencies.items():
+        device_latencies = self._series.device_values(index)
+        if device_latencies:
+            for dev, lat in device_latencies.items():
                 lines.append(f"{dev}: {lat:.0f} ms")
         else:
-            lines.append(f"Lat: {point.latency_text}")
-        lines.append(f"FPS: {point.fps_text}")
-        lines.append(f"BW: {point.bandwidth_text}")
+            lines.append(f"Lat: {self._series.value('latency', index):.0f} ms")
+        lines.append(f"FPS: {self._series.value('fps', index):.0f} FPS")
+        bw_text = self._bw_labels.get(self._series.seq_of(index)) or f"{self._series.value('bandwidth', index):.1f} Mbps"
+        lines.append(f"BW: {bw_text}")
+        frame_loss = self._series.value('frame_loss', index)
+        if frame_loss > 0:
+            lines.append(f"{_('Loss')}: {frame_loss:.1f}%")
         box_width = 130
         box_height = 20 + (len(lines) * 14)
         tooltip_x = min(w - box_width - 10, max(10, hover_x + 10))
@@ -306,9 +398,11 @@ class PerformanceMonitor(Gtk.Box):
     Replaces old text box.
     """
     
-    def __init__(self, sunshine=None):
+    def __init__(self, sunshine=None, stream_stats=None):
         super().__init__(orientation=Gtk.Orientation.VERTICAL)
         self.sunshine = sunshine
+        # Guest side: MoonlightStats parsed from the Moonlight process output
+        self.stream_stats = stream_stats
         self.hostname_cache = {}
         self.add_css_class('card')
         self.set_margin_top(12)
@@ -356,11 +450,32 @@ class PerformanceMonitor(Gtk.Box):
         # Key: IP, Value: {'name': str, 'last_seen': float, 'last_latency': float}
         self._known_devices = {} 
         
+        # One batched ICMP probe per tick for all known devices
+        self._prober = ICMPProber(timeout=1.0)
+        # Sockets on the Sunshine ports, parsed straight from /proc/net
+        self._session_detector = SessionDetector()
+        
+        # Per-second samples persisted under ~/.config/big-remoteplay/metrics/
+        self.recorder = MetricsRecorder('host' if self.sunshine is not None else 'guest')
+        # Host: AdaptiveBitrateController set by HostView while hosting
+        self.bitrate_controller = None
+        # Guests streaming at the last tick
+        self.active_sessions = 0
+        
         self._data_queue = queue.Queue()
         self._worker_thread = None
         self._worker_running = False
         self._worker_event = threading.Event()
         
+        # Guest connect/disconnect in sunshine.log triggers an immediate refresh
+        if self.sunshine is not None and hasattr(self.sunshine, 'log'):
+            self.sunshine.log.subscribe(self._on_session_log_event,
+                                        kinds=(CLIENT_CONNECTED, CLIENT_DISCONNECTED))
+        
+    def _on_session_log_event(self, event):
+        # Tailer thread: only wake the worker, it does the fetch
+        if self._worker_running: self._worker_event.set()
+
     def set_target_fps(self, fps):
         """Sets the expected FPS for idle display"""
         try:
@@ -385,6 +500,7 @@ class PerformanceMonitor(Gtk.Box):
         if self.update_timer_active: return
         self.update_timer_active = True
         GLib.timeout_add(100, self._process_data_queue)
+        self.recorder.start()
         self._start_worker_thread()
         self.update_stats(0, 0, 0, [])
 
@@ -392,6 +508,7 @@ class PerformanceMonitor(Gtk.Box):
         if not self.update_timer_active: return
         self.update_timer_active = False
         self._stop_worker_thread()
+        self.recorder.close()
 
     def _start_worker_thread(self):
         if self._worker_running: return
@@ -419,6 +536,8 @@ class PerformanceMonitor(Gtk.Box):
                 for _ in range(10): # ~1 segundo de pausa
                     if not self._worker_running or self._worker_event.wait(timeout=0.1):
                         break
+                # Woken early by a log event: clear so the next pause is a full one
+                if self._worker_running: self._worker_event.clear()
             except Exception:
                 time.sleep(2)
 
@@ -429,13 +548,16 @@ class PerformanceMonitor(Gtk.Box):
             while not self._data_queue.empty() and processed_count < 10:
                 try:
                     data = self._data_queue.get_nowait()
-                    if len(data) == 6:
+                    frame_loss = 0.0
+                    if len(data) == 7:
+                        latency, fps, bandwidth, sessions, device_latencies, bw_text, frame_loss = data
+                    elif len(data) == 6:
                         latency, fps, bandwidth, sessions, device_latencies, bw_text = data
                     else:
                         latency, fps, bandwidth, sessions, device_latencies = data
                         bw_text = None
                         
-                    self.update_stats(latency, fps, bandwidth, sessions, device_latencies, bw_text)
+                    self.update_stats(latency, fps, bandwidth, sessions, device_latencies, bw_text, frame_loss)
                     processed_count += 1
                 except queue.Empty:
                     break
@@ -540,63 +662,17 @@ class PerformanceMonitor(Gtk.Box):
         # Allow pinging localhost or ::1 for local testing
         if not ip or ip in ['', 'Unknown IP', '0.0.0.0']: return 0.0
         try:
-            import platform
-            system = platform.system()
-            # FORÇAR LOCALE C para garantir ponto decimal e mensagem em inglês
-            env = os.environ.copy()
-            env["LC_ALL"] = "C"
-            
-            if system == "Linux": cmd = ["ping", "-c", "1", "-W", "1", "-n", ip]
-            elif system == "Darwin": cmd = ["ping", "-c", "1", "-t", "1", "-n", ip]
-            elif system == "Windows": cmd = ["ping", "-n", "1", "-w", "1000", ip]
-            else: cmd = ["ping", "-c", "1", "-n", ip]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=1.5, env=env)
-            
-            if result.returncode == 0:
-                # Regex robusto para tempo=1.23, time=1.23, ttl... time=1.23
-                match = re.search(r'(?:time|tempo|ttl)[=<]([\d\.,]+)\s*ms', result.stdout, re.IGNORECASE)
-                if match:
-                    val_str = match.group(1).replace(',', '.')
-                    return float(val_str)
-                # Fallback simples
-                match_fallback = re.search(r'([\d\.,]+)\s*ms', result.stdout)
-                if match_fallback:
-                    val_str = match_fallback.group(1).replace(',', '.')
-                    return float(val_str)
-            return 0.0
+            return self._prober.probe([ip]).get(ip, 0.0)
         except Exception:
             return 0.0
 
     def _detect_sessions_via_ss(self):
-        """Retorna um Dicionário {ip: dados} para facilitar busca"""
-        found_sessions = {}
+        """Retorna um Dicionário {ip: dados} para facilitar busca (lido de /proc/net, sem forkar o ss)"""
         try:
-            sunshine_ports = ['47984', '47989', '48010', '47998', '47999', '48000', '48002', '47990', '48001']
-            cmd = ["ss", "-tun", "-a"]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-            if result.returncode != 0: return {}
-            
-            for line in result.stdout.splitlines():
-                if 'ESTAB' in line or 'UNCONN' in line:
-                    for port in sunshine_ports:
-                        if f":{port}" in line:
-                            parts = line.split()
-                            if len(parts) >= 5:
-                                last_part = parts[-1]
-                                # Regex mais permissivo para pegar IP
-                                ip_match = re.search(r'(\d+\.\d+\.\d+\.\d+)', last_part)
-                                if ip_match:
-                                    ip = ip_match.group(1)
-                                    if ip == '0.0.0.0': continue
-                                    # Allow localhost for testing (127.0.0.1)
-                                    
-                                    if ip not in found_sessions:
-                                        found_sessions[ip] = {'ip': ip, 'name': _('Guest'), 'latency': 0, 'fps': 60}
-                            break
+            # Allow localhost for testing (127.0.0.1)
+            return self._session_detector.detect()
         except Exception:
-            pass
-        return found_sessions
+            return {}
 
     def _fetch_and_process_data(self):
         try:
@@ -621,8 +697,15 @@ class PerformanceMonitor(Gtk.Box):
             fps = safe_float(api_stats.get('fps', 0))
             bandwidth = safe_float(api_stats.get('bitrate', 0)) / 1000.0
 
+            # Guest: decoder-side numbers from Moonlight's own output
+            stream = self.stream_stats.snapshot() if self.stream_stats else {}
+            if not fps: fps = stream.get('decode_fps') or stream.get('rx_fps') or 0.0
+            if not latency_avg: latency_avg = stream.get('latency_ms', 0.0)
+            frame_loss = stream.get('frame_loss_pct', 0.0)
+
             # 2. Pegar dados do SS (Sistema Operacional)
-            ss_sessions_dict = self._detect_sessions_via_ss()
+            # Only remote guests: our own keep-alive API connection (127.0.0.1:47990) and web UI clients are not
+            ss_sessions_dict = {ip: data for ip, data in self._detect_sessions_via_ss().items() if is_stream_peer(data)}
 
             # 3. Mesclar API com SS para garantir IPs
             # Normalizar lista da API
@@ -646,6 +729,7 @@ class PerformanceMonitor(Gtk.Box):
                              resolved = self._resolve_hostname(s_ip)
                              if resolved: s_name = resolved
                     
+                    if s_ip and is_loopback(s_ip): continue
                     normalized_api_sessions.append({'ip': s_ip, 'name': s_name, 'source': 'api', 'id': s.get('id')})
 
             # Adicionar sessões do SS que não estão na API
@@ -696,13 +780,15 @@ class PerformanceMonitor(Gtk.Box):
             
             ips_to_remove = []
             
+            # SEMPRE PINGAR para ter dados no gráfico (todos de uma vez)
+            try: ping_results = self._prober.probe(list(self._known_devices.keys()))
+            except Exception: ping_results = {}
+            
             for ip, data in self._known_devices.items():
                 # Verificar se está "ativo" neste ciclo (veio da API ou SS)
                 is_active_cycle = ip in current_cycle_ips
                 
-                # SEMPRE PINGAR para ter dados no gráfico
-                # Isso resolve o problema de dados faltando
-                lat = self._ping_host(ip)
+                lat = ping_results.get(ip, 0.0)
                 
                 # Lógica de Persistência:
                 # Se pingou > 0: Mantém na lista como 'Online'
@@ -761,6 +847,22 @@ class PerformanceMonitor(Gtk.Box):
             for ip in ips_to_remove:
                 del self._known_devices[ip]
 
+            # Guests actually streaming right now (known devices may linger for 30 s)
+            stream_ips = set(ss_sessions_dict)
+            stream_ips.update(s['ip'] for s in normalized_api_sessions if s['source'] == 'api' and s['ip'])
+            self.active_sessions = len(stream_ips)
+            # Host: per-guest RTT/loss of the guests streaming right now drive the bitrate cap
+            controller = self.bitrate_controller
+            if controller is not None:
+                try:
+                    controller.update({ip: ping_results.get(ip, 0.0) for ip in stream_ips},
+                                      len(stream_ips), safe_float(api_stats.get('bitrate', 0)))
+                except Exception as e:
+                    print(f"DEBUG: Bitrate controller update failed: {e}")
+
+            # What was actually measured this tick (0 = nothing), before the display fallbacks below
+            self.recorder.record(latency_avg, fps, bandwidth, self.active_sessions, device_latencies, frame_loss)
+
             # Calcular médias para linha geral
             if not latency_avg and device_latencies:
                 latency_avg = sum(device_latencies.values()) / len(device_latencies)
@@ -781,18 +883,18 @@ class PerformanceMonitor(Gtk.Box):
                      bw_txt_override = f"{bandwidth:.1f} Mbps (Unlim)"
 
             # Enviar para UI
-            self._data_queue.put((latency_avg, fps, bandwidth, final_display_list, device_latencies, bw_txt_override))
+            self._data_queue.put((latency_avg, fps, bandwidth, final_display_list, device_latencies, bw_txt_override, frame_loss))
             
         except Exception:
             pass
 
-    def update_stats(self, latency, fps, bandwidth, sessions=None, device_latencies=None, bw_text=None):
+    def update_stats(self, latency, fps, bandwidth, sessions=None, device_latencies=None, bw_text=None, frame_loss=0.0):
         try:
             if not self.update_timer_active: return
             sessions, device_latencies = sessions or [], device_latencies or {}
             
             # O gráfico recebe device_latencies, que contém TODOS que responderam ao ping
-            self.chart.add_data_point(latency, fps, bandwidth, users=len(sessions), device_latencies=device_latencies, bw_text_override=bw_text)
+            self.chart.add_data_point(latency, fps, bandwidth, users=len(sessions), device_latencies=device_latencies, bw_text_override=bw_text, frame_loss=frame_loss)
             
             if len(sessions) > 0:
                 if len(sessions) == 1:
@@ -9,7 +9,6 @@ import shutil
 import subprocess
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
 
 from gi.repository import Adw, Gdk, Gio, GLib, Gtk
 
@@ -22,6 +21,7 @@ except:
     HAS_VTE = False
 from utils.i18n import _
 from utils.icons import create_icon_widget
+from utils.network import ICMPProber
 
 
 class AccessInfoWidget(Gtk.Box):
@@ -306,7 +306,7 @@ class PrivateNetworkView(Adw.Bin):
 
         self._worker_running = False
         self._worker_thread = None
-        self._ping_executor = ThreadPoolExecutor(max_workers=10)
+        self._prober = ICMPProber(timeout=1.0)
 
         self.install_data = {}
 
@@ -1428,35 +1428,15 @@ class PrivateNetworkView(Adw.Bin):
 
             GLib.idle_add(self._update_peers_ui, ui_data)
 
-            def do_ping_and_update(idx, node):
-                ip = node["ip"]
-                if not ip or ip == "-":
-                    return
-
-                ping_val = "-"
-                try:
-                    res = subprocess.run(
-                        ["ping", "-c", "2", "-W", "1", "-n", ip],
-                        capture_output=True,
-                        text=True,
-                    )
-                    if res.returncode == 0:
-                        summary_match = re.search(
-                            r"min/avg/max/mdev\s*=\s*[\d.]+/([\d.]+)/", res.stdout
-                        )
-                        if summary_match:
-                            ping_val = f"{summary_match.group(1)} ms"
-                        else:
-                            time_match = re.search(r"time=([\d.,]+)\s*ms", res.stdout)
-                            if time_match:
-                                ping_val = f"{time_match.group(1).replace(',', '.')} ms"
-                except:
-                    pass
-
-                GLib.idle_add(self._update_single_ping, idx, ping_val)
-
+            # Ping every peer at once (two rounds, averaged)
+            ips = [n["ip"] for n in nodes if n["ip"] and n["ip"] != "-"]
+            rtts = self._prober.probe(ips, count=2) if ips else {}
             for i, node in enumerate(nodes):
-                self._ping_executor.submit(do_ping_and_update, i, node)
+                if not node["ip"] or node["ip"] == "-":
+                    continue
+                rtt = rtts.get(node["ip"], 0.0)
+                ping_val = f"{rtt:.3f} ms" if rtt > 0 else "-"
+                GLib.idle_add(self._update_single_ping, i, ping_val)
 
         except:
             pass
@@ -11,18 +11,33 @@ import os
 
 from utils.i18n import _
 from utils.icons import create_icon_widget
+from utils.persistence import DebouncedSaver, file_signature
 import socket
 
 class SunshineConfigManager:
+    # One in-memory copy per process (like MoonlightConfigManager), so HostView syncs
+    # and the preferences page batch into the same pending write
+    _shared_state = {}
+
     def __init__(self):
+        self.__dict__ = self._shared_state
+        if hasattr(self, 'config'):
+            # SunshineHost.configure may have rewritten the file meanwhile
+            self.reload_if_changed()
+            return
         self.config_dir = Path.home() / '.config' / 'big-remoteplay' / 'sunshine'
         self.config_file = self.config_dir / 'sunshine.conf'
         self.config_dir.mkdir(parents=True, exist_ok=True)
+        # Keys set but not written yet; re-applied on top of external rewrites
+        self._pending = set()
+        self._signature = None
+        self._saver = DebouncedSaver(self._render, on_saved=self._on_saved)
         self.config = {}
         self.load()
 
-    def load(self):
-        self.config = {}
+    def _read(self):
+        config = {}
+        self._signature = file_signature(self.config_file)
         if self.config_file.exists():
             try:
                 # Sunshine config is key = value typical format but without sections
@@ -36,25 +51,52 @@ class SunshineConfigManager:
                 cp.read_string(content)
                 
                 for key in cp['DEFAULT']:
-                    self.config[key] = cp['DEFAULT'][key]
+                    config[key] = cp['DEFAULT'][key]
             except Exception as e:
                 print(f"Error loading Sunshine config: {e}")
+        return config
+
+    def load(self):
+        with self._saver.lock:
+            self._saver.cancel()
+            self._pending.clear()
+            self.config = self._read()
+
+    def reload_if_changed(self):
+        with self._saver.lock:
+            if file_signature(self.config_file) != self._signature:
+                self._merge_from_disk()
+
+    def _merge_from_disk(self):
+        pending = {k: self.config[k] for k in self._pending if k in self.config}
+        config = self._read()
+        config.update(pending)
+        self.config = config
+
+    def _render(self):
+        if self._pending and file_signature(self.config_file) != self._signature:
+            self._merge_from_disk()
+        self._pending.clear()
+        return self.config_file, ''.join(f"{key} = {value}\n" for key, value in self.config.items())
+
+    def _on_saved(self, path):
+        with self._saver.lock: self._signature = file_signature(path)
+        print(f"DEBUG: SunshineConfigManager - Saved config to {path}")
 
     def save(self):
-        try:
-            with open(self.config_file, 'w') as f:
-                for key, value in self.config.items():
-                    f.write(f"{key} = {value}\n")
-                print(f"DEBUG: SunshineConfigManager - Saved config to {self.config_file}")
-        except Exception as e:
-            print(f"Error saving Sunshine config: {e}")
+        """Writes sunshine.conf now (the in-memory copy wins over the file)"""
+        with self._saver.lock: self._pending.clear()
+        self._saver.save()
 
     def get(self, key, default=None):
         return self.config.get(key, str(default))
 
     def set(self, key, value):
-        self.config[key] = str(value)
-        self.save()
+        """Sets a key; written shortly after, batched with other changes"""
+        with self._saver.lock:
+            self.config[key] = str(value)
+            self._pending.add(key)
+        self._saver.mark_dirty()
 
 
 class SunshinePreferencesPage(Adw.PreferencesPage):
@@ -127,6 +169,9 @@ class SunshinePreferencesPage(Adw.PreferencesPage):
             description = None
 
         current_val = self.config.get(key, default)
+        if key == "max_bitrate" and self.main_config:
+            # sunshine.conf holds the adaptive cap while hosting; show the user's own ceiling
+            current_val = str(self.main_config.get('host', {}).get('max_bitrate_kbps', current_val))
         
         row = None
         if type_ == "switch":
@@ -169,7 +214,16 @@ class SunshinePreferencesPage(Adw.PreferencesPage):
             except:
                 val = float(default) if default else 0
             spin.set_value(val)
-            spin.connect('value-changed', lambda w: self.config.set(key, int(w.get_value()))) 
+            def on_spin_change(w):
+                self.config.set(key, int(w.get_value()))
+                
+                # The bitrate controller caps streams under this value
+                if key == "max_bitrate" and self.main_config:
+                    h = self.main_config.get('host', {})
+                    h['max_bitrate_kbps'] = int(w.get_value())
+                    self.main_config.set('host', h)
+                    
+            spin.connect('value-changed', on_spin_change)
             spin.set_valign(Gtk.Align.CENTER)
             row.add_suffix(spin)
             
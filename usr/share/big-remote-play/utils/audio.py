@@ -1,7 +1,15 @@
+import os
+import re
+import select
+import shutil
 import subprocess
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import Callable, List, Dict, Optional
 from utils.i18n import _
 
+_EVENT_RE = re.compile(r"Event '(\w+)' on ([\w-]+) #(-?\d+)")
+
 class AudioManager:
     """
     Simplified and robust Audio Manager for Big Remote Play.
@@ -10,6 +18,9 @@ class AudioManager:
     2. Host + Guest (Streaming Active)
     """
 
+    # Guards handing _monitor_proc over between stop/start and a respawning loop
+    _monitor_lock = threading.Lock()
+
     def is_virtual(self, name: str, description: str = "") -> bool:
         """Checks if a sink is virtual"""
         n = name.lower()
@@ -53,6 +64,11 @@ class AudioManager:
             return []
 
     def get_default_sink(self) -> Optional[str]:
+        if self.is_event_monitor_running():
+            return self._default_sink
+        return self._query_default_sink()
+
+    def _query_default_sink(self) -> Optional[str]:
         try:
             res = subprocess.run(['pactl', 'get-default-sink'], capture_output=True, text=True)
             return res.stdout.strip() if res.returncode == 0 else None
@@ -61,6 +77,8 @@ class AudioManager:
     def set_default_sink(self, sink_name: str):
         try:
             subprocess.run(['pactl', 'set-default-sink', sink_name], check=False)
+            if self.is_event_monitor_running():
+                self._default_sink = sink_name
         except: pass
 
     def enable_streaming_audio(self, host_sink: str) -> bool:
@@ -98,7 +116,7 @@ class AudioManager:
             ], check=True)
             
             # 2. Small delay and ensure volumes
-            import time; time.sleep(0.5)
+            time.sleep(0.5)
             subprocess.run(['pactl', 'set-sink-mute', 'SunshineGameSink', '0'], check=False)
             subprocess.run(['pactl', 'set-sink-volume', 'SunshineGameSink', '100%'], check=False)
 
@@ -192,54 +210,208 @@ class AudioManager:
         except Exception as e:
             print(f"Error cleaning modules: {e}")
 
+    def _read_sinks_map(self) -> Dict[str, str]:
+        """Returns sink ID -> sink name mapping"""
+        sinks_map = {}
+        res_s = subprocess.run(['pactl', 'list', 'short', 'sinks'], capture_output=True, text=True)
+        for l in res_s.stdout.splitlines():
+            p = l.split()
+            if len(p) > 1: sinks_map[p[0]] = p[1]
+        return sinks_map
+
+    def _read_sink_inputs(self, sinks_map: Dict[str, str]) -> List[Dict]:
+        """Parses 'pactl list sink-inputs' into app dicts (unfiltered)"""
+        apps = []
+        res = subprocess.run(['pactl', 'list', 'sink-inputs'], capture_output=True, text=True)
+        current = {}
+        
+        for line in res.stdout.splitlines():
+            line = line.strip()
+            if line.startswith('Sink Input #'):
+                if current: apps.append(current)
+                current = {'id': line.split('#')[1], 'name': _('Unknown'), 'icon': 'audio-x-generic-symbolic'}
+            elif line.startswith('Sink:'):
+                sid = line.split(':')[1].strip()
+                current['sink_id'] = sid
+                current['sink_name'] = sinks_map.get(sid, sid)
+            elif 'application.name = ' in line:
+                val = line.split('=', 1)[1].strip().strip('"')
+                if val: current['name'] = val
+            elif 'application.icon_name = ' in line:
+                val = line.split('=', 1)[1].strip().strip('"')
+                if val: current['icon'] = val
+            elif 'media.name = ' in line and current.get('name') == _('Unknown'):
+                val = line.split('=', 1)[1].strip().strip('"')
+                if val: current['name'] = val
+                
+        if current: apps.append(current)
+        return apps
+
+    @staticmethod
+    def _filter_internal(apps: List[Dict]) -> List[Dict]:
+        # Ignore internal PulseAudio/Pipewire streams that cause loops if moved
+        def is_internal(name):
+            n = name.lower()
+            return any(x in n for x in ['sunshine', 'monitor', 'loopback', 'simultaneous', 'combine', 'output to'])
+        
+        return [a for a in apps if not is_internal(a.get('name', ''))]
+
     def get_apps(self) -> List[Dict]:
         """
         Lists applications playing audio (Sink Inputs).
+        Served from the in-memory model while the event monitor is running.
         """
-        apps = []
+        if self.is_event_monitor_running():
+            with self._model_lock:
+                return self._filter_internal([dict(a) for a in self._apps.values()])
         try:
-            # ID mapping -> Sink Name for reference
-            sinks_map = {}
-            res_s = subprocess.run(['pactl', 'list', 'short', 'sinks'], capture_output=True, text=True)
-            for l in res_s.stdout.splitlines():
-                p = l.split()
-                if len(p) > 1: sinks_map[p[0]] = p[1]
-
-            res = subprocess.run(['pactl', 'list', 'sink-inputs'], capture_output=True, text=True)
-            current = {}
-            
-            for line in res.stdout.splitlines():
-                line = line.strip()
-                if line.startswith('Sink Input #'):
-                    if current: apps.append(current)
-                    current = {'id': line.split('#')[1], 'name': _('Unknown'), 'icon': 'audio-x-generic-symbolic'}
-                elif line.startswith('Sink:'):
-                    sid = line.split(':')[1].strip()
-                    current['sink_id'] = sid
-                    current['sink_name'] = sinks_map.get(sid, sid)
-                elif 'application.name = ' in line:
-                    val = line.split('=', 1)[1].strip().strip('"')
-                    if val: current['name'] = val
-                elif 'application.icon_name = ' in line:
-                    val = line.split('=', 1)[1].strip().strip('"')
-                    if val: current['icon'] = val
-                elif 'media.name = ' in line and current.get('name') == _('Unknown'):
-                    val = line.split('=', 1)[1].strip().strip('"')
-                    if val: current['name'] = val
-                    
-            if current: apps.append(current)
-            
-            # Filter internal streams if necessary
-            # Ignore internal PulseAudio/Pipewire streams that cause loops if moved
-            def is_internal(name):
-                n = name.lower()
-                return any(x in n for x in ['sunshine', 'monitor', 'loopback', 'simultaneous', 'combine', 'output to'])
-            
-            return [a for a in apps if not is_internal(a.get('name', ''))]
-            
+            return self._filter_internal(self._read_sink_inputs(self._read_sinks_map()))
         except Exception: 
             return []
 
+    # --- Event monitor (pactl subscribe) ---
+
+    def is_event_monitor_running(self) -> bool:
+        return getattr(self, '_monitor_running', False)
+
+    def start_event_monitor(self, callback: Optional[Callable[[set], None]] = None) -> bool:
+        """
+        Keeps one long-lived 'pactl subscribe' running and maintains an
+        in-memory model of sinks, sink inputs and the default sink.
+        callback(kinds) is called from the monitor thread after each burst of
+        events, with the set of changed facilities ('sink', 'sink-input', 'server').
+        Returns False if the subscription could not be started.
+        """
+        if self.is_event_monitor_running():
+            self._monitor_callback = callback
+            return True
+        if not shutil.which('pactl'): return False
+
+        self._model_lock = threading.Lock()
+        self._monitor_callback = callback
+        try:
+            proc = self._spawn_subscribe()
+            self._refresh_model({'sink', 'sink-input', 'server'})
+        except Exception as e:
+            print(f"Error starting audio event monitor: {e}")
+            return False
+
+        with self._monitor_lock:
+            self._monitor_proc = proc
+            self._monitor_running = True
+        threading.Thread(target=self._event_loop, args=(proc,), name="AudioManager-Events", daemon=True).start()
+        return True
+
+    def stop_event_monitor(self):
+        """Stops the pactl subscription; get_apps() falls back to polling"""
+        with self._monitor_lock:
+            self._monitor_running = False
+            proc = getattr(self, '_monitor_proc', None)
+            self._monitor_proc = None
+        if proc:
+            try:
+                proc.terminate()
+                proc.wait(timeout=1)
+            except Exception:
+                try: proc.kill()
+                except: pass
+
+    def _spawn_subscribe(self):
+        return subprocess.Popen(['pactl', 'subscribe'], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, env=dict(os.environ, LC_ALL='C'))
+
+    def _event_loop(self, proc):
+        """Reads one monitor's subscription; exits once stop/start replaced it"""
+        pending = set()  # facilities to notify
+        reload = set()   # facilities whose model must be re-read
+        buf = b''
+        timeout = 1.0
+        while self._monitor_proc is proc:
+            try:
+                fd = proc.stdout.fileno()
+                readable, _w, _x = select.select([fd], [], [], timeout)
+                chunk = os.read(fd, 4096) if readable else b''
+            except (OSError, ValueError):
+                readable, chunk = [True], b''
+            if chunk:
+                buf += chunk
+                *lines, buf = buf.split(b'\n')
+                for line in lines:
+                    event = self._parse_event(line.decode('utf-8', errors='replace'))
+                    if event:
+                        pending.add(event[0])
+                        if event[1]: reload.add(event[0])
+                # Keep draining briefly so a burst of events is applied once
+                timeout = 0.03
+                continue
+            if readable:
+                # EOF: sound server restarted, resubscribe after a short pause
+                try: proc.stdout.close()
+                except: pass
+                time.sleep(1)
+                if self._monitor_proc is not proc: break
+                try: new_proc = self._spawn_subscribe()
+                except Exception:
+                    with self._monitor_lock:
+                        if self._monitor_proc is proc:
+                            self._monitor_running = False
+                            self._monitor_proc = None
+                    break
+                with self._monitor_lock:
+                    # Stopped (or stopped and restarted) during the pause: the new child is not ours
+                    current = self._monitor_proc is proc
+                    if current: self._monitor_proc = new_proc
+                if not current:
+                    try: new_proc.terminate(); new_proc.wait(timeout=1)
+                    except Exception: pass
+                    break
+                proc = new_proc
+                buf = b''
+                pending.update({'sink', 'sink-input', 'server'})
+                reload.update(pending)
+            if pending:
+                kinds, pending = pending, set()
+                to_reload, reload = reload, set()
+                try: self._refresh_model(to_reload)
+                except Exception as e: print(f"Audio event monitor error: {e}")
+                cb = self._monitor_callback
+                if cb:
+                    try: cb(kinds)
+                    except Exception as e: print(f"Audio event callback error: {e}")
+            timeout = 1.0
+
+    def _parse_event(self, line: str) -> Optional[tuple]:
+        """Parses "Event 'new' on sink-input #42" into (facility, needs_reload)"""
+        m = _EVENT_RE.match(line.strip())
+        if not m: return None
+        ev, facility, idx = m.groups()
+        if facility == 'sink-input':
+            if ev == 'remove':
+                # Removal needs no re-read: drop it from the model right away
+                with self._model_lock:
+                    self._apps.pop(idx, None)
+                return facility, False
+            return facility, True
+        if facility == 'sink' and ev in ('new', 'remove'):
+            return facility, True
+        if facility == 'server':
+            return facility, True
+        return None
+
+    def _refresh_model(self, kinds: set):
+        if 'sink' in kinds or not hasattr(self, '_sinks'):
+            sinks = self._read_sinks_map()
+            with self._model_lock:
+                self._sinks = sinks
+                for app in getattr(self, '_apps', {}).values():
+                    app['sink_name'] = sinks.get(app.get('sink_id'), app.get('sink_id', ''))
+        if 'sink-input' in kinds or not hasattr(self, '_apps'):
+            apps = self._read_sink_inputs(self._sinks)
+            with self._model_lock:
+                self._apps = {a['id']: a for a in apps}
+        if 'server' in kinds or not hasattr(self, '_default_sink'):
+            self._default_sink = self._query_default_sink()
+
     def move_app(self, app_id: str, sink_name: str):
         try:
             subprocess.run(['pactl', 'move-sink-input', str(app_id), sink_name], check=False)
@@ -250,4 +422,5 @@ class AudioManager:
         # Tries to find real hardware to restore
         hardware = self.get_passive_sinks()
         target = hardware[0]['name'] if hardware else None
+        self.stop_event_monitor()
         self.disable_streaming_audio(target)
@@ -0,0 +1,273 @@
+"""
+Guest <-> host throughput, jitter and loss measurement
+"""
+
+import ipaddress
+import socket
+import struct
+import threading
+import time
+
+# Fica fora da faixa usada pelo Sunshine (47984-48010)
+BANDWIDTH_PORT = 48100
+
+_UDP_HEADER = struct.Struct('!IQ')  # seq, host send time (ns)
+_UDP_PAYLOAD = 1200                 # Abaixo do MTU, como os pacotes de vídeo do Sunshine
+_TCP_CHUNK = b'\0' * 65536
+_MAX_DURATION = 10.0
+_MAX_UDP_MBPS = 300.0
+# Tailscale and other overlay VPNs hand out carrier-grade NAT addresses
+_VPN_NET = ipaddress.ip_network('100.64.0.0/10')
+
+
+def is_lan_peer(ip: str) -> bool:
+    """Private-LAN, link-local, loopback or overlay-VPN address (never a public one)"""
+    try: addr = ipaddress.ip_address(ip.split('%')[0])
+    except ValueError: return False
+    if getattr(addr, 'ipv4_mapped', None): addr = addr.ipv4_mapped
+    return addr.is_private or addr.is_link_local or addr.is_loopback or (addr.version == 4 and addr in _VPN_NET)
+
+
+class BandwidthServer:
+    """
+    Measurement service that runs next to Sunshine on the host.
+
+    Protocol (one TCP control connection per test, line based):
+      'TCP <seconds>'                -> host sends bulk data for <seconds>, then closes
+      'UDP <mbps> <seconds> <token>' -> guest sends <token> over UDP to the same port,
+                                        host paces datagrams to that address at <mbps>
+                                        and answers 'DONE <sent>' on the control socket
+    Data always flows host -> guest, the same direction as the stream.
+    Only LAN/VPN peers are served, one test at a time across all of them
+    (others get 'BUSY'), so the host never pushes more than one flow next to
+    the stream. The UDP address must have the control connection's IP (no
+    reflecting a flow to a spoofed source).
+    """
+
+    def __init__(self, port: int = BANDWIDTH_PORT):
+        self.port = port
+        self._tcp = None
+        self._udp = None
+        self._running = False
+        self._udp_waiters = {}  # token -> [Event, addr, peer ip]
+        self._testing = False
+        self._lock = threading.Lock()
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self) -> bool:
+        if self._running: return True
+        try:
+            self._tcp = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+            self._tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._tcp.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+            self._tcp.bind(('::', self.port)); self._tcp.listen(4)
+            self._udp = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+            self._udp.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+            self._udp.bind(('::', self.port))
+        except OSError as e:
+            print(f"DEBUG: BandwidthServer could not bind port {self.port}: {e}")
+            self.stop()
+            return False
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._udp_loop, daemon=True).start()
+        print(f"DEBUG: BandwidthServer listening on {self.port}")
+        return True
+
+    def stop(self):
+        self._running = False
+        for s in (self._tcp, self._udp):
+            if s:
+                try: s.close()
+                except: pass
+        self._tcp = self._udp = None
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, addr = self._tcp.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(conn, addr[0]), daemon=True).start()
+
+    def _udp_loop(self):
+        # Guests announce their UDP address by sending the test token
+        while self._running:
+            try:
+                data, addr = self._udp.recvfrom(256)
+            except OSError:
+                break
+            with self._lock:
+                waiter = self._udp_waiters.get(data.strip())
+            # The token alone is not proof: anyone can register one and spoof the source
+            if waiter and addr[0] == waiter[2]:
+                waiter[1] = addr
+                waiter[0].set()
+
+    def _handle(self, conn, peer: str):
+        if not is_lan_peer(peer):
+            print(f"DEBUG: BandwidthServer refused non-LAN peer {peer}")
+            try: conn.close()
+            except OSError: pass
+            return
+        with self._lock:
+            busy = self._testing
+            self._testing = True
+        if busy:
+            try: conn.sendall(b"BUSY\n"); conn.close()
+            except OSError: pass
+            return
+        try:
+            conn.settimeout(5.0)
+            line = conn.makefile('rb').readline(256).decode(errors='ignore').split()
+            if not line: return
+            if line[0] == 'TCP' and len(line) == 2:
+                self._send_tcp(conn, min(float(line[1]), _MAX_DURATION))
+            elif line[0] == 'UDP' and len(line) == 4:
+                rate = min(float(line[1]), _MAX_UDP_MBPS)
+                sent = self._send_udp(line[3].encode(), peer, rate, min(float(line[2]), _MAX_DURATION))
+                conn.sendall(f"DONE {sent}\n".encode())
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock: self._testing = False
+            try: conn.close()
+            except: pass
+
+    def _send_tcp(self, conn, duration: float):
+        conn.settimeout(duration + 2.0)
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            conn.sendall(_TCP_CHUNK)
+
+    def _send_udp(self, token: bytes, peer: str, rate_mbps: float, duration: float) -> int:
+        waiter = [threading.Event(), None, peer]
+        with self._lock: self._udp_waiters[token] = waiter
+        try:
+            if not waiter[0].wait(3.0): return 0
+            addr = waiter[1]
+        finally:
+            with self._lock: self._udp_waiters.pop(token, None)
+
+        pad = b'\0' * (_UDP_PAYLOAD - _UDP_HEADER.size)
+        interval = (_UDP_PAYLOAD * 8) / (rate_mbps * 1e6)
+        start = time.monotonic()
+        end = start + duration
+        seq = 0
+        while True:
+            now = time.monotonic()
+            if now >= end: break
+            # Paced in small bursts: sleep granularity is far coarser than one packet
+            due = int((now - start) / interval) + 1
+            while seq < due:
+                try: self._udp.sendto(_UDP_HEADER.pack(seq, time.monotonic_ns()) + pad, addr)
+                except OSError: pass
+                seq += 1
+            time.sleep(0.001)
+        return seq
+
+
+def _measure_tcp(ip: str, port: int, duration: float) -> float:
+    """Sustained TCP throughput in Mbps, ignoring the slow-start window"""
+    warmup = min(0.5, duration / 4)
+    with socket.create_connection((ip, port), timeout=3.0) as s:
+        s.settimeout(duration + 3.0)
+        s.sendall(f"TCP {duration}\n".encode())
+        buf = bytearray(262144)
+        start = time.monotonic()
+        counted = 0; t0 = None
+        first = True
+        while True:
+            n = s.recv_into(buf)
+            if not n: break
+            if first and buf[:4] == b'BUSY': raise OSError("the host is running another bandwidth test")
+            first = False
+            now = time.monotonic()
+            if now - start >= warmup:
+                if t0 is None: t0 = now
+                else: counted += n
+        elapsed = (time.monotonic() - t0) if t0 else 0
+    return (counted * 8 / elapsed / 1e6) if elapsed > 0 else 0.0
+
+
+def _measure_udp(ip: str, port: int, rate_mbps: float, duration: float) -> dict:
+    """Receives a paced UDP flow; returns received rate, loss and RFC 3550 jitter"""
+    import os
+    token = os.urandom(8).hex()
+    family = socket.AF_INET6 if ':' in ip else socket.AF_INET
+    addr = socket.getaddrinfo(ip, port, family, socket.SOCK_DGRAM)[0][4]
+    with socket.create_connection((ip, port), timeout=3.0) as ctrl, \
+            socket.socket(family, socket.SOCK_DGRAM) as udp:
+        udp.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        udp.connect(addr)
+        ctrl.sendall(f"UDP {rate_mbps:.2f} {duration} {token}\n".encode())
+        udp.send(token.encode())
+
+        received = 0; max_seq = -1; jitter = 0.0; prev_transit = None
+        first = last = None
+        deadline = time.monotonic() + duration + 3.0
+        udp.settimeout(1.0)
+        buf = bytearray(2048)
+        while time.monotonic() < deadline:
+            try:
+                n = udp.recv_into(buf)
+            except socket.timeout:
+                if first is not None: break  # Fluxo terminou
+                udp.send(token.encode())  # Token may have been lost
+                continue
+            if n < _UDP_HEADER.size: continue
+            arrival = time.monotonic_ns()
+            seq, sent_ns = _UDP_HEADER.unpack_from(buf)
+            received += 1; max_seq = max(max_seq, seq)
+            if first is None: first = arrival
+            last = arrival
+            # Clock offset between hosts cancels out in the transit difference
+            transit = arrival - sent_ns
+            if prev_transit is not None:
+                jitter += (abs(transit - prev_transit) - jitter) / 16.0
+            prev_transit = transit
+
+        ctrl.settimeout(3.0)
+        try:
+            reply = ctrl.makefile('rb').readline(64).split()
+            sent = int(reply[1]) if len(reply) == 2 and reply[0] == b'DONE' else max_seq + 1
+        except (OSError, ValueError):
+            reply, sent = [], max_seq + 1
+        if reply[:1] == [b'BUSY']: raise OSError("the host is running another bandwidth test")
+
+    elapsed = ((last - first) / 1e9) if first is not None and last > first else 0
+    return {
+        'received_mbps': (received * _UDP_PAYLOAD * 8 / elapsed / 1e6) if elapsed else 0.0,
+        'loss': (1.0 - received / sent) if sent > 0 else 1.0,
+        'jitter_ms': jitter / 1e6,
+    }
+
+
+def suggest_bitrate(tcp_mbps: float, udp: dict, headroom: float = 0.7) -> float:
+    """Bitrate (Mbps) that leaves headroom under the measured capacity"""
+    capacity = tcp_mbps
+    if udp.get('received_mbps'):
+        capacity = min(capacity, udp['received_mbps']) if capacity else udp['received_mbps']
+    value = capacity * headroom
+    # Loss and jitter mean the link cannot sustain its peak; back off further
+    value *= max(0.3, 1.0 - udp.get('loss', 0.0) * 5)
+    if udp.get('jitter_ms', 0.0) > 20: value *= 0.8
+    return value
+
+
+def measure_bandwidth(ip: str, port: int = BANDWIDTH_PORT, duration: float = 3.0) -> dict:
+    """
+    Measures the link from the host at `ip`: sustained TCP throughput, then a
+    UDP flow at 90% of it for loss and jitter. Raises OSError if the host's
+    measurement service is unreachable.
+    """
+    ip = ip.strip('[]')
+    tcp_mbps = _measure_tcp(ip, port, duration)
+    udp = _measure_udp(ip, port, max(1.0, min(tcp_mbps * 0.9, _MAX_UDP_MBPS)), duration)
+    return {
+        'tcp_mbps': tcp_mbps,
+        **udp,
+        'suggested_mbps': suggest_bitrate(tcp_mbps, udp),
+    }
@@ -5,6 +5,7 @@ Application configuration management
 import json
 import os
 from pathlib import Path
+from utils.persistence import DebouncedSaver
 
 class Config:
     """Configuration manager"""
@@ -15,10 +16,14 @@ class Config:
         
         self.config_dir.mkdir(parents=True, exist_ok=True)
         
+        # set() only marks the file dirty; one atomic write per burst of changes
+        self._saver = DebouncedSaver(self._render)
         self.config = self.load()
         
     def load(self):
         """Loads configuration"""
+        # Unsaved changes reach the file first so they are not read back stale
+        if hasattr(self, 'config'): self._saver.flush()
         if self.config_file.exists():
             try:
                 with open(self.config_file, 'r') as f:
@@ -29,22 +34,22 @@ class Config:
         else:
             return self.default_config()
             
+    def _render(self):
+        return self.config_file, json.dumps(self.config, indent=2)
+            
     def save(self):
-        """Saves configuration"""
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
-        except Exception as e:
-            print(f"Error saving configuration: {e}")
+        """Saves configuration now"""
+        self._saver.save()
             
     def get(self, key, default=None):
         """Gets configuration value"""
         return self.config.get(key, default)
         
     def set(self, key, value):
-        """Sets configuration value"""
-        self.config[key] = value
-        self.save()
+        """Sets configuration value (written shortly after, batched)"""
+        with self._saver.lock:
+            self.config[key] = value
+        self._saver.mark_dirty()
         
     def default_config(self):
         """Returns default configuration"""
@@ -1,30 +1,234 @@
 import os
 import json
-import re
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
+from utils import vdf
+
+CACHE_VERSION = 2
+PLATFORMS = ('Steam', 'Lutris', 'Heroic')
+
+# Steam EAppState bits (appmanifest StateFlags)
+STATE_FULLY_INSTALLED = 4
+# Uninstalled, update running/paused/started, files missing/corrupt, uninstalling,
+# validating, downloading, staging... (not UpdateRequired = 2: Steam still launches those)
+STATE_BUSY_MASK = 1 | 32 | 128 | 256 | 512 | 1024 | 2048 | 0x10000 | 0x20000 | 0x40000 | 0x80000 | 0x100000 | 0x200000 | 0x400000 | 0x800000
+
+# appinfo common.type values that are launchable from the picker
+_STEAM_GAME_TYPES = ('game', 'demo', 'application')
+_DONE = object()
+
+
+class GameLibraryCache:
+    """
+    On-disk cache of parsed launcher files (~/.config/big-remoteplay/games_cache.json).
+
+    Each entry is keyed by file path and stores the file's mtime/size and the
+    games parsed from it, so only new or changed manifests are parsed again.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = path or (Path.home() / '.config' / 'big-remoteplay' / 'games_cache.json')
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self._entries = data.get('files', {})
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty: return
+            data = {'version': CACHE_VERSION, 'files': dict(self._entries)}
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Error saving game cache: {e}")
+
+    def is_fresh(self, path: Path) -> bool:
+        """True if the cached entry for `path` matches the file on disk"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        with self._lock:
+            entry = self._entries.get(str(path))
+            return bool(entry) and entry['mtime'] == st.st_mtime_ns and entry['size'] == st.st_size
+
+    def get(self, path: Path, parser, platform: str) -> list:
+        """
+        Returns the games of `path`, re-parsing only if mtime/size changed.
+        A parser returns None when the file could not be read (e.g. caught
+        mid-rewrite): that is not cached, so the next scan tries again.
+        """
+        key = str(path)
+        try:
+            st = os.stat(key)
+        except OSError:
+            return []
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['mtime'] == st.st_mtime_ns and entry['size'] == st.st_size:
+                return entry['games']
+        games = parser(path)
+        if games is None: return []
+        with self._lock:
+            self._entries[key] = {'platform': platform, 'mtime': st.st_mtime_ns, 'size': st.st_size, 'games': games}
+            self._dirty = True
+        return games
+
+    def prune(self, platform: str, seen: set):
+        """Drops entries of `platform` whose files were not seen in the last scan"""
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if e.get('platform') == platform and k not in seen]
+            for k in stale: del self._entries[k]
+            if stale: self._dirty = True
+
+    def games(self, platform: str = None) -> list:
+        """Cached games without touching the launcher files"""
+        with self._lock:
+            return [g for e in self._entries.values()
+                    if platform is None or e.get('platform') == platform
+                    for g in e['games']]
+
 
 class GameDetector:
     """Detects installed games on various platforms"""
     
-    def __init__(self):
+    def __init__(self, cache: GameLibraryCache = None):
         self.home = Path.home()
+        self.cache = cache or GameLibraryCache()
+        self._appinfo = None
         
     def detect_all(self):
         """Detects all supported games"""
-        games = []
-        games.extend(self.detect_steam())
-        games.extend(self.detect_lutris())
-        games.extend(self.detect_heroic())
-        return sorted(games, key=lambda x: x['name'])
+        return self.sort_games(self.iter_games())
 
     def detect_steam(self):
         """Detects Steam games"""
-        games = []
+        return list(self.iter_games(['Steam']))
+
+    def detect_lutris(self):
+        """Detects Lutris games via YAML config files"""
+        return list(self.iter_games(['Lutris']))
+
+    def detect_heroic(self):
+        """Detects Heroic Launcher games"""
+        return list(self.iter_games(['Heroic']))
+
+    def iter_games(self, platforms=None, include_unplayable=False):
+        """
+        Yields games as they are found. Each launcher backend and each Steam
+        library folder is scanned on its own worker thread, so a slow HDD
+        library does not hold back the others. Results are unsorted.
+        Games that are not fully installed or are updating are skipped unless
+        `include_unplayable` is set.
+        """
+        platforms = platforms or PLATFORMS
+        jobs = []
+        if 'Steam' in platforms:
+            for lib in self._steam_libraries():
+                jobs.append(('Steam', lambda lib=lib: self._steam_manifests(lib), self._parse_acf))
+            jobs.append(('Steam', self._steam_shortcut_files, self._parse_shortcuts))
+        if 'Lutris' in platforms:
+            jobs.append(('Lutris', self._lutris_files, self._parse_lutris))
+        if 'Heroic' in platforms:
+            jobs.append(('Heroic', self._heroic_files, self._parse_heroic))
+
+        q = queue.Queue()
+        seen_files = {p: set() for p in platforms}
+        def run(platform, list_files, parser):
+            try:
+                for f in list_files():
+                    seen_files[platform].add(str(f))
+                    for game in self.cache.get(f, parser, platform): q.put(game)
+            except Exception as e:
+                print(f"Error scanning {platform} games: {e}")
+            finally:
+                q.put(_DONE)
+
+        # Same game may appear in more than one file (e.g. Heroic library.json and installed.json)
+        seen_ids = set()
+        if jobs:
+            with ThreadPoolExecutor(max_workers=min(8, len(jobs)), thread_name_prefix="GameScan") as ex:
+                for job in jobs: ex.submit(run, *job)
+                pending = len(jobs)
+                while pending:
+                    game = q.get()
+                    if game is _DONE:
+                        pending -= 1; continue
+                    key = (game['platform'], game['id'])
+                    if key in seen_ids: continue
+                    if not include_unplayable and game.get('playable') is False: continue
+                    seen_ids.add(key)
+                    yield game
+
+        # Only reached when fully consumed: the file list is complete
+        for platform in platforms: self.cache.prune(platform, seen_files[platform])
+        self.cache.save()
+
+    @staticmethod
+    def sort_games(games, order: str = 'name') -> list:
+        """order='name' (alphabetical) or 'recent' (last played first, then name)"""
+        if order == 'recent':
+            return sorted(games, key=lambda g: (-g.get('last_played', 0), g['name'].lower()))
+        return sorted(games, key=lambda x: x['name'])
+
+    def get_cached(self, platform: str = None, order: str = 'name') -> list:
+        """Returns the last known games immediately (no file access besides the cache)"""
+        games = [g for g in self._dedup(self.cache.games(platform)) if g.get('playable') is not False]
+        return self.sort_games(games, order)
+
+    def refresh_async(self, callback, platform: str = None, on_game=None, order: str = 'name'):
+        """
+        Re-validates the cache in a background thread. `on_game(game)` (optional)
+        receives each game as soon as it is found, then callback(games) gets the
+        sorted list. Both run on the scan thread.
+        """
+        def run():
+            try:
+                games = []
+                for game in self.iter_games([platform] if platform else None):
+                    games.append(game)
+                    if on_game: on_game(game)
+                callback(self.sort_games(games, order))
+            except Exception as e:
+                print(f"Error refreshing games: {e}")
+        threading.Thread(target=run, daemon=True).start()
+
+    @staticmethod
+    def _dedup(games):
+        seen = set(); out = []
+        for g in games:
+            key = (g['platform'], g['id'])
+            if key not in seen:
+                seen.add(key); out.append(g)
+        return out
+
+    def _steam_root(self):
         steam_root = self.home / '.local/share/Steam'
         if not steam_root.exists():
             steam_root = self.home / '.steam/steam'
-            
-        if not steam_root.exists():
+        return steam_root if steam_root.exists() else None
+
+    def _steam_libraries(self) -> list:
+        """steamapps folders of every Steam library"""
+        steam_root = self._steam_root()
+        if not steam_root:
             return []
             
         library_folders = [steam_root / 'steamapps']
@@ -33,10 +237,12 @@ class GameDetector:
         vdf_path = steam_root / 'steamapps' / 'libraryfolders.vdf'
         if vdf_path.exists():
             try:
-                content = vdf_path.read_text()
-                # Simple regex extraction
-                paths = re.findall(r'"path"\s+"([^"]+)"', content)
-                for p in paths:
+                data = vdf.load(vdf_path)
+                folders = data.get('libraryfolders') or data.get('LibraryFolders') or {}
+                for key, entry in folders.items():
+                    # New format: "0" { "path" "..." }, old format: "1" "/path"
+                    p = entry.get('path') if isinstance(entry, dict) else (entry if key.isdigit() else None)
+                    if not p: continue
                     lib_path = Path(p) / 'steamapps'
                     # Avoid duplicates
                     if lib_path.resolve() != (steam_root / 'steamapps').resolve():
@@ -45,65 +251,122 @@ class GameDetector:
                 print(f"Error reading Steam library: {e}")
                 pass
                 
-        for lib in library_folders:
-            if not lib.exists(): continue
-            for acf in lib.glob('appmanifest_*.acf'):
-                try:
-                    content = acf.read_text()
-                    name_match = re.search(r'"name"\s+"([^"]+)"', content)
-                    id_match = re.search(r'"appid"\s+"(\d+)"', content)
-                    
-                    if name_match and id_match:
-                        name = name_match.group(1)
-                        # Filter 'Steamworks Common Redistributables' and 'Proton'
-                        if "Steamworks" in name or "Proton" in name or "Runtime" in name:
-                            continue
-                            
-                        games.append({
-                            'name': name,
-                            'id': id_match.group(1),
-                            'platform': 'Steam',
-                            'cmd': f'steam steam://rungameid/{id_match.group(1)}',
-                            'icon': 'steam' # Placeholder
-                        })
-                except:
-                    pass
-        return games
+        return [lib for lib in library_folders if lib.exists()]
 
-    def detect_lutris(self):
-        """Detects Lutris games via YAML config files"""
+    def _steam_manifests(self, lib: Path) -> list:
+        manifests = list(lib.glob('appmanifest_*.acf'))
+        # App types for manifests that will be (re)parsed, in one appinfo.vdf pass
+        stale = [m.stem.split('_', 1)[1] for m in manifests if not self.cache.is_fresh(m)]
+        stale = [a for a in stale if a.isdigit()]
+        if stale and self._get_appinfo(): self._appinfo.app_types(stale)
+        return manifests
+
+    def _get_appinfo(self):
+        if self._appinfo is None:
+            steam_root = self._steam_root()
+            path = steam_root / 'appcache' / 'appinfo.vdf' if steam_root else None
+            self._appinfo = vdf.SteamAppInfo(path) if path and path.exists() else False
+        return self._appinfo
+
+    def _parse_acf(self, acf: Path) -> Optional[list]:
+        # Scalars only: reading stops before InstalledDepots/UserConfig
+        try:
+            app = vdf.read_header(acf).get('AppState', {})
+        except (OSError, UnicodeError, ValueError):
+            return None
+        name, appid = app.get('name'), app.get('appid', '')
+        # Every manifest has both: without them the file was read mid-write
+        if not name or not appid.isdigit(): return None
+
+        app_type = None
+        if self._get_appinfo():
+            app_type = self._appinfo.app_types([appid]).get(int(appid))
+        if app_type is not None:
+            if app_type not in _STEAM_GAME_TYPES: return []
+        # No appinfo: filter 'Steamworks Common Redistributables' and 'Proton' by name
+        elif "Steamworks" in name or "Proton" in name or "Runtime" in name:
+            return []
+
+        def num(key):
+            try: return int(app.get(key, 0))
+            except ValueError: return 0
+        flags = num('StateFlags')
+        return [{
+            'name': name,
+            'id': appid,
+            'platform': 'Steam',
+            'cmd': f'steam steam://rungameid/{appid}',
+            'icon': 'steam', # Placeholder
+            'installdir': app.get('installdir', ''),
+            'library': str(acf.parent.parent),
+            'size_on_disk': num('SizeOnDisk'),
+            'last_updated': num('LastUpdated'),
+            'last_played': num('LastPlayed'),
+            'state_flags': flags,
+            'playable': bool(flags & STATE_FULLY_INSTALLED) and not flags & STATE_BUSY_MASK,
+        }]
+
+    def _steam_shortcut_files(self) -> list:
+        steam_root = self._steam_root()
+        return list(steam_root.glob('userdata/*/config/shortcuts.vdf')) if steam_root else []
+
+    @staticmethod
+    def _parse_shortcuts(path: Path) -> Optional[list]:
+        """Non-Steam games added to the Steam library (binary shortcuts.vdf)"""
+        try:
+            data = vdf.load_binary(path)
+        except (OSError, ValueError, IndexError) as e:
+            print(f"Error reading Steam shortcuts {path}: {e}")
+            return None
         games = []
-        games_dir = self.home / '.config/lutris/games'
-        
-        if games_dir.exists():
-            for p in games_dir.glob('*.yml'):
-                try:
-                    content = p.read_text()
-                    name = None
-                    slug = p.stem
-                    
-                    # Simple linewise YAML parser
-                    for line in content.splitlines():
-                        if line.strip().startswith('name:'):
-                            name = line.split(':', 1)[1].strip().strip('"\'')
-                            break
-                    
-                    if name:
-                        games.append({
-                            'name': name,
-                            'id': slug,
-                            'platform': 'Lutris',
-                            'cmd': f'lutris lutris:rungame/{slug}',
-                            'icon': 'lutris'
-                        })
-                except:
-                    pass
+        for entry in (data.get('shortcuts') or data.get('Shortcuts') or {}).values():
+            if not isinstance(entry, dict): continue
+            name = entry.get('AppName') or entry.get('appname')
+            appid = entry.get('appid')
+            if not name or appid is None: continue
+            # rungameid for shortcuts is the 64-bit game ID built from the 32-bit appid
+            game_id = ((appid & 0xFFFFFFFF) << 32) | 0x02000000
+            games.append({
+                'name': name,
+                'id': str(game_id),
+                'platform': 'Steam',
+                'cmd': f'steam steam://rungameid/{game_id}',
+                'icon': 'steam',
+                'last_played': entry.get('LastPlayTime', 0) or 0,
+                'shortcut': True,
+            })
         return games
 
-    def detect_heroic(self):
-        """Detects Heroic Launcher games"""
-        games = []
-        
+    def _lutris_files(self) -> list:
+        games_dir = self.home / '.config/lutris/games'
+        return list(games_dir.glob('*.yml')) if games_dir.exists() else []
+
+    @staticmethod
+    def _parse_lutris(p: Path) -> Optional[list]:
+        try:
+            content = p.read_text()
+            name = None
+            slug = p.stem
+            
+            # Simple linewise YAML parser
+            for line in content.splitlines():
+                if line.strip().startswith('name:'):
+                    name = line.split(':', 1)[1].strip().strip('"\'')
+                    break
+            
+            if name:
+                return [{
+                    'name': name,
+                    'id': slug,
+                    'platform': 'Lutris',
+                    'cmd': f'lutris lutris:rungame/{slug}',
+                    'icon': 'lutris'
+                }]
+        except:
+            return None
+        return []
+
+    def _heroic_files(self) -> list:
         # Possible paths for Heroic configurations
         # v2.5+ structure vs older versions
         heroic_config = self.home / '.config/heroic'
@@ -140,53 +403,55 @@ class GameDetector:
              for f in store_cache.glob('*_library.json'):
                  possible_files.append(f)
 
+        return [p for p in possible_files if p.exists()]
+
+    @staticmethod
+    def _parse_heroic(p: Path) -> Optional[list]:
+        games = []
         processed_ids = set()
+        try:
+            content = p.read_text()
+            if not content: return None
+            
+            data = json.loads(content)
+            items = []
+            
+            if isinstance(data, dict):
+                if 'library' in data: 
+                     items = data['library']
+                elif 'installed' in data:
+                     items = data['installed']
+                else:
+                     # Try iterating values if it is a game dictionary
+                     # Ex: {'AppName': {...}, ...}
+                     items = data.values()
+            elif isinstance(data, list):
+                items = data
+                
+            for item in items:
+                if not isinstance(item, dict): continue
+                
+                # Try extracting info
+                app_name = item.get('app_name') or item.get('appName') or item.get('id')
+                title = item.get('title') or item.get('appName') # Fallback
+                
+                # Check if installed (some jsons show entire library)
+                is_installed = item.get('is_installed', True) # Assume true if no flag
+                if not is_installed:
+                     continue
 
-        for p in possible_files:
-            if p.exists():
-                try:
-                    content = p.read_text()
-                    if not content: continue
-                    
-                    data = json.loads(content)
-                    items = []
-                    
-                    if isinstance(data, dict):
-                        if 'library' in data: 
-                             items = data['library']
-                        elif 'installed' in data:
-                             items = data['installed']
-                        else:
-                             # Try iterating values if it is a game dictionary
-                             # Ex: {'AppName': {...}, ...}
-                             items = data.values()
-                    elif isinstance(data, list):
-                        items = data
-                        
-                    for item in items:
-                        if not isinstance(item, dict): continue
-                        
-                        # Try extracting info
-                        app_name = item.get('app_name') or item.get('appName') or item.get('id')
-                        title = item.get('title') or item.get('appName') # Fallback
-                        
-                        # Check if installed (some jsons show entire library)
-                        is_installed = item.get('is_installed', True) # Assume true if no flag
-                        if not is_installed:
-                             continue
-
-                        if app_name and title and app_name not in processed_ids:
-                             games.append({
-                                'name': title,
-                                'id': app_name,
-                                'platform': 'Heroic',
-                                'cmd': f'heroic://launch/{app_name}', # Protocol handler
-                                'icon': 'heroic' 
-                            })
-                             processed_ids.add(app_name)
-                             
-                except Exception as e:
-                    print(f"Error reading Heroic {p}: {e}")
-                    pass
-                    
+                if app_name and title and app_name not in processed_ids:
+                     games.append({
+                        'name': title,
+                        'id': app_name,
+                        'platform': 'Heroic',
+                        'cmd': f'heroic://launch/{app_name}', # Protocol handler
+                        'icon': 'heroic' 
+                    })
+                     processed_ids.add(app_name)
+                     
+        except Exception as e:
+            print(f"Error reading Heroic {p}: {e}")
+            return None
+            
         return games
@@ -0,0 +1,133 @@
+"""
+Staged, cancellable background jobs that report back on the GTK main loop
+"""
+
+import threading
+from typing import Callable, List, Optional, Tuple
+
+
+class JobCancelled(Exception):
+    """Raised by Job.check() inside a stage once the job was cancelled"""
+
+
+class Job:
+    """
+    Runs `stages`, a list of (label, callable(job)) pairs, in order on a
+    worker thread. The UI only receives callbacks, always on the main loop:
+
+      on_progress(job, label, index, total)  before each stage
+      on_done(job)                           all stages finished
+      on_error(job, exc)                     a stage raised
+      on_cancelled(job)                      cancel() was honoured
+
+    Cancellation is cooperative: it is checked between stages and wherever a
+    stage calls job.check(). Stages register rollbacks with add_undo(); when
+    the job fails or is cancelled they run newest first (on the worker), so
+    a half-done start leaves nothing behind. Stages pass data to each other
+    and to the callbacks through job.results.
+    """
+
+    def __init__(self, name: str, stages: List[Tuple[str, Callable]],
+                 on_progress: Callable = None, on_done: Callable = None,
+                 on_error: Callable = None, on_cancelled: Callable = None):
+        self.name = name
+        self.stages = list(stages)
+        self.results = {}
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self._undo = []
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._thread = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        if self._cancel.is_set(): raise JobCancelled(self.name)
+
+    def add_undo(self, fn: Callable):
+        self._undo.append(fn)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and not self._finished.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._finished.wait(timeout)
+
+    def start(self, after: 'Job' = None):
+        """Starts the worker; with `after`, only once that job has fully finished"""
+        self._thread = threading.Thread(target=self._run, args=(after,), name=f"Job-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _post(self, callback, *args):
+        if callback is None: return
+        from gi.repository import GLib
+        def call():
+            try: callback(self, *args)
+            except Exception as e: print(f"DEBUG: Job {self.name} callback failed: {e}")
+            return False
+        GLib.idle_add(call)
+
+    def _rollback(self):
+        while self._undo:
+            fn = self._undo.pop()
+            try: fn()
+            except Exception as e: print(f"DEBUG: Job {self.name} rollback step failed: {e}")
+
+    def _run(self, after: Optional['Job']):
+        try:
+            if after is not None: after.wait()
+            total = len(self.stages)
+            for index, (label, stage) in enumerate(self.stages):
+                self.check()
+                print(f"DEBUG: Job {self.name} [{index + 1}/{total}] {label}")
+                self._post(self.on_progress, label, index, total)
+                stage(self)
+            self._post(self.on_done)
+        except JobCancelled:
+            print(f"DEBUG: Job {self.name} cancelled")
+            self._rollback()
+            self._post(self.on_cancelled)
+        except Exception as e:
+            print(f"DEBUG: Job {self.name} failed: {e}")
+            self._rollback()
+            self._post(self.on_error, e)
+        finally:
+            self._finished.set()
+
+
+class JobRunner:
+    """
+    One job at a time for a resource (e.g. the Sunshine server): submitting
+    a job cancels the one in progress and starts after it has unwound.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = None
+
+    def submit(self, job: Job, cancel_current: bool = True) -> Job:
+        with self._lock:
+            previous = self._current
+            if previous is not None and cancel_current: previous.cancel()
+            self._current = job
+        return job.start(after=previous)
+
+    def busy(self) -> bool:
+        job = self._current
+        return job is not None and job.is_running()
+
+    def current(self) -> Optional[Job]:
+        return self._current
+
+    def cancel(self):
+        job = self._current
+        if job is not None: job.cancel()
@@ -0,0 +1,140 @@
+"""
+Live mDNS browsing of Sunshine hosts through the Avahi D-Bus API
+"""
+
+import socket
+import time
+from typing import Callable, Dict, List
+
+from utils.network import classify_service_ip, service_hosts_list
+
+AVAHI_BUS = 'org.freedesktop.Avahi'
+AVAHI_SERVER = 'org.freedesktop.Avahi.Server'
+AVAHI_BROWSER = 'org.freedesktop.Avahi.ServiceBrowser'
+
+AVAHI_IF_UNSPEC = -1
+AVAHI_PROTO_UNSPEC = -1
+
+
+class AvahiServiceBrowser:
+    """
+    Long-running browser for `_nvstream._tcp` on the system Avahi daemon.
+
+    Keeps a cache of resolved services keyed by service name, with one
+    address per (interface, protocol). Avahi expires records according to
+    their TTL and announces it with ItemRemove, so the cache never holds
+    entries the daemon itself considers gone. Every add/remove calls
+    `on_change(hosts)` with the full host list, on the GLib main loop.
+    """
+
+    def __init__(self, service_type: str = '_nvstream._tcp', on_change: Callable = None):
+        self.service_type = service_type
+        self.on_change = on_change
+        self._bus = None
+        self._sub_id = None
+        self._browser_path = None
+        self._services = {}  # name -> {'hostname', 'port', 'addrs': {(iface, proto): ip_info}}
+        self.all_for_now = False
+
+    def is_running(self) -> bool:
+        return self._browser_path is not None
+
+    def start(self) -> bool:
+        """Creates the Avahi ServiceBrowser. Returns False if Avahi is unavailable"""
+        if self.is_running(): return True
+        try:
+            from gi.repository import Gio, GLib
+            self._bus = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+            # Subscribe before creating the browser so no ItemNew is lost;
+            # signals from other browsers are filtered by object path
+            self._sub_id = self._bus.signal_subscribe(
+                AVAHI_BUS, AVAHI_BROWSER, None, None, None,
+                Gio.DBusSignalFlags.NONE, self._on_signal
+            )
+            res = self._bus.call_sync(
+                AVAHI_BUS, '/', AVAHI_SERVER, 'ServiceBrowserNew',
+                GLib.Variant('(iissu)', (AVAHI_IF_UNSPEC, AVAHI_PROTO_UNSPEC, self.service_type, 'local', 0)),
+                GLib.VariantType('(o)'), Gio.DBusCallFlags.NONE, 2000, None
+            )
+            self._browser_path = res.unpack()[0]
+            return True
+        except Exception as e:
+            print(f"DEBUG: Avahi D-Bus browser unavailable: {e}")
+            self.stop()
+            return False
+
+    def stop(self):
+        """Frees the browser and drops the cache"""
+        if self._bus:
+            if self._browser_path:
+                try:
+                    from gi.repository import Gio
+                    self._bus.call_sync(AVAHI_BUS, self._browser_path, AVAHI_BROWSER, 'Free',
+                                        None, None, Gio.DBusCallFlags.NONE, 1000, None)
+                except: pass
+            if self._sub_id is not None:
+                try: self._bus.signal_unsubscribe(self._sub_id)
+                except: pass
+        self._bus = self._sub_id = self._browser_path = None
+        self._services.clear()
+        self.all_for_now = False
+
+    def get_hosts(self) -> List[Dict]:
+        """Returns the cached hosts in the NetworkDiscovery format"""
+        host_map = {}
+        for name, svc in self._services.items():
+            if not svc['addrs']: continue
+            ips = sorted(svc['addrs'].values(), key=lambda i: i['seen'])
+            host_map[name] = {'name': name, 'hostname': svc['hostname'], 'port': svc['port'],
+                              'status': 'online', 'ips': ips}
+        return service_hosts_list(host_map)
+
+    def _notify(self):
+        if self.on_change:
+            try: self.on_change(self.get_hosts())
+            except Exception as e: print(f"DEBUG: mDNS on_change failed: {e}")
+
+    def _on_signal(self, conn, sender, path, iface, signal, params):
+        if path != self._browser_path: return
+        if signal == 'ItemNew':
+            self._resolve(*params.unpack()[:5])
+        elif signal == 'ItemRemove':
+            interface, protocol, name = params.unpack()[:3]
+            svc = self._services.get(name)
+            if svc and svc['addrs'].pop((interface, protocol), None) is not None:
+                if not svc['addrs']: del self._services[name]
+                self._notify()
+        elif signal == 'AllForNow':
+            self.all_for_now = True
+        elif signal == 'Failure':
+            print(f"DEBUG: Avahi browser failure: {params.unpack()[0]}")
+
+    def _resolve(self, interface, protocol, name, stype, domain):
+        from gi.repository import Gio, GLib
+        # Resolve on the same protocol the item was seen on, so IPv4 and IPv6
+        # addresses arrive as separate items without extra name lookups
+        self._bus.call(
+            AVAHI_BUS, '/', AVAHI_SERVER, 'ResolveService',
+            GLib.Variant('(iisssiu)', (interface, protocol, name, stype, domain, protocol, 0)),
+            None, Gio.DBusCallFlags.NONE, 5000, None, self._on_resolved, (interface, protocol)
+        )
+
+    def _on_resolved(self, bus, result, key):
+        try:
+            res = bus.call_finish(result).unpack()
+        except Exception as e:
+            print(f"DEBUG: Avahi resolve failed: {e}")
+            return
+        if not self.is_running(): return
+        interface, _proto, name, _type, _domain, hostname, _aproto, address, port = res[:9]
+        try: if_name = socket.if_indextoname(interface)
+        except OSError: if_name = str(interface)
+
+        svc = self._services.setdefault(name, {'hostname': hostname, 'port': port, 'addrs': {}})
+        svc['hostname'], svc['port'] = hostname, port
+        prev = svc['addrs'].get(key)
+        ip_info = classify_service_ip(address, if_name)
+        ip_info['seen'] = prev['seen'] if prev and prev['ip'] == ip_info['ip'] else time.monotonic()
+        svc['addrs'][key] = ip_info
+        if not prev or prev['ip'] != ip_info['ip']:
+            self._notify()
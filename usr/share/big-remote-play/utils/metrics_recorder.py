@@ -0,0 +1,252 @@
+"""
+Per-session performance metrics on disk (compact binary, memory-mapped reads)
+"""
+
+import mmap
+import struct
+import threading
+import time
+from bisect import bisect_left
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+METRICS_DIR = Path.home() / '.config' / 'big-remoteplay' / 'metrics'
+
+# File layout:
+#   header  : magic 'BRPM', version u16, reserved u16, session start (f64 unix time)
+#   records : 'D' device id u16, name length u16, utf-8 name      (device table entry)
+#             'S' time f64, latency f32, fps f32, bandwidth f32, frame loss f32,
+#                 sessions u16, device count u8, then (id u16, latency f32) per device
+# Every file (including rotated parts) carries its own device table.
+MAGIC = b'BRPM'
+VERSION = 1
+SUFFIX = '.brpm'
+_HEADER = struct.Struct('<4sHHd')
+_DEVICE = struct.Struct('<cHH')
+_SAMPLE = struct.Struct('<cdffffHB')
+_DEVICE_SAMPLE = struct.Struct('<Hf')
+
+
+class MetricsRecorder:
+    """
+    Appends one sample per monitor tick to
+    ~/.config/big-remoteplay/metrics/<session>.<part>.brpm.
+
+    Samples are packed into a small in-memory buffer and written when it
+    fills or every `flush_interval` seconds, so memory stays bounded and the
+    disk sees a few writes per minute. A part is rotated at `max_file_bytes`,
+    and the oldest files are deleted once the directory exceeds
+    `max_total_bytes`.
+    """
+
+    def __init__(self, label: str = 'session', directory: Path = METRICS_DIR,
+                 max_file_bytes: int = 8 * 1024 * 1024, max_total_bytes: int = 64 * 1024 * 1024,
+                 flush_bytes: int = 64 * 1024, flush_interval: float = 10.0):
+        self.label = label
+        self.directory = Path(directory)
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.session_id = None
+        self.path = None
+        self._file = None
+        self._part = 0
+        self._written = 0
+        self._buffer = bytearray()
+        self._device_ids = {}
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def is_recording(self) -> bool:
+        return self._file is not None
+
+    def start(self) -> bool:
+        with self._lock:
+            if self._file: return True
+            self.session_id = time.strftime('%Y%m%d-%H%M%S') + f"-{self.label}"
+            self._part = 0
+            try:
+                self._open_part()
+            except OSError as e:
+                print(f"DEBUG: Metrics recorder disabled: {e}")
+                self._file = None
+                return False
+            return True
+
+    def _open_part(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / f"{self.session_id}.{self._part}{SUFFIX}"
+        self._file = open(self.path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION, 0, time.time()))
+        self._written = _HEADER.size
+        self._device_ids = {}
+        self._last_flush = time.monotonic()
+        self._enforce_retention()
+
+    def record(self, latency: float, fps: float, bandwidth: float, sessions: int = 0,
+               device_latencies: Dict[str, float] = None, frame_loss: float = 0.0, ts: float = None):
+        """Buffers one sample (any thread); 0 means the value was not measured"""
+        with self._lock:
+            if not self._file: return
+            devices = list((device_latencies or {}).items())[:255]
+            for name, _lat in devices:
+                if name not in self._device_ids:
+                    dev_id = len(self._device_ids)
+                    self._device_ids[name] = dev_id
+                    raw = name.encode('utf-8')[:0xFFFF]
+                    self._buffer += _DEVICE.pack(b'D', dev_id, len(raw)) + raw
+            self._buffer += _SAMPLE.pack(b'S', ts if ts is not None else time.time(), latency, fps,
+                                         bandwidth, frame_loss, min(sessions, 0xFFFF), len(devices))
+            for name, lat in devices:
+                self._buffer += _DEVICE_SAMPLE.pack(self._device_ids[name], lat)
+            if len(self._buffer) >= self.flush_bytes or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._file or not self._buffer: return
+        try:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._written += len(self._buffer)
+        except OSError as e:
+            print(f"DEBUG: Metrics write failed: {e}")
+        self._buffer.clear()
+        self._last_flush = time.monotonic()
+        if self._written >= self.max_file_bytes:
+            self._file.close()
+            self._part += 1
+            try: self._open_part()
+            except OSError as e:
+                print(f"DEBUG: Metrics rotation failed: {e}")
+                self._file = None
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._file:
+                try: self._file.close()
+                except OSError: pass
+            self._file = None
+
+    def _enforce_retention(self):
+        files = list_sessions(self.directory)
+        total = 0
+        for path in files:  # Newest first
+            try: size = path.stat().st_size
+            except OSError: continue
+            total += size
+            if total > self.max_total_bytes and path != self.path:
+                try: path.unlink()
+                except OSError: pass
+
+
+def list_sessions(directory: Path = METRICS_DIR) -> List[Path]:
+    """Recorded files, newest first"""
+    try:
+        files = [p for p in Path(directory).iterdir() if p.suffix == SUFFIX]
+    except OSError:
+        return []
+    return sorted(files, key=_file_order, reverse=True)
+
+
+def _file_order(path: Path):
+    # <session>.<part>.brpm: parts compare numerically (10 after 9)
+    session, _sep, part = path.stem.rpartition('.')
+    return (session, int(part) if part.isdigit() else 0)
+
+
+class MetricsSession:
+    """
+    Read-only view of one recorded file, memory-mapped. Record offsets and
+    timestamps are indexed once on open; samples are decoded on access, so
+    even an hour-long session only costs its index in memory.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{self.path} is empty")
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError(f"{self.path} is not a metrics file")
+        magic, version, _res, self.start_time = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not a metrics file")
+        self.devices = {}
+        self._offsets = array('Q')
+        self._times = array('d')
+        self._index()
+
+    def _index(self):
+        buf, pos, end = self._map, _HEADER.size, len(self._map)
+        while pos < end:
+            kind = buf[pos:pos + 1]
+            if kind == b'D' and pos + _DEVICE.size <= end:
+                _k, dev_id, length = _DEVICE.unpack_from(buf, pos)
+                if pos + _DEVICE.size + length > end: break
+                self.devices[dev_id] = bytes(buf[pos + _DEVICE.size:pos + _DEVICE.size + length]).decode('utf-8', errors='replace')
+                pos += _DEVICE.size + length
+            elif kind == b'S' and pos + _SAMPLE.size <= end:
+                count = buf[pos + _SAMPLE.size - 1]
+                size = _SAMPLE.size + count * _DEVICE_SAMPLE.size
+                if pos + size > end: break  # Truncated tail (crash mid-write)
+                self._offsets.append(pos)
+                self._times.append(struct.unpack_from('<d', buf, pos + 1)[0])
+                pos += size
+            else:
+                break
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        try: self._map.close()
+        except Exception: pass
+        self._file.close()
+
+    def sample(self, index: int) -> dict:
+        pos = self._offsets[index]
+        _k, ts, latency, fps, bandwidth, loss, sessions, count = _SAMPLE.unpack_from(self._map, pos)
+        devices = {}
+        pos += _SAMPLE.size
+        for _i in range(count):
+            dev_id, lat = _DEVICE_SAMPLE.unpack_from(self._map, pos)
+            devices[self.devices.get(dev_id, str(dev_id))] = lat
+            pos += _DEVICE_SAMPLE.size
+        return {'time': ts, 'latency': latency, 'fps': fps, 'bandwidth': bandwidth,
+                'frame_loss': loss, 'sessions': sessions, 'devices': devices}
+
+    def samples(self, start: float = None, end: float = None) -> Iterator[dict]:
+        """Samples with start <= time < end (unix seconds), oldest first"""
+        i = bisect_left(self._times, start) if start is not None else 0
+        stop = bisect_left(self._times, end) if end is not None else len(self._times)
+        for index in range(i, stop):
+            yield self.sample(index)
+
+    def nearest(self, ts: float) -> Optional[dict]:
+        """Sample closest to a unix time (e.g. 'it stuttered at 21:40')"""
+        if not self._times: return None
+        i = bisect_left(self._times, ts)
+        if i == len(self._times) or (i > 0 and ts - self._times[i - 1] < self._times[i] - ts): i -= 1
+        return self.sample(i)
+
+    @property
+    def end_time(self) -> float:
+        return self._times[-1] if self._times else self.start_time
@@ -1,6 +1,26 @@
 import configparser
+import io
 import os
+import re
 from pathlib import Path
+from utils.persistence import DebouncedSaver, file_signature
+
+_QT_ESCAPE_RE = re.compile(r'\\(x[0-9a-fA-F]{1,4}|[0-7]{1,3}|.)')
+_QT_ESCAPES = {'n': b'\n', 'r': b'\r', 't': b'\t', 'a': b'\a', 'b': b'\b', 'f': b'\f', 'v': b'\v'}
+
+
+def decode_qt_bytearray(value: str) -> bytes:
+    """Decodes a QSettings '@ByteArray(...)' value (as written to Moonlight.conf) to bytes"""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"': value = value[1:-1]
+    if value.startswith('@ByteArray(') and value.endswith(')'): value = value[11:-1]
+    def repl(m):
+        esc = m.group(1)
+        if esc[0] == 'x': return bytes([int(esc[1:], 16) & 0xFF]).decode('latin-1')
+        if esc.isdigit(): return bytes([int(esc, 8) & 0xFF]).decode('latin-1')
+        return _QT_ESCAPES.get(esc, esc.encode('latin-1')).decode('latin-1')
+    return _QT_ESCAPE_RE.sub(repl, value).encode('latin-1', errors='replace')
+
 
 class MoonlightConfigManager:
     _shared_state = {}
@@ -28,12 +48,17 @@ class MoonlightConfigManager:
             self.config_file = paths[0]
             self.config_file.parent.mkdir(parents=True, exist_ok=True)
 
+        # Keys changed by us and not written yet; re-applied if Moonlight rewrites the file meanwhile
+        self._pending = set()
+        self._saver = DebouncedSaver(self._render, on_saved=self._on_saved)
         self.cp = configparser.ConfigParser()
         self.load()
 
     def load(self):
+        self._signature = None
         if self.config_file and self.config_file.exists():
             try:
+                self._signature = file_signature(self.config_file)
                 self.cp.read(self.config_file)
             except Exception as e:
                 print(f"Error loading Moonlight config: {e}")
@@ -42,20 +67,98 @@ class MoonlightConfigManager:
             self.cp.add_section('General')
         
     def reload(self):
-        """Force reload from file"""
-        self.cp = configparser.ConfigParser()
-        self.load()
+        """Force reload from file (drops unsaved changes)"""
+        with self._saver.lock:
+            self._saver.cancel()
+            self._pending.clear()
+            self.cp = configparser.ConfigParser()
+            self.load()
+
+    def reload_if_changed(self):
+        """Re-reads Moonlight.conf if Moonlight rewrote it (e.g. after pairing)"""
+        with self._saver.lock:
+            if file_signature(self.config_file) != self._signature:
+                self._merge_from_disk()
+
+    def _merge_from_disk(self):
+        # Built aside and swapped in, so readers never see a half-loaded parser
+        pending = {k: self.cp.get('General', k, raw=True) for k in self._pending if self.cp.has_option('General', k)}
+        cp = configparser.ConfigParser()
+        self._signature = file_signature(self.config_file)
+        try: cp.read(self.config_file)
+        except Exception as e: print(f"Error loading Moonlight config: {e}")
+        if 'General' not in cp: cp.add_section('General')
+        for k, v in pending.items(): cp.set('General', k, v)
+        self.cp = cp
+
+    def get_hosts(self):
+        """
+        Hosts stored by Moonlight in the [hosts] array, as
+        [{'uuid', 'name', 'addresses', 'paired', 'apps'}]. A host is paired
+        when Moonlight kept its server certificate.
+        """
+        self.reload_if_changed()
+        if 'hosts' not in self.cp: return []
+        entries = {}
+        for key in self.cp['hosts']:
+            idx, sep, field = key.partition('\\')
+            if sep and idx.isdigit():
+                entries.setdefault(int(idx), {})[field] = self.cp.get('hosts', key, raw=True, fallback='')
+
+        hosts = []
+        for idx in sorted(entries):
+            e = entries[idx]
+            addresses = []
+            for k in ('localaddress', 'remoteaddress', 'ipv6address', 'manualaddress', 'address'):
+                addr = e.get(k, '').strip().strip('[]')
+                if addr and addr not in addresses: addresses.append(addr)
+            apps = {}
+            for field, value in e.items():
+                parts = field.split('\\')
+                if len(parts) == 3 and parts[0] == 'apps' and parts[1].isdigit() and parts[2] == 'name':
+                    apps[int(parts[1])] = value
+            cert = decode_qt_bytearray(e.get('srvcert', ''))
+            hosts.append({
+                'uuid': e.get('uuid', '').strip(),
+                'name': e.get('hostname', '').strip(),
+                'addresses': addresses,
+                'paired': bool(cert.strip()),
+                'srvcert': cert,
+                'apps': [apps[i] for i in sorted(apps)],
+            })
+        return hosts
+
+    def get_client_identity(self):
+        """Moonlight's own client certificate/key (PEM bytes) and uniqueid, or None if not generated yet"""
+        self.reload_if_changed()
+        raw = {k: self.cp.get('General', k, raw=True, fallback='') for k in ('certificate', 'key', 'uniqueid')}
+        cert, key = decode_qt_bytearray(raw['certificate']), decode_qt_bytearray(raw['key'])
+        if b'BEGIN CERTIFICATE' not in cert or b'PRIVATE KEY' not in key: return None
+        return {'certificate': cert, 'key': key, 'uniqueid': raw['uniqueid'].strip()}
+
+    def _render(self):
+        # Moonlight writes this file too: never overwrite what it saved since our last read
+        if self._pending and file_signature(self.config_file) != self._signature:
+            self._merge_from_disk()
+        self._pending.clear()
+        buf = io.StringIO()
+        self.cp.write(buf)
+        return self.config_file, buf.getvalue()
+
+    def _on_saved(self, path):
+        with self._saver.lock: self._signature = file_signature(path)
 
     def save(self):
-        try:
-            with open(self.config_file, 'w') as f:
-                self.cp.write(f)
-        except Exception as e:
-            print(f"Error saving Moonlight config: {e}")
+        """Writes Moonlight.conf now (the in-memory copy wins over the file)"""
+        with self._saver.lock: self._pending.clear()
+        self._saver.save()
 
     def get(self, key, default=None):
         return self.cp.get('General', key, fallback=str(default))
 
     def set(self, key, value):
-        self.cp.set('General', key, str(value))
-        self.save()
+        """Sets a [General] key; written shortly after, batched with other changes"""
+        with self._saver.lock:
+            self.cp.set('General', key, str(value))
+            self._pending.add(key)
+        self._saver.mark_dirty()
@@ -2,14 +2,60 @@
 Network host discovery
 """
 
+import os
+import re
+import select
 import socket
+import struct
 import subprocess
-import re
+import threading
+import time
 from typing import List, Dict
 from utils.i18n import _
 
 from utils.logger import Logger
 
+
+def classify_service_ip(ip: str, interface: str) -> Dict:
+    """Classifies an mDNS address as ipv4 / ipv6_link_local / ipv6_global"""
+    ip_type = 'ipv4'
+    if ':' in ip:
+        if ip.startswith('fe80'):
+            ip_type = 'ipv6_link_local'
+            # Fix scope ID
+            if "%" not in ip: ip = f"{ip}%{interface}"
+        else:
+            ip_type = 'ipv6_global'
+    
+    # User reported Moonlight CLI on Linux prefers raw IP without brackets
+    return {'ip': ip, 'type': ip_type, 'raw': ip}
+
+def service_hosts_list(host_map: Dict) -> List[Dict]:
+    """Expands {service: {name, hostname, port, ips}} into one host entry per address"""
+    final_hosts = []
+    for name, data in host_map.items():
+        # Add all discovered IPs to the list so user can choose
+        for ip_info in data['ips']:
+            display_name = data['name']
+            # Append protocol info to distinguish in UI if needed, 
+            # although the subtitle in UI showing the IP is usually enough.
+            # However, to be explicit:
+            if ip_info['type'] == 'ipv6_link_local':
+                display_name += _(" (IPv6 Local)")
+            elif ip_info['type'] == 'ipv6_global':
+                display_name += _(" (IPv6 Global)")
+            
+            final_hosts.append({
+                'name': display_name,
+                'ip': ip_info['ip'],
+                'port': data['port'],
+                'status': 'online',
+                'hostname': data['hostname']
+            })
+            
+    return final_hosts
+
+
 class NetworkDiscovery:
     """Sunshine host discovery on network"""
     
@@ -17,17 +63,24 @@ class NetworkDiscovery:
         self.hosts = []
         self.logger = Logger()
         
-    def discover_hosts(self, callback=None):
+    def discover_hosts(self, callback=None, on_host=None):
+        """
+        Discovers hosts in a background thread. `callback` receives the final list;
+        `on_host` (optional) receives each host found by the LAN scan as soon as it answers.
+        Both are called on the GTK main loop.
+        """
         import threading
+        from gi.repository import GLib
+        def stream(host):
+            if on_host: GLib.idle_add(on_host, host)
         def run():
             hosts = []
             try:
                 res = subprocess.run(['avahi-browse', '-t', '-r', '-p', '_nvstream._tcp'], capture_output=True, text=True, timeout=5)
                 if res.returncode == 0 and res.stdout: hosts = self.parse_avahi_output(res.stdout)
-                if not hosts: hosts = self.manual_scan()
-            except: hosts = self.manual_scan()
+                if not hosts: hosts = self.manual_scan(on_found=stream)
+            except: hosts = self.manual_scan(on_found=stream)
             if callback:
-                from gi.repository import GLib
                 GLib.idle_add(callback, hosts)
         threading.Thread(target=run, daemon=True).start()
         
@@ -56,20 +109,7 @@ class NetworkDiscovery:
                         'ips': []
                     }
                 
-                # Classify IP
-                ip_type = 'ipv4'
-                if ':' in ip:
-                    if ip.startswith('fe80'):
-                        ip_type = 'ipv6_link_local'
-                        # Fix scope ID
-                        if "%" not in ip: ip = f"{ip}%{interface}"
-                    else:
-                        ip_type = 'ipv6_global'
-                
-                # Add formatted IP to list
-                # User reported Moonlight CLI on Linux prefers raw IP without brackets
-                formatted_ip = ip
-                host_map[service_name]['ips'].append({'ip': formatted_ip, 'type': ip_type, 'raw': ip})
+                host_map[service_name]['ips'].append(classify_service_ip(ip, interface))
         
         # Enrichment: Ensure IPv4 exists
         for name, data in host_map.items():
@@ -86,79 +126,89 @@ class NetworkDiscovery:
                 except:
                     pass
         
-        final_hosts = []
-        for name, data in host_map.items():
-            # Add all discovered IPs to the list so user can choose
-            for ip_info in data['ips']:
-                display_name = data['name']
-                # Append protocol info to distinguish in UI if needed, 
-                # although the subtitle in UI showing the IP is usually enough.
-                # However, to be explicit:
-                if ip_info['type'] == 'ipv6_link_local':
-                    display_name += _(" (IPv6 Local)")
-                elif ip_info['type'] == 'ipv6_global':
-                    display_name += _(" (IPv6 Global)")
-                
-                final_hosts.append({
-                    'name': display_name,
-                    'ip': ip_info['ip'],
-                    'port': data['port'],
-                    'status': 'online',
-                    'hostname': data['hostname']
-                })
-                
-        return final_hosts
+        return service_hosts_list(host_map)
         
-    def manual_scan(self) -> List[Dict]:
-        import concurrent.futures
-        from concurrent.futures import ThreadPoolExecutor
-        hosts = []; local_ip = self.get_local_ip()
+    # Maior rede IPv4 varrida por interface (/20); redes maiores são varridas ao redor do IP local
+    SCAN_MAX_HOSTS = 4096
+    SCAN_CONCURRENCY = 256
+    SCAN_TIMEOUT = 0.5
+
+    def get_ipv4_networks(self) -> List[tuple]:
+        """Returns [(iface, address, prefixlen)] for every LAN IPv4 interface"""
+        return [(name, addr, prefix)
+                for name, info in InterfaceSnapshot.get().lan_interfaces()
+                for addr, prefix in info['ipv4']]
+
+    def _ipv4_scan_targets(self) -> List[str]:
+        import ipaddress
+        targets = []
+        seen = set()
+        networks = self.get_ipv4_networks()
+        if not networks:
+            # Fallback: /24 do IP de saída
+            local_ip = self.get_local_ip()
+            if local_ip and '.' in local_ip: networks = [('', local_ip, 24)]
+        for _name, addr, prefix in networks:
+            max_prefix = 32 - (self.SCAN_MAX_HOSTS.bit_length() - 1)
+            net = ipaddress.ip_network(f"{addr}/{max(prefix, max_prefix)}", strict=False)
+            if net.num_addresses <= 2: continue  # /31, /32 (ex: tailscale0)
+            for host in net.hosts():
+                ip = str(host)
+                if ip != addr and ip not in seen:
+                    seen.add(ip); targets.append(ip)
+        return targets
+
+    def manual_scan(self, on_found=None) -> List[Dict]:
+        """
+        Scans the local networks for the GameStream port using non-blocking connects.
+        `on_found(host)` is called (from the scan thread) for each host as soon as it answers.
+        """
+        import asyncio
         targets = ['127.0.0.1', '::1']
         
-        # IPv4 scan
-        if local_ip and '.' in local_ip:
-            subnet = '.'.join(local_ip.split('.')[:-1])
-            for i in range(1, 255): targets.append(f"{subnet}.{i}")
+        # IPv4 scan: every address of each interface subnet (not just a /24)
+        targets += self._ipv4_scan_targets()
             
         # IPv6 Radical Scan: Check neighbor cache and active interfaces
         try:
-            # 1. Check neighbor cache
-            res = subprocess.run(['ip', '-6', 'neigh', 'show'], capture_output=True, text=True, timeout=2)
-            if res.returncode == 0:
-                for line in res.stdout.splitlines():
-                    parts = line.split()
-                    if len(parts) >= 3 and ':' in parts[0]:
-                        ip = parts[0]
-                        if ip.startswith('fe80'):
-                            try:
-                                dev_idx = parts.index('dev')
-                                if dev_idx + 1 < len(parts): targets.append(f"{ip}%{parts[dev_idx+1]}")
-                            except: pass
-                        else: targets.append(ip)
-            
-            # 2. Flush neighbor cache to avoid stale entries
-            try: subprocess.run(['ip', '-6', 'neigh', 'flush', 'all'], capture_output=True, timeout=1)
-            except: pass
+            # 1. Check neighbor cache (rtnetlink dump, no `ip` fork)
+            for ip, dev in InterfaceSnapshot.get().neighbors(socket.AF_INET6):
+                if ip.startswith('fe80'):
+                    if dev: targets.append(f"{ip}%{dev}")
+                else: targets.append(ip)
             
-            # 3. Ping all-nodes multicast briefly to populate neighbor cache
-            subprocess.run(['ping', '-6', '-c', '1', '-W', '1', 'ff02::1%lo'], capture_output=True, timeout=1) 
+            # Failed/incomplete entries are skipped; the scan's own connect()
+            # re-solicits each target, so the table is never flushed
         except: pass
 
-        def check(ip):
-            if self.check_sunshine_port(ip):
-                try: 
-                    # Try to resolve name, but don't fail if it takes too long
-                    name = socket.gethostbyaddr(ip)[0]
-                except: 
-                    name = ip
-                
-                # User reported Moonlight CLI on Linux prefers raw IP without brackets
-                return {'name': _("Host ({})").format(ip), 'ip': ip, 'port': 47989, 'status': 'online'}
-            return None
+        try:
+            return asyncio.run(self._async_scan(targets, 47989, on_found))
+        except Exception as e:
+            print(f"DEBUG: LAN scan failed: {e}")
+            return []
+
+    async def _async_scan(self, targets, port: int, on_found=None) -> List[Dict]:
+        import asyncio
+        hosts = []
+        sem = asyncio.Semaphore(self.SCAN_CONCURRENCY)
 
-        with ThreadPoolExecutor(max_workers=100) as ex:
-            for r in ex.map(check, targets):
-                if r: hosts.append(r)
+        async def check(ip):
+            async with sem:
+                try:
+                    _reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), self.SCAN_TIMEOUT)
+                except (OSError, asyncio.TimeoutError):
+                    return
+                writer.close()
+                try: await writer.wait_closed()
+                except: pass
+            # User reported Moonlight CLI on Linux prefers raw IP without brackets
+            host = {'name': _("Host ({})").format(ip), 'ip': ip, 'port': port, 'status': 'online'}
+            hosts.append(host)
+            if on_found:
+                try: on_found(host)
+                except: pass
+
+        await asyncio.gather(*(check(ip) for ip in targets))
         return hosts
         
     def check_sunshine_port(self, ip: str, port: int = 47989, timeout: float = 0.5) -> bool:
@@ -259,6 +309,502 @@ class NetworkDiscovery:
             except: pass
         return "None"
 
+# rtnetlink constants (linux/rtnetlink.h, linux/neighbour.h)
+_NLMSG_ERROR, _NLMSG_DONE = 2, 3
+_RTM_NEWADDR, _RTM_GETADDR, _RTM_NEWNEIGH, _RTM_DELNEIGH, _RTM_GETNEIGH = 20, 22, 28, 29, 30
+_NLM_F_REQUEST, _NLM_F_ACK, _NLM_F_DUMP = 0x1, 0x4, 0x300
+_IFA_ADDRESS, _IFA_LOCAL = 1, 2
+_NDA_DST = 1
+_NUD_INCOMPLETE, _NUD_REACHABLE, _NUD_FAILED, _NUD_NOARP = 0x01, 0x02, 0x20, 0x40
+_NDMSG = struct.Struct('=BBHiHBB')
+# Link, IPv4/IPv6 address and route change notifications
+_RTMGRP_MONITOR = 0x1 | 0x10 | 0x40 | 0x100 | 0x400
+_NLMSG_HDR = struct.Struct('=IHHII')
+
+
+def _netlink_dump(msg_type: int, payload: bytes) -> list:
+    """Runs one rtnetlink dump request; returns [(type, body)] of the replies"""
+    out = []
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as s:
+        s.settimeout(1.0)
+        s.sendto(_NLMSG_HDR.pack(_NLMSG_HDR.size + len(payload), msg_type, _NLM_F_REQUEST | _NLM_F_DUMP, 1, 0) + payload, (0, 0))
+        while True:
+            data = s.recv(65536)
+            pos = 0
+            while pos + _NLMSG_HDR.size <= len(data):
+                length, mtype, _flags, _seq, _pid = _NLMSG_HDR.unpack_from(data, pos)
+                if length < _NLMSG_HDR.size: return out
+                if mtype == _NLMSG_DONE: return out
+                if mtype == _NLMSG_ERROR: raise OSError("rtnetlink dump failed")
+                out.append((mtype, data[pos + _NLMSG_HDR.size:pos + length]))
+                pos += (length + 3) & ~3
+
+
+def _neighbor_table(family: int) -> list:
+    """Raw neighbor table as [(ip, ifindex, nud_state)] from an rtnetlink dump"""
+    result = []
+    for mtype, body in _netlink_dump(_RTM_GETNEIGH, _NDMSG.pack(family, 0, 0, 0, 0, 0, 0)):
+        if mtype != _RTM_NEWNEIGH or len(body) < _NDMSG.size: continue
+        fam, _p1, _p2, index, state, _flags, _ntype = _NDMSG.unpack_from(body)
+        dst = _rtattrs(body, _NDMSG.size).get(_NDA_DST)
+        if dst: result.append((socket.inet_ntop(fam, dst), index, state))
+    return result
+
+
+def _delete_neighbor(family: int, ip: str, index: int) -> bool:
+    """Removes a single neighbor entry (needs CAP_NET_ADMIN). Returns True on success"""
+    dst = socket.inet_pton(family, ip)
+    attr = struct.pack('=HH', 4 + len(dst), _NDA_DST) + dst
+    payload = _NDMSG.pack(family, 0, 0, index, 0, 0, 0) + attr
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as s:
+        s.settimeout(1.0)
+        s.sendto(_NLMSG_HDR.pack(_NLMSG_HDR.size + len(payload), _RTM_DELNEIGH, _NLM_F_REQUEST | _NLM_F_ACK, 1, 0) + payload, (0, 0))
+        data = s.recv(4096)
+    if len(data) >= _NLMSG_HDR.size + 4 and _NLMSG_HDR.unpack_from(data)[1] == _NLMSG_ERROR:
+        return struct.unpack_from('=i', data, _NLMSG_HDR.size)[0] == 0
+    return False
+
+
+def _rtattrs(body: bytes, offset: int) -> dict:
+    attrs = {}
+    while offset + 4 <= len(body):
+        length, atype = struct.unpack_from('=HH', body, offset)
+        if length < 4: break
+        attrs[atype] = body[offset + 4:offset + length]
+        offset += (length + 3) & ~3
+    return attrs
+
+
+class InterfaceSnapshot:
+    """
+    In-memory model of the local interfaces: addresses, default routes and
+    IPv6 neighbors, read without forking `ip`.
+
+    Addresses come from an rtnetlink dump (falling back to /proc/net/if_inet6
+    and SIOCGIFADDR), link state from /sys/class/net and default routes from
+    /proc/net/route and /proc/net/ipv6_route. A netlink socket subscribed to
+    link/address/route notifications tells when the model must be rebuilt;
+    otherwise every query is answered from memory.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    # Interfaces that never lead to a LAN host
+    VIRTUAL_PREFIXES = ('docker', 'veth', 'virbr', 'vboxnet', 'br-')
+
+    @classmethod
+    def get(cls) -> 'InterfaceSnapshot':
+        """Process-wide instance, refreshed if the kernel reported changes"""
+        with cls._shared_lock:
+            if cls._shared is None: cls._shared = cls()
+            cls._shared.refresh()
+            return cls._shared
+
+    def __init__(self):
+        self.interfaces = {}
+        self.default_routes = {socket.AF_INET: [], socket.AF_INET6: []}
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._monitor = None
+        try:
+            self._monitor = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            self._monitor.bind((0, _RTMGRP_MONITOR))
+            self._monitor.setblocking(False)
+        except OSError:
+            self._monitor = None
+
+    def _has_changed(self) -> bool:
+        if self._monitor is None:
+            # No notifications available: fall back to a short TTL
+            return time.monotonic() - self._loaded_at > 5.0
+        changed = False
+        while True:
+            try:
+                if not self._monitor.recv(65536): break
+                changed = True
+            except BlockingIOError:
+                break
+            except OSError:
+                # Overrun (ENOBUFS): events were lost, rebuild to be safe
+                changed = True; break
+        return changed
+
+    def refresh(self, force: bool = False):
+        if self._loaded and not force and not self._has_changed(): return
+        self.interfaces = self._read_links()
+        try:
+            self._read_addresses_netlink()
+        except OSError:
+            self._read_addresses_proc()
+        self.default_routes = {socket.AF_INET: self._read_default_routes_v4(),
+                               socket.AF_INET6: self._read_default_routes_v6()}
+        self._loaded = True
+        self._loaded_at = time.monotonic()
+
+    @staticmethod
+    def _read_links() -> dict:
+        links = {}
+        for index, name in socket.if_nameindex():
+            up = False
+            try:
+                with open(f'/sys/class/net/{name}/flags') as f:
+                    up = bool(int(f.read().strip(), 16) & 0x1)  # IFF_UP
+            except (OSError, ValueError):
+                pass
+            links[name] = {'index': index, 'up': up, 'ipv4': [], 'ipv6': []}
+        return links
+
+    def _by_index(self, index: int):
+        for name, info in self.interfaces.items():
+            if info['index'] == index: return name, info
+        return None, None
+
+    def _read_addresses_netlink(self):
+        replies = _netlink_dump(_RTM_GETADDR, struct.pack('=BBBBI', socket.AF_UNSPEC, 0, 0, 0, 0))
+        for mtype, body in replies:
+            if mtype != _RTM_NEWADDR or len(body) < 8: continue
+            family, prefix, _flags, scope, index = struct.unpack_from('=BBBBI', body)
+            attrs = _rtattrs(body, 8)
+            raw = attrs.get(_IFA_LOCAL) or attrs.get(_IFA_ADDRESS)
+            _name, info = self._by_index(index)
+            if not raw or info is None: continue
+            if family == socket.AF_INET:
+                info['ipv4'].append((socket.inet_ntop(socket.AF_INET, raw), prefix))
+            elif family == socket.AF_INET6:
+                info['ipv6'].append((socket.inet_ntop(socket.AF_INET6, raw), prefix, self._scope_name(scope)))
+
+    def _read_addresses_proc(self):
+        import fcntl
+        try:
+            with open('/proc/net/if_inet6') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 6 or parts[5] not in self.interfaces: continue
+                    addr = socket.inet_ntop(socket.AF_INET6, bytes.fromhex(parts[0]))
+                    self.interfaces[parts[5]]['ipv6'].append((addr, int(parts[2], 16), self._scope_name(int(parts[3], 16))))
+        except OSError:
+            pass
+        SIOCGIFADDR, SIOCGIFNETMASK = 0x8915, 0x891b
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                for name, info in self.interfaces.items():
+                    req = struct.pack('256s', name[:15].encode())
+                    try:
+                        addr = socket.inet_ntoa(fcntl.ioctl(s.fileno(), SIOCGIFADDR, req)[20:24])
+                        mask = fcntl.ioctl(s.fileno(), SIOCGIFNETMASK, req)[20:24]
+                    except OSError:
+                        continue  # Sem IPv4
+                    info['ipv4'].append((addr, bin(int.from_bytes(mask, 'big')).count('1')))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _scope_name(scope: int) -> str:
+        # rtnetlink scope / if_inet6 scope: 0 global, 253/0x20 link, 254/0x10 host
+        return {0: 'global', 253: 'link', 0x20: 'link', 254: 'host', 0x10: 'host'}.get(scope, 'global')
+
+    @staticmethod
+    def _read_default_routes_v4() -> list:
+        routes = []
+        try:
+            with open('/proc/net/route') as f:
+                next(f, None)
+                for line in f:
+                    p = line.split()
+                    if len(p) >= 8 and p[1] == '00000000' and p[7] == '00000000':
+                        routes.append((int(p[6]), p[0]))
+        except OSError:
+            pass
+        return [iface for _metric, iface in sorted(routes)]
+
+    @staticmethod
+    def _read_default_routes_v6() -> list:
+        routes = []
+        try:
+            with open('/proc/net/ipv6_route') as f:
+                for line in f:
+                    p = line.split()
+                    if len(p) >= 10 and p[0] == '0' * 32 and p[1] == '00' and p[9] != 'lo':
+                        routes.append((int(p[5], 16), p[9]))
+        except OSError:
+            pass
+        return [iface for _metric, iface in sorted(routes)]
+
+    def default_interface(self, family=socket.AF_INET6):
+        """Interface of the preferred default route for `family` (None if there is none)"""
+        routes = self.default_routes.get(family) or []
+        return routes[0] if routes else None
+
+    def scope_for(self, ip: str):
+        """
+        Interface name to use as scope ID for a link-local address: the IPv6
+        default route's interface, else the first UP non-loopback interface.
+        """
+        iface = self.default_interface(socket.AF_INET6)
+        if iface: return iface
+        for name, info in self.interfaces.items():
+            if name != 'lo' and info['up']: return name
+        return None
+
+    def with_scope(self, ip: str) -> str:
+        """Adds %iface to a bare fe80:: address"""
+        if ':' in ip and '%' not in ip and ip.lower().startswith('fe80'):
+            iface = self.scope_for(ip)
+            if iface: return f"{ip}%{iface}"
+        return ip
+
+    def lan_interfaces(self) -> list:
+        """(name, info) of UP, non-loopback, non-container interfaces"""
+        return [(n, i) for n, i in self.interfaces.items()
+                if n != 'lo' and i['up'] and not n.startswith(self.VIRTUAL_PREFIXES)]
+
+    def neighbors(self, family=socket.AF_INET6) -> list:
+        """
+        Current neighbor table entries as [(ip, ifname)], skipping failed and
+        incomplete ones. Read on demand (rtnetlink dump), not cached.
+        """
+        result = []
+        try: table = _neighbor_table(family)
+        except OSError: return result
+        for ip, index, state in table:
+            if state & (_NUD_INCOMPLETE | _NUD_FAILED | _NUD_NOARP): continue
+            name, _info = self._by_index(index)
+            result.append((ip, name))
+        return result
+
+
+class ICMPProber:
+    """
+    Batched ICMP echo prober.
+
+    Sends one echo request to every target at once over a single ICMP socket
+    per address family and collects the replies, so probing N hosts costs one
+    timeout instead of N. Uses unprivileged ICMP datagram sockets
+    (net.ipv4.ping_group_range), raw sockets when running as root, and falls
+    back to concurrent 'ping' processes when neither is available.
+    """
+
+    def __init__(self, timeout: float = 1.0):
+        self.timeout = timeout
+        self._socks = {}
+        self._lock = threading.Lock()
+        self._ident = os.getpid() & 0xFFFF
+        self._seq = 0
+
+    def _get_socket(self, family):
+        if family in self._socks:
+            return self._socks[family]
+        proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+        sock = None
+        for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+            try:
+                sock = socket.socket(family, kind, proto)
+                sock.setblocking(False)
+                break
+            except OSError:
+                sock = None
+        # None is cached too, so we do not retry socket creation on every tick
+        self._socks[family] = sock
+        return sock
+
+    @staticmethod
+    def _checksum(data: bytes) -> int:
+        if len(data) % 2: data += b'\0'
+        total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+        total = (total >> 16) + (total & 0xFFFF)
+        total += total >> 16
+        return ~total & 0xFFFF
+
+    def _build_echo(self, family, seq: int) -> bytes:
+        icmp_type = 8 if family == socket.AF_INET else 128
+        payload = b'big-remote-play'
+        header = struct.pack('!BBHHH', icmp_type, 0, 0, self._ident, seq)
+        if family == socket.AF_INET:
+            csum = self._checksum(header + payload)
+            header = struct.pack('!BBHHH', icmp_type, 0, csum, self._ident, seq)
+        # ICMPv6 checksum is always filled in by the kernel
+        return header + payload
+
+    def _parse_reply(self, sock, family, data: bytes):
+        """Returns (ident, seq) for echo replies, None for anything else"""
+        if family == socket.AF_INET and sock.type == socket.SOCK_RAW:
+            # Raw IPv4 sockets deliver the IP header too
+            data = data[(data[0] & 0x0F) * 4:]
+        if len(data) < 8: return None
+        icmp_type, _code, _csum, ident, seq = struct.unpack('!BBHHH', data[:8])
+        if icmp_type != (0 if family == socket.AF_INET else 129): return None
+        return ident, seq
+
+    def _resolve(self, ip: str):
+        try:
+            info = socket.getaddrinfo(ip, None, proto=socket.IPPROTO_ICMP if ':' not in ip else socket.IPPROTO_ICMPV6)
+            family, _t, _p, _c, sockaddr = info[0]
+            return family, sockaddr
+        except Exception:
+            return None, None
+
+    def probe(self, ips, timeout: float = None, count: int = 1) -> Dict[str, float]:
+        """
+        Pings all IPs concurrently.
+        Returns {ip: rtt_ms}, with 0.0 for hosts that did not answer.
+        With count > 1 the result is the average of the answered rounds.
+        """
+        timeout = timeout or self.timeout
+        targets = [ip for ip in dict.fromkeys(ips) if ip and ip not in ('Unknown IP', '0.0.0.0')]
+        results = {ip: [] for ip in targets}
+        with self._lock:
+            for _round in range(max(1, count)):
+                fallback = self._probe_round(targets, timeout, results)
+                if fallback:
+                    for ip, rtt in self._probe_with_ping(fallback, timeout).items():
+                        if rtt > 0: results[ip].append(rtt)
+        return {ip: (sum(v) / len(v) if v else 0.0) for ip, v in results.items()}
+
+    def _probe_round(self, targets, timeout, results) -> list:
+        """Sends one echo to every target; returns targets that need the ping fallback"""
+        fallback = []
+        pending = {}  # (family, seq) -> (ip, sockaddr, sent_at)
+        socks = {}
+        for ip in targets:
+            family, sockaddr = self._resolve(ip)
+            sock = self._get_socket(family) if family else None
+            if sock is None:
+                fallback.append(ip)
+                continue
+            self._seq = (self._seq + 1) & 0xFFFF
+            try:
+                sent_at = time.perf_counter()
+                sock.sendto(self._build_echo(family, self._seq), sockaddr)
+                pending[(family, self._seq)] = (ip, sockaddr, sent_at)
+                socks[sock.fileno()] = (sock, family)
+            except OSError:
+                # Unreachable network etc: no answer this round
+                pass
+
+        deadline = time.perf_counter() + timeout
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0: break
+            readable, _w, _x = select.select(list(socks), [], [], remaining)
+            now = time.perf_counter()
+            for fd in readable:
+                sock, family = socks[fd]
+                while True:
+                    try:
+                        data, addr = sock.recvfrom(1024)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    except OSError:
+                        break
+                    reply = self._parse_reply(sock, family, data)
+                    if not reply: continue
+                    ident, seq = reply
+                    # Datagram sockets rewrite the identifier; only raw sockets can check it
+                    if sock.type == socket.SOCK_RAW and ident != self._ident: continue
+                    entry = pending.get((family, seq))
+                    if entry and entry[1][0].split('%')[0] == addr[0].split('%')[0]:
+                        del pending[(family, seq)]
+                        results[entry[0]].append((now - entry[2]) * 1000.0)
+        return fallback
+
+    def _probe_with_ping(self, ips, timeout: float) -> Dict[str, float]:
+        from concurrent.futures import ThreadPoolExecutor
+        # Force C locale to get a decimal point and English output
+        env = dict(os.environ, LC_ALL='C')
+        wait = str(max(1, int(round(timeout))))
+
+        def ping(ip):
+            try:
+                res = subprocess.run(['ping', '-c', '1', '-W', wait, '-n', ip],
+                                     capture_output=True, text=True, timeout=timeout + 0.5, env=env)
+                if res.returncode == 0:
+                    match = re.search(r'time[=<]([\d\.]+)\s*ms', res.stdout)
+                    if match: return float(match.group(1))
+            except Exception:
+                pass
+            return 0.0
+
+        with ThreadPoolExecutor(max_workers=min(16, max(1, len(ips)))) as ex:
+            return dict(zip(ips, ex.map(ping, ips)))
+
+    def close(self):
+        with self._lock:
+            for sock in self._socks.values():
+                if sock:
+                    try: sock.close()
+                    except: pass
+            self._socks = {}
+
+class NeighborRefresher:
+    """
+    Targeted replacement for flushing the whole neighbor cache before
+    talking to a host.
+
+    Only the destination's own entry is touched: a FAILED entry is deleted
+    (when permitted) so the kernel resolves it again, and a single TCP
+    connect to the host's port both triggers that one neighbor solicitation
+    and confirms the host is reachable. Results are cached per destination,
+    so repeated list/connect attempts do not probe again.
+    """
+
+    REACHABLE_TTL = 30.0
+    UNREACHABLE_TTL = 5.0
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> 'NeighborRefresher':
+        with cls._shared_lock:
+            if cls._shared is None: cls._shared = cls()
+            return cls._shared
+
+    def __init__(self):
+        self._cache = {}  # (ip, port) -> (reachable, checked_at)
+        self._lock = threading.Lock()
+
+    def invalidate(self, ip: str = None):
+        with self._lock:
+            if ip is None: self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[0] == ip]: del self._cache[key]
+
+    def ensure(self, ip: str, port: int = 47989, timeout: float = 1.0) -> bool:
+        """Makes sure `ip` has a usable neighbor entry; returns whether `port` answered"""
+        ip = ip.strip('[]')
+        key = (ip, port)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached:
+            ok, at = cached
+            if time.monotonic() - at < (self.REACHABLE_TTL if ok else self.UNREACHABLE_TTL):
+                return ok
+
+        addr, _sep, scope = ip.partition('%')
+        family = socket.AF_INET6 if ':' in addr else socket.AF_INET
+        try:
+            index = socket.if_nametoindex(scope) if scope else 0
+            for n_ip, n_index, state in _neighbor_table(family):
+                if n_ip == addr and (not index or n_index == index) and state & _NUD_FAILED:
+                    _delete_neighbor(family, addr, n_index)
+        except OSError:
+            pass
+
+        try:
+            info = socket.getaddrinfo(ip, port, family, socket.SOCK_STREAM)[0]
+            with socket.socket(family, socket.SOCK_STREAM) as s:
+                s.settimeout(timeout)
+                ok = s.connect_ex(info[4]) == 0
+        except OSError:
+            ok = False
+
+        with self._lock:
+            self._cache[key] = (ok, time.monotonic())
+        print(f"DEBUG: Neighbor refresh {ip}:{port} -> {'reachable' if ok else 'unreachable'}")
+        return ok
+
+
 def resolve_pin_to_ip(pin: str) -> dict | None:
     """Helper for GuestView to resolve PIN to IP info"""
     discovery = NetworkDiscovery()
@@ -0,0 +1,178 @@
+"""
+Atomic, debounced persistence for the config files
+"""
+
+import atexit
+import os
+import tempfile
+import threading
+import time
+import weakref
+from pathlib import Path
+
+
+def atomic_write(path, data, mode: int = None):
+    """
+    Writes `data` (str or bytes) to `path` through a temp file in the same
+    directory, fsync and os.replace: readers and a crash mid-write see either
+    the old file or the new one, never a truncated mix.
+    The file keeps its current permissions unless `mode` is given.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, str): data = data.encode('utf-8')
+    if mode is None:
+        try: mode = path.stat().st_mode & 0o777
+        except OSError: mode = 0o644
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+    # Persist the rename itself
+    try:
+        dfd = os.open(path.parent, os.O_RDONLY)
+        try: os.fsync(dfd)
+        finally: os.close(dfd)
+    except OSError:
+        pass
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, None if missing: tells whether someone else rewrote it"""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class _FlushWorker:
+    """One long-lived daemon thread that flushes savers once their deadline passes"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._due = {}  # saver -> monotonic deadline
+        self._thread = None
+
+    def schedule(self, saver, deadline: float):
+        with self._cond:
+            self._due[saver] = deadline
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ConfigSaver", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def unschedule(self, saver):
+        with self._cond:
+            self._due.pop(saver, None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                due = [s for s, t in self._due.items() if t <= now]
+                for s in due: del self._due[s]
+                if not due:
+                    self._cond.wait(min(self._due.values()) - now if self._due else None)
+                    continue
+            for saver in due:
+                try: saver.flush()
+                except Exception as e: print(f"DEBUG: Config flush failed: {e}")
+
+
+_worker = _FlushWorker()
+
+
+class DebouncedSaver:
+    """
+    Coalesces the saves of one file. mark_dirty() sets a deadline on the
+    shared flush thread that every further change pushes back, so a burst of
+    set() calls (a whole settings form, a slider being dragged) ends in one
+    write, issued `delay` seconds after the last change and at most
+    `max_delay` after the first.
+
+    `render()` is called with `lock` held and returns (path, data) to write,
+    or None; owners take the same lock while mutating their data. The write
+    itself happens outside the lock. Pending changes are flushed at exit.
+    """
+
+    def __init__(self, render, delay: float = 0.5, max_delay: float = 2.0, on_saved=None):
+        self.lock = threading.RLock()
+        self._render = render
+        self._on_saved = on_saved
+        self.delay = delay
+        self.max_delay = max_delay
+        self._dirty = False
+        self._first_dirty = None
+        self._write_lock = threading.Lock()  # Keeps writes of one file in order
+        _savers.add(self)
+
+    def is_dirty(self) -> bool:
+        return self._dirty
+
+    def mark_dirty(self):
+        with self.lock:
+            now = time.monotonic()
+            if not self._dirty:
+                self._dirty = True
+                self._first_dirty = now
+            _worker.schedule(self, min(now + self.delay, self._first_dirty + self.max_delay))
+
+    def cancel(self):
+        """Drops pending changes without writing them"""
+        with self.lock:
+            _worker.unschedule(self)
+            self._dirty = False
+
+    def flush(self) -> bool:
+        """Writes pending changes now; True if nothing is left unsaved"""
+        with self._write_lock:
+            with self.lock:
+                if not self._dirty: return True
+                _worker.unschedule(self)
+                try:
+                    out = self._render()
+                except Exception as e:
+                    # Data changed under us (e.g. a nested dict mutated by another thread): retry shortly
+                    print(f"DEBUG: Config render failed, retrying: {e}")
+                    self.mark_dirty()
+                    return False
+                self._dirty = False
+            if out is None: return True
+            path, data = out
+            try:
+                atomic_write(path, data)
+            except OSError as e:
+                print(f"Error saving {path}: {e}")
+                with self.lock: self._dirty = True  # Retried on the next change or at exit
+                return False
+            if self._on_saved:
+                try: self._on_saved(path)
+                except Exception: pass
+            return True
+
+    def save(self) -> bool:
+        """Writes now even if nothing was marked dirty"""
+        with self.lock: self._dirty = True
+        return self.flush()
+
+
+_savers = weakref.WeakSet()
+
+
+def flush_all():
+    """Flushes every saver with pending changes (app shutdown, before Sunshine reads its config)"""
+    for saver in list(_savers):
+        try: saver.flush()
+        except Exception as e: print(f"DEBUG: Config flush failed: {e}")
+
+
+atexit.register(flush_all)
@@ -0,0 +1,124 @@
+"""
+Streaming session detection from /proc/net
+"""
+
+import ipaddress
+import socket
+from typing import Dict
+
+from utils.i18n import _
+
+# Sunshine HTTPS/HTTP, web UI, RTSP, video/control/audio/input streams
+SUNSHINE_PORTS = (47984, 47989, 47990, 47998, 47999, 48000, 48001, 48002, 48010)
+# Web UI/API: browsers and our own keep-alive API connection, never a stream
+WEB_UI_PORT = 47990
+
+# /proc/net/tcp state codes
+_TCP_ESTABLISHED = '01'
+_UDP_UNCONN = '07'
+
+_PROC_TABLES = (
+    ('/proc/net/tcp', 'tcp', socket.AF_INET),
+    ('/proc/net/tcp6', 'tcp', socket.AF_INET6),
+    ('/proc/net/udp', 'udp', socket.AF_INET),
+    ('/proc/net/udp6', 'udp', socket.AF_INET6),
+)
+
+
+def decode_address(hex_addr: str, family) -> tuple[str, int]:
+    """Decodes a /proc/net address ('0100007F:1F90') into (ip, port)"""
+    addr, port = hex_addr.split(':')
+    raw = bytes.fromhex(addr)
+    if family == socket.AF_INET:
+        ip = socket.inet_ntop(socket.AF_INET, raw[::-1])
+    else:
+        # Four 32-bit words, each in host (little-endian) byte order
+        raw = b''.join(raw[i:i + 4][::-1] for i in range(0, 16, 4))
+        ip = socket.inet_ntop(socket.AF_INET6, raw)
+        if ip.startswith('::ffff:') and '.' in ip:
+            ip = ip[7:]  # IPv4-mapped
+    return ip, int(port, 16)
+
+
+def is_loopback(ip: str) -> bool:
+    try: return ipaddress.ip_address(ip).is_loopback
+    except ValueError: return False
+
+
+def is_stream_peer(session: dict) -> bool:
+    """True for a remote guest on a streaming port (not a local API/web UI client)"""
+    return not is_loopback(session['ip']) and bool(session['ports'] - {WEB_UI_PORT})
+
+
+class SessionDetector:
+    """
+    Finds guests connected to Sunshine by reading the kernel socket tables
+    (/proc/net/tcp, tcp6, udp, udp6) in a single pass.
+
+    Decoded peers are cached by socket identity between calls, so each tick
+    only decodes sockets that appeared since the previous one.
+    """
+
+    def __init__(self, ports=SUNSHINE_PORTS):
+        self.ports = set(ports)
+        self._hex_ports = {f"{p:04X}" for p in self.ports}
+        self._cache = {}  # socket key -> peer dict (or None if not a guest)
+        self.added = set()
+        self.removed = set()
+
+    def _parse_line(self, parts, proto, family):
+        local, remote, state = parts[1], parts[2], parts[3]
+        if proto == 'tcp' and state != _TCP_ESTABLISHED: return None
+        if proto == 'udp' and state not in (_TCP_ESTABLISHED, _UDP_UNCONN): return None
+        peer_ip, peer_port = decode_address(remote, family)
+        if peer_port == 0 or peer_ip in ('0.0.0.0', '::'): return None
+        _local_ip, local_port = decode_address(local, family)
+        # Our own outgoing connections to Sunshine (e.g. the API client), not a guest
+        if local_port not in self.ports: return None
+        return {
+            'ip': peer_ip,
+            'port': peer_port,
+            'local_port': local_port,
+            'proto': proto,
+            'family': 'ipv6' if family == socket.AF_INET6 and ':' in peer_ip else 'ipv4',
+        }
+
+    def scan(self) -> Dict[tuple, dict]:
+        """Returns {socket key: peer} for every socket touching a Sunshine port"""
+        found = {}
+        hex_ports = self._hex_ports
+        for path, proto, family in _PROC_TABLES:
+            try:
+                with open(path, 'r') as f:
+                    next(f, None)  # header
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) < 10: continue
+                        local, remote = parts[1], parts[2]
+                        if local[-4:] not in hex_ports and remote[-4:] not in hex_ports: continue
+                        # inode is 0 for sockets in TIME_WAIT, so include the endpoints
+                        key = (proto, local, remote, parts[9])
+                        if key in self._cache:
+                            peer = self._cache[key]
+                        else:
+                            try: peer = self._parse_line(parts, proto, family)
+                            except ValueError: peer = None
+                        found[key] = peer
+            except OSError:
+                continue
+
+        self.added = set(found) - set(self._cache)
+        self.removed = set(self._cache) - set(found)
+        self._cache = found
+        return {k: v for k, v in found.items() if v}
+
+    def detect(self) -> Dict[str, dict]:
+        """Returns {ip: session data} for all connected peers (IPv4 and IPv6)"""
+        sessions = {}
+        for peer in self.scan().values():
+            ip = peer['ip']
+            if ip not in sessions:
+                sessions[ip] = {'ip': ip, 'name': _('Guest'), 'latency': 0, 'fps': 60,
+                                'family': peer['family'], 'ports': set()}
+            sessions[ip]['ports'].add(peer['local_port'])
+        return sessions
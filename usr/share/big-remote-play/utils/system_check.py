@@ -2,11 +2,106 @@
 System component verification
 """
 
+import os
 import subprocess
 import shutil
-from typing import Tuple
+import threading
+import time
+from typing import Dict, List, Tuple
 from utils.i18n import _
 
+
+class ProcessSnapshot:
+    """
+    One /proc scan shared by every caller in the process.
+
+    Maps process name (comm, as matched by `pgrep -x`) to [(pid, state)].
+    The snapshot is reused for `TTL` seconds, so a status tick that asks
+    about several processes reads /proc only once.
+    """
+
+    TTL = 1.0
+    _lock = threading.Lock()
+    _taken = 0.0
+    _procs: Dict[str, List[Tuple[int, str]]] = {}
+    _units: Dict[str, Tuple[float, bool]] = {}
+
+    @classmethod
+    def get(cls, max_age: float = None) -> Dict[str, List[Tuple[int, str]]]:
+        max_age = cls.TTL if max_age is None else max_age
+        with cls._lock:
+            if time.monotonic() - cls._taken > max_age:
+                cls._procs = cls._scan()
+                cls._taken = time.monotonic()
+            return cls._procs
+
+    @classmethod
+    def invalidate(cls):
+        """Forces the next query to rescan (e.g. right after starting/stopping something)"""
+        with cls._lock:
+            cls._taken = 0.0
+            cls._units.clear()
+
+    @staticmethod
+    def _scan() -> Dict[str, List[Tuple[int, str]]]:
+        procs = {}
+        try:
+            entries = os.listdir('/proc')
+        except OSError:
+            return procs
+        for entry in entries:
+            if not entry.isdigit(): continue
+            try:
+                with open(f'/proc/{entry}/stat', 'rb') as f:
+                    data = f.read(512)
+            except OSError:
+                continue  # Process exited during the scan
+            # comm may contain spaces/parentheses: it ends at the last ')'
+            start, end = data.find(b'('), data.rfind(b')')
+            if start < 0 or end < 0: continue
+            name = data[start + 1:end].decode(errors='replace')
+            state = data[end + 2:end + 3].decode()
+            procs.setdefault(name, []).append((int(entry), state))
+        return procs
+
+    @classmethod
+    def find(cls, name: str) -> List[Tuple[int, str]]:
+        return cls.get().get(name, [])
+
+    @classmethod
+    def is_running(cls, name: str) -> bool:
+        """True if a live process with this exact name exists (zombies and stopped ignored)"""
+        return any(state not in ('Z', 'T', 'X') for _pid, state in cls.find(name))
+
+    @classmethod
+    def is_unit_active(cls, unit: str) -> bool:
+        """
+        Equivalent of `systemctl is-active` for system services, answered from the
+        unit's cgroup (populated == has live processes). Falls back to systemctl
+        when the cgroup hierarchy is not available.
+        """
+        if not unit.endswith('.service'): unit += '.service'
+        with cls._lock:
+            cached = cls._units.get(unit)
+            if cached and time.monotonic() - cached[0] <= cls.TTL:
+                return cached[1]
+        active = None
+        try:
+            with open(f'/sys/fs/cgroup/system.slice/{unit}/cgroup.events') as f:
+                active = 'populated 1' in f.read()
+        except FileNotFoundError:
+            # cgroup v2 mounted but the unit has no cgroup: not running
+            if os.path.exists('/sys/fs/cgroup/cgroup.controllers'): active = False
+        except OSError:
+            pass
+        if active is None:
+            try: active = subprocess.run(['systemctl', 'is-active', '--quiet', unit], stderr=subprocess.DEVNULL).returncode == 0
+            except: active = False
+        with cls._lock:
+            cls._units[unit] = (time.monotonic(), active)
+        return active
+
+
 class SystemCheck:
     """System component checker"""
     
@@ -49,64 +144,20 @@ class SystemCheck:
     
     def is_sunshine_running(self) -> bool:
         """Checks if Sunshine process is running"""
-        try:
-            result = subprocess.run(
-                ['pgrep', '-x', 'sunshine'],
-                capture_output=True,
-                timeout=2
-            )
-            return result.returncode == 0
-        except:
-            return False
+        return bool(ProcessSnapshot.find('sunshine'))
 
     def is_docker_running(self) -> bool:
         """Checks if Docker daemon is running"""
-        try:
-            return subprocess.run(['systemctl', 'is-active', '--quiet', 'docker']).returncode == 0
-        except:
-            return False
+        return ProcessSnapshot.is_unit_active('docker')
 
     def is_tailscale_running(self) -> bool:
         """Checks if Tailscale daemon is running"""
-        try:
-            return subprocess.run(['systemctl', 'is-active', '--quiet', 'tailscaled']).returncode == 0
-        except:
-            return False
+        return ProcessSnapshot.is_unit_active('tailscaled')
     
     def is_moonlight_running(self) -> bool:
         """Checks if Moonlight process is running (ignores zombies)"""
-        try:
-            for process_name in ['moonlight', 'moonlight-qt']:
-                # Get PIDs
-                result = subprocess.run(
-                    ['pgrep', '-x', process_name],
-                    capture_output=True,
-                    text=True, # Important to read output as text
-                    timeout=2
-                )
-                
-                if result.returncode == 0 and result.stdout:
-                    pids = result.stdout.strip().split()
-                    for pid in pids:
-                        # Check process state
-                        try:
-                            state_check = subprocess.run(
-                                ['ps', '-o', 'state=', '-p', pid],
-                                capture_output=True,
-                                text=True,
-                                timeout=1
-                            )
-                            if state_check.returncode == 0:
-                                state = state_check.stdout.strip()
-                                # If state is not Z (Zombie) or T (Stopped), consider running
-                                if state and state not in ['Z', 'T', 'Z+']:
-                                    return True
-                        except:
-                            continue
-                            
-            return False
-        except:
-            return False
+        # State is read from /proc/<pid>/stat by the shared snapshot
+        return any(ProcessSnapshot.is_running(name) for name in ['moonlight', 'moonlight-qt'])
             
     def get_sunshine_version(self) -> str:
         """Gets Sunshine version"""
@@ -0,0 +1,106 @@
+"""
+Fixed-size columnar ring buffer for metric time series
+"""
+
+import math
+from array import array
+from typing import Dict, Iterable, List
+
+
+class RingSeries:
+    """
+    One array('d') per metric and per device, all sharing a single write
+    cursor. Memory is allocated once up front; an append writes one slot per
+    column and readers get at most two contiguous memoryview slices per
+    column (the ring wraps once), so nothing is copied on the read path.
+
+    Device columns are created when a device first reports and hold NaN
+    where it had no sample.
+    """
+
+    __slots__ = ('capacity', '_columns', '_devices', '_head', '_size', '_seq')
+
+    def __init__(self, capacity: int, columns: Iterable[str]):
+        self.capacity = capacity
+        self._columns = {name: self._new_column(0.0) for name in columns}
+        self._devices = {}
+        self._head = 0   # Next write position
+        self._size = 0
+        self._seq = 0    # Total number of appends
+
+    def _new_column(self, fill: float) -> array:
+        return array('d', [fill]) * self.capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self):
+        self._head = self._size = 0
+        self._devices.clear()
+
+    def append(self, values: Dict[str, float], devices: Dict[str, float] = None):
+        pos = self._head
+        for name, col in self._columns.items():
+            col[pos] = values.get(name, 0.0)
+        if devices:
+            for name in devices.keys() - self._devices.keys():
+                self._devices[name] = self._new_column(math.nan)
+        for name, col in self._devices.items():
+            col[pos] = devices.get(name, math.nan) if devices else math.nan
+        self._head = (pos + 1) % self.capacity
+        if self._size < self.capacity: self._size += 1
+        self._seq += 1
+        # A device whose samples have all been overwritten is dropped
+        if pos == 0 and self._devices:
+            for name in [n for n, col in self._devices.items() if all(v != v for v in col)]:
+                del self._devices[name]
+
+    def seq_of(self, index: int) -> int:
+        """Absolute sample number of logical index `index` (0 = oldest kept)"""
+        return self._seq - self._size + index
+
+    def _column(self, name: str, device: bool) -> array:
+        return (self._devices if device else self._columns)[name]
+
+    def window(self, name: str, count: int = None, step: int = 1, device: bool = False) -> tuple:
+        """
+        The last `count` values of a column, oldest first, every `step`-th one
+        (aligned so the newest value is always included), as one or two
+        memoryview slices.
+        """
+        count = self._size if count is None else min(count, self._size)
+        if count <= 0: return ()
+        col = memoryview(self._column(name, device))
+        # Physical position of the first value (aligned to the newest one)
+        first = (self._head - count + (count - 1) % step) % self.capacity
+        end = (self._head - 1) % self.capacity + 1
+        if first < end:
+            return (col[first:end:step],)
+        head = col[first::step]
+        rest = (first + len(head) * step) - self.capacity
+        return (head, col[rest:end:step])
+
+    def value(self, name: str, index: int, device: bool = False) -> float:
+        """Value at logical index (0 = oldest, -1 = newest)"""
+        if index < 0: index += self._size
+        if not 0 <= index < self._size: raise IndexError(index)
+        return self._column(name, device)[(self._head - self._size + index) % self.capacity]
+
+    def last(self, name: str, default: float = 0.0) -> float:
+        return self.value(name, -1) if self._size else default
+
+    def devices(self) -> List[str]:
+        return list(self._devices)
+
+    def device_values(self, index: int) -> Dict[str, float]:
+        """{device: value} at a logical index, skipping devices without a sample"""
+        out = {}
+        for name in self._devices:
+            v = self.value(name, index, device=True)
+            if v == v: out[name] = v
+        return out
+
+    def active_devices(self, count: int) -> List[str]:
+        """Devices with at least one sample among the last `count` points"""
+        return [name for name in self._devices
+                if any(v == v for part in self.window(name, count, device=True) for v in part)]
@@ -0,0 +1,198 @@
+"""
+Valve KeyValues (VDF/ACF) readers: text tokenizer and binary format
+"""
+
+import os
+import re
+import struct
+import threading
+from typing import Iterable, Iterator
+
+# "quoted string" | { | } | [$CONDITIONAL] | bare_word ; // comments skipped
+_TOKEN_RE = re.compile(r'\s*(?://[^\n]*|"((?:[^"\\]|\\.)*)"|([{}])|\[[^\]]*\]|([^\s{}"]+))')
+_ESCAPES = {'n': '\n', 't': '\t', '\\': '\\', '"': '"'}
+_ESCAPE_RE = re.compile(r'\\(.)')
+
+OPEN, CLOSE = '{', '}'
+
+
+def _unescape(s: str) -> str:
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(0)), s) if '\\' in s else s
+
+
+def iter_tokens(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Streams tokens from text VDF lines. Braces are yielded as OPEN/CLOSE,
+    strings as (str,) one-tuples so '{' inside a quoted value stays a string.
+    """
+    pending = ''
+    for line in lines:
+        if pending:
+            line = pending + line; pending = ''
+        pos, end = 0, len(line)
+        while pos < end:
+            m = _TOKEN_RE.match(line, pos)
+            if not m or m.end() == pos:
+                # Unterminated quoted string: continues on the next line
+                if line[pos:].lstrip().startswith('"'): pending = line[pos:]
+                break
+            pos = m.end()
+            quoted, brace, bare = m.groups()
+            if brace: yield brace
+            elif quoted is not None: yield (_unescape(quoted),)
+            elif bare is not None: yield (bare,)
+
+
+def _build(tokens: Iterator, stop_at_depth: int = None) -> dict:
+    root = {}; stack = [root]; key = None
+    for tok in tokens:
+        if tok == OPEN:
+            if stop_at_depth is not None and len(stack) > stop_at_depth: break
+            child = {}
+            if key is not None: stack[-1][key] = child
+            stack.append(child); key = None
+        elif tok == CLOSE:
+            if len(stack) > 1: stack.pop()
+            key = None
+        elif key is None:
+            key = tok[0]
+        else:
+            stack[-1][key] = tok[0]; key = None
+    return root
+
+
+def loads(text: str) -> dict:
+    """Parses a whole text VDF document"""
+    return _build(iter_tokens(text.splitlines(True)))
+
+
+def load(path) -> dict:
+    with open(path, 'r', errors='replace') as f:
+        return _build(iter_tokens(f))
+
+
+def read_header(path) -> dict:
+    """
+    Reads only the scalar keys of the top-level section, stopping at the first
+    nested block (for ACF manifests: before InstalledDepots/UserConfig).
+    Returns {'AppState': {...}} like load() would, minus the nested blocks.
+    """
+    with open(path, 'r', errors='replace') as f:
+        return _build(iter_tokens(f), stop_at_depth=1)
+
+
+# --- Binary KeyValues (shortcuts.vdf, appinfo.vdf) ---
+
+_BIN_MAP, _BIN_STR, _BIN_INT32, _BIN_FLOAT, _BIN_PTR, _BIN_WSTR, _BIN_COLOR, _BIN_UINT64, _BIN_END, _BIN_INT64 = \
+    0x00, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x0A
+
+
+def _read_cstr(data: bytes, pos: int) -> tuple[str, int]:
+    end = data.index(b'\0', pos)
+    return data[pos:end].decode('utf-8', errors='replace'), end + 1
+
+
+def loads_binary(data: bytes, pos: int = 0, key_table: list = None) -> tuple[dict, int]:
+    """
+    Parses binary KeyValues starting at `pos`. Returns (dict, new_pos).
+    `key_table` is used by appinfo.vdf v29, where keys are indices into a string table.
+    """
+    root = {}; stack = [root]
+    while pos < len(data):
+        t = data[pos]; pos += 1
+        if t == _BIN_END:
+            if len(stack) == 1: break
+            stack.pop(); continue
+        if key_table is not None:
+            key = key_table[struct.unpack_from('<I', data, pos)[0]]; pos += 4
+        else:
+            key, pos = _read_cstr(data, pos)
+        if t == _BIN_MAP:
+            child = {}; stack[-1][key] = child; stack.append(child)
+        elif t == _BIN_STR:
+            stack[-1][key], pos = _read_cstr(data, pos)
+        elif t in (_BIN_INT32, _BIN_PTR, _BIN_COLOR):
+            stack[-1][key] = struct.unpack_from('<i', data, pos)[0]; pos += 4
+        elif t == _BIN_FLOAT:
+            stack[-1][key] = struct.unpack_from('<f', data, pos)[0]; pos += 4
+        elif t == _BIN_UINT64:
+            stack[-1][key] = struct.unpack_from('<Q', data, pos)[0]; pos += 8
+        elif t == _BIN_INT64:
+            stack[-1][key] = struct.unpack_from('<q', data, pos)[0]; pos += 8
+        elif t == _BIN_WSTR:
+            end = pos
+            while data[end:end + 2] != b'\0\0': end += 2
+            stack[-1][key] = data[pos:end].decode('utf-16-le', errors='replace'); pos = end + 2
+        else:
+            raise ValueError(f"Unknown binary VDF type 0x{t:02x} at {pos - 1}")
+    return root, pos
+
+
+def load_binary(path) -> dict:
+    with open(path, 'rb') as f:
+        return loads_binary(f.read())[0]
+
+
+class SteamAppInfo:
+    """
+    Lazy reader for Steam's appcache/appinfo.vdf (v27-v29).
+
+    The file holds metadata for every app the account ever saw and can be
+    hundreds of MB, so entries are skipped by their size field and only the
+    requested appids are decoded. Results are memoized per file mtime.
+    """
+
+    _MAGICS = {0x07564427: 27, 0x07564428: 28, 0x07564429: 29}
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._types = {}
+
+    def app_types(self, appids) -> dict:
+        """Returns {appid: 'game'|'tool'|'application'|...} (lowercase) for the known appids"""
+        wanted = {int(a) for a in appids}
+        with self._lock:
+            try: mtime = os.stat(self.path).st_mtime_ns
+            except OSError: return {}
+            if mtime != self._mtime:
+                self._types.clear(); self._mtime = mtime
+            missing = wanted - set(self._types)
+            if missing:
+                try: self._types.update(self._scan(missing))
+                except (OSError, ValueError, struct.error, IndexError) as e:
+                    print(f"Error reading appinfo.vdf: {e}")
+                # Apps not present in appinfo are remembered as unknown
+                for a in missing: self._types.setdefault(a, None)
+            return {a: self._types[a] for a in wanted if self._types.get(a)}
+
+    def _scan(self, wanted: set) -> dict:
+        found = {}
+        with open(self.path, 'rb') as f:
+            magic, _universe = struct.unpack('<II', f.read(8))
+            version = self._MAGICS.get(magic)
+            if version is None: raise ValueError(f"unsupported appinfo magic 0x{magic:08x}")
+            key_table = None
+            if version >= 29:
+                table_offset = struct.unpack('<q', f.read(8))[0]
+                data_start = f.tell()
+                f.seek(table_offset)
+                count = struct.unpack('<I', f.read(4))[0]
+                key_table = f.read().split(b'\0')[:count]
+                key_table = [k.decode('utf-8', errors='replace') for k in key_table]
+                f.seek(data_start)
+            while wanted - set(found):
+                head = f.read(8)
+                if len(head) < 8: break
+                appid, size = struct.unpack('<II', head)
+                if appid == 0: break
+                if appid not in wanted:
+                    f.seek(size, os.SEEK_CUR); continue
+                entry = f.read(size)
+                # infoState, lastUpdated, picsToken, sha1, changeNumber [, binary sha1 (v28+)]
+                skip = 4 + 4 + 8 + 20 + 4 + (20 if version >= 28 else 0)
+                kv, _pos = loads_binary(entry, skip, key_table)
+                common = kv.get('appinfo', kv).get('common', {})
+                found[appid] = str(common.get('type', '')).lower() or None
+        return found